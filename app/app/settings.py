@@ -19,12 +19,17 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # See https://docs.djangoproject.com/en/2.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = '=be&1$bfhtq(ao0ndwwzq2y)dqka9nzov$kjeez=y#j-_81rf_'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    '=be&1$bfhtq(ao0ndwwzq2y)dqka9nzov$kjeez=y#j-_81rf_'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') != '0'
 
-ALLOWED_HOSTS = ["0.0.0.0", "localhost"]
+ALLOWED_HOSTS = os.environ.get(
+    'DJANGO_ALLOWED_HOSTS', '0.0.0.0,localhost'
+).split(',')
 
 # Application definition
 
@@ -35,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -43,6 +49,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.health.HealthCheckMiddleware',
+    'core.metrics.PerformanceMiddleware',
+    'core.compression.CompressionMiddleware',
+    'core.queries.QueryCheckMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,6 +91,24 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
+        # Seconds a connection is reused across requests; 0 closes it after
+        # each request. Keep 0 under runserver, which starts a thread (and
+        # so a connection) per request.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+    }
+}
+
+# core.db pings a reused connection that has been idle this many seconds
+# before a request uses it.
+DB_HEALTH_CHECK_IDLE = int(os.environ.get('DB_HEALTH_CHECK_IDLE', 10))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
@@ -125,5 +153,132 @@ STATIC_ROOT = '/vol/web/static'
 MEDIA_URL = '/media/'
 # noinspection PyUnresolvedReferences
 MEDIA_ROOT = '/vol/web/media'
+# core.views.serve_media caches these paths (whose names are unique or
+# content-derived, so never rewritten) as immutable, the rest for
+# MEDIA_CACHE_MAX_AGE seconds.
+MEDIA_IMMUTABLE_PREFIXES = ('uploads/recipe/', 'uploads/variants/')
+MEDIA_CACHE_MAX_AGE = 3600
+# core.views.serve_static, for deployments without a static file server.
+STATIC_CACHE_MAX_AGE = int(os.environ.get('STATIC_CACHE_MAX_AGE', 3600))
 
 AUTH_USER_MODEL = 'core.User'
+
+# Keyset pagination of the recipe list endpoints
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 1000))
+# Rows per server-side cursor fetch (and per serializer call) of the
+# ?stream= lists and the account export
+API_STREAM_BATCH_SIZE = int(os.environ.get('API_STREAM_BATCH_SIZE', 500))
+
+# Default and largest number of tag/ingredient autocomplete suggestions
+API_AUTOCOMPLETE_LIMIT = 10
+API_AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Largest array accepted by the recipe API bulk endpoints
+API_BULK_MAX_ITEMS = int(os.environ.get('API_BULK_MAX_ITEMS', 5000))
+
+# Token -> user cache of user.authentication.CachedTokenAuthentication.
+# TOKEN_AUTH_SHARED_CACHE names an entry of CACHES to share across processes.
+TOKEN_AUTH_CACHE_SIZE = int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000))
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 30))
+TOKEN_AUTH_SHARED_CACHE = os.environ.get('TOKEN_AUTH_SHARED_CACHE')
+
+# Per-user list response cache of recipe.cache.CachedListMixin. Needs a
+# cache shared by all workers (CACHE_BACKEND) for invalidation to reach them.
+RECIPE_RESPONSE_CACHE = 'default'
+RECIPE_RESPONSE_CACHE_TTL = int(
+    os.environ.get('RECIPE_RESPONSE_CACHE_TTL', 300)
+)
+
+# Background processing of recipe image uploads (recipe.images). With 0
+# workers uploads are processed inline, in the request.
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_MAX_SIZE = int(os.environ.get('RECIPE_IMAGE_MAX_SIZE', 2048))
+RECIPE_IMAGE_QUALITY = 85
+# Responsive variants, stored under RECIPE_IMAGE_VARIANT_DIR by content hash.
+RECIPE_IMAGE_VARIANT_DIR = 'uploads/variants'
+RECIPE_IMAGE_VARIANT_WIDTHS = (160, 320, 640, 1280)
+RECIPE_IMAGE_VARIANT_FORMATS = ('WEBP', 'JPEG')
+
+# Streaming upload path of recipe.uploads. Uploads are written in chunks to
+# RECIPE_IMAGE_UPLOAD_TEMP_DIR (relative to MEDIA_ROOT) and only the image
+# header is decoded to validate them.
+RECIPE_IMAGE_UPLOAD_TEMP_DIR = 'uploads/tmp'
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = int(
+    os.environ.get('RECIPE_IMAGE_MAX_UPLOAD_SIZE', 20 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 50 * 1000 * 1000)
+)
+
+# Histogram bucket widths of the recipe facets endpoint and how long its
+# responses are cached (0 disables caching)
+RECIPE_FACETS_PRICE_BUCKET = '5.00'
+RECIPE_FACETS_TIME_BUCKET = 15
+RECIPE_FACETS_CACHE_TTL = int(os.environ.get('RECIPE_FACETS_CACHE_TTL', 30))
+
+# Text search configuration of Recipe.search_vector and the ?search= filter
+RECIPE_SEARCH_CONFIG = 'english'
+
+# Request instrumentation of core.metrics.PerformanceMiddleware. DB, serializer
+# and render timings are collected for a PERF_SAMPLE_RATE share of requests.
+# Metrics are served on PERF_METRICS_PATH to PERF_METRICS_ALLOWED_IPS, for
+# requests without X-Forwarded-For only, as a proxy on the same host would
+# pass the allowlist; with several worker processes, set PERF_METRICS_DIR to
+# a directory they share so that each reports the sum of all of them.
+PERF_SAMPLE_RATE = float(os.environ.get('PERF_SAMPLE_RATE', 0.1))
+PERF_SERVER_TIMING = os.environ.get(
+    'PERF_SERVER_TIMING', '1' if DEBUG else '0'
+) != '0'
+PERF_METRICS_PATH = '/metrics'
+PERF_METRICS_ALLOWED_IPS = os.environ.get(
+    'PERF_METRICS_ALLOWED_IPS', '127.0.0.1,::1'
+).split(',')
+PERF_METRICS_DIR = os.environ.get('PERF_METRICS_DIR')
+PERF_METRICS_FLUSH_INTERVAL = 5
+
+# N+1 and slow query warnings of core.queries.QueryCheckMiddleware (off unless
+# QUERY_CHECK=1, e.g. in staging); QueryCheckMixin applies the same checks
+# to test client requests.
+QUERY_CHECK = os.environ.get('QUERY_CHECK', '0') != '0'
+QUERY_CHECK_MAX_REPEATS = int(os.environ.get('QUERY_CHECK_MAX_REPEATS', 5))
+QUERY_CHECK_SLOW_MS = float(os.environ.get('QUERY_CHECK_SLOW_MS', 250))
+
+# API renderers and parsers: JSON through orjson (core.fastjson, falling back
+# to the stdlib encoder without it) and the browsable API only with
+# API_BROWSABLE, on by default with DEBUG. DJANGO_DEBUG=0 is the production
+# profile: JSON only.
+API_BROWSABLE = os.environ.get(
+    'API_BROWSABLE', '1' if DEBUG else '0'
+) != '0'
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': ['core.fastjson.FastJSONRenderer'] + (
+        ['rest_framework.renderers.BrowsableAPIRenderer']
+        if API_BROWSABLE else []
+    ),
+    'DEFAULT_PARSER_CLASSES': [
+        'core.fastjson.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Response compression of core.compression.CompressionMiddleware: the first of
+# COMPRESSION_ENCODINGS (among br, zstd and gzip, whose library is installed)
+# that the client accepts, for the content types of COMPRESSION_RULES (a
+# "type/" key matches the prefix) from the given minimum size up. Media and
+# static files are never compressed per request: compress_assets writes
+# .br/.zst/.gz sidecars at COMPRESSION_ASSET_LEVELS that the file views send.
+COMPRESSION_ENCODINGS = os.environ.get(
+    'COMPRESSION_ENCODINGS', 'zstd,br,gzip'
+).split(',')
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_RULES = {
+    'application/json': COMPRESSION_MIN_SIZE,
+    'application/x-ndjson': COMPRESSION_MIN_SIZE,
+    'application/javascript': COMPRESSION_MIN_SIZE,
+    'image/svg+xml': COMPRESSION_MIN_SIZE,
+    'text/': COMPRESSION_MIN_SIZE,
+}
+COMPRESSION_LEVELS = {'zstd': 3, 'br': 4, 'gzip': 6}
+COMPRESSION_ASSET_LEVELS = {'zstd': 19, 'br': 11, 'gzip': 9}
@@ -13,14 +13,24 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 
 from app import settings
+from core.views import serve_media, serve_static
 
 urlpatterns = [
-                  path('admin/', admin.site.urls),
-                  path('api/user/', include('user.urls')),
-                  path('api/recipe/', include('recipe.urls')),
-              ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('admin/', admin.site.urls),
+    path('api/user/', include('user.urls')),
+    path('api/recipe/', include('recipe.urls')),
+    re_path(
+        r'^{}(?P<path>.+)$'.format(settings.MEDIA_URL.lstrip('/')),
+        serve_media,
+        name='media'
+    ),
+    re_path(
+        r'^{}(?P<path>.+)$'.format(settings.STATIC_URL.lstrip('/')),
+        serve_static,
+        name='static'
+    ),
+]
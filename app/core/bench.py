@@ -0,0 +1,184 @@
+import time
+
+from django.db import connection, transaction
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.counters import delete_recipes
+
+BENCH_EMAIL_DOMAIN = 'bench.invalid'
+
+TAG_NAMES = (
+    'Vegan', 'Vegetarian', 'Dessert', 'Breakfast', 'Quick', 'Spicy',
+    'Gluten free', 'Dinner', 'Lunch', 'Soup', 'Salad', 'Baking',
+)
+INGREDIENT_NAMES = (
+    'Salt', 'Pepper', 'Olive oil', 'Garlic', 'Onion', 'Butter', 'Flour',
+    'Sugar', 'Egg', 'Milk', 'Tomato', 'Chicken', 'Rice', 'Lemon', 'Basil',
+    'Cumin', 'Paprika', 'Potato', 'Carrot', 'Cheese',
+)
+TITLE_ADJECTIVES = (
+    'Quick', 'Spicy', 'Creamy', 'Roasted', 'Grilled', 'Classic', 'Smoky',
+    'Crispy',
+)
+TITLE_DISHES = (
+    'chicken curry', 'tomato soup', 'lentil stew', 'mushroom risotto',
+    'salmon bowl', 'tofu stir fry', 'beef tacos', 'potato gratin',
+    'pasta bake', 'banana bread', 'apple pie', 'pancakes',
+)
+
+
+def _sql_array(values):
+    return '(ARRAY[{}])'.format(', '.join(
+        "'{}'".format(value.replace("'", "''")) for value in values
+    ))
+
+
+def _name(names, n):
+    """SQL naming row ``n``: the names in turn, numbered once used up."""
+    return (
+        f"{_sql_array(names)}[1 + ({n} - 1) %% {len(names)}] || "
+        f"CASE WHEN {n} > {len(names)} "
+        f"THEN ' ' || ({n} - 1) / {len(names)} + 1 ELSE '' END"
+    )
+
+
+# Everything but the users' password is generated in SQL. Low-numbered
+# tags, ingredients and dishes are the popular ones: with ``skew`` s, a
+# row is picked at rank floor(random() ^ s * count).
+SEED_SQL = (
+    """
+    INSERT INTO core_user (password, is_superuser, email, name,
+                           is_active, is_staff)
+    SELECT '!', false, 'bench-' || n || '@' || %(domain)s, 'bench ' || n,
+           true, false
+    FROM generate_series(1, %(users)s) n
+    """,
+    f"""
+    INSERT INTO core_tag (user_id, name, recipe_count)
+    SELECT u.id, {_name(TAG_NAMES, 'n')}, 0
+    FROM core_user u, generate_series(1, %(tags)s) n
+    WHERE u.email LIKE '%%@' || %(domain)s
+    """,
+    f"""
+    INSERT INTO core_ingredient (user_id, name, recipe_count)
+    SELECT u.id, {_name(INGREDIENT_NAMES, 'n')}, 0
+    FROM core_user u, generate_series(1, %(ingredients)s) n
+    WHERE u.email LIKE '%%@' || %(domain)s
+    """,
+    f"""
+    INSERT INTO core_recipe (user_id, title, time_minutes, price, link,
+                             image_status, image_hash)
+    SELECT u.id,
+           {_sql_array(TITLE_ADJECTIVES)}[1 + n %% {len(TITLE_ADJECTIVES)}]
+           || ' ' || {_sql_array(TITLE_DISHES)}[
+               1 + floor(power(random(), %(skew)s) * {len(TITLE_DISHES)})
+           ] || ' ' || n,
+           5 + floor(power(random(), %(skew)s) * 175),
+           round((1 + power(random(), %(skew)s) * 60)::numeric, 2),
+           '', '', ''
+    FROM core_user u, generate_series(1, %(per_user)s) n
+    WHERE u.email LIKE '%%@' || %(domain)s
+    """,
+    """
+    INSERT INTO core_recipe_tags (recipe_id, tag_id)
+    SELECT r.id, t.id
+    FROM core_recipe r
+    JOIN core_user u ON u.id = r.user_id
+    CROSS JOIN LATERAL (
+        SELECT id FROM core_tag
+        WHERE user_id = r.user_id
+        ORDER BY id
+        OFFSET floor(power(random(), %(skew)s) * greatest(%(tags)s - 3, 1))
+        LIMIT 3
+    ) t
+    WHERE u.email LIKE '%%@' || %(domain)s
+    """,
+    """
+    INSERT INTO core_recipe_ingredients (recipe_id, ingredient_id)
+    SELECT r.id, i.id
+    FROM core_recipe r
+    JOIN core_user u ON u.id = r.user_id
+    CROSS JOIN LATERAL (
+        SELECT id FROM core_ingredient
+        WHERE user_id = r.user_id
+        ORDER BY id
+        OFFSET floor(
+            power(random(), %(skew)s) * greatest(%(ingredients)s - 5, 1)
+        )
+        LIMIT 5
+    ) i
+    WHERE u.email LIKE '%%@' || %(domain)s
+    """,
+    """
+    UPDATE core_tag t SET recipe_count = (
+        SELECT count(*) FROM core_recipe_tags WHERE tag_id = t.id
+    )
+    FROM core_user u
+    WHERE u.id = t.user_id AND u.email LIKE '%%@' || %(domain)s
+    """,
+    """
+    UPDATE core_ingredient i SET recipe_count = (
+        SELECT count(*) FROM core_recipe_ingredients
+        WHERE ingredient_id = i.id
+    )
+    FROM core_user u
+    WHERE u.id = i.user_id AND u.email LIKE '%%@' || %(domain)s
+    """,
+)
+
+
+def bench_users_filter(prefix=''):
+    return {f'{prefix}email__endswith': '@' + BENCH_EMAIL_DOMAIN}
+
+
+def delete_dataset():
+    """Delete the users generated by seed_dataset() and their data."""
+    bench_users = bench_users_filter('user__')
+    with transaction.atomic(), connection.cursor() as cursor:
+        delete_recipes(Recipe.objects.filter(**bench_users))
+        Tag.objects.filter(**bench_users).delete()
+        Ingredient.objects.filter(**bench_users).delete()
+        cursor.execute(
+            'DELETE FROM core_user WHERE email LIKE %s',
+            ['%@' + BENCH_EMAIL_DOMAIN]
+        )
+
+
+def dataset_exists():
+    return Recipe.objects.filter(**bench_users_filter('user__')).exists()
+
+
+def seed_dataset(users, recipes, tags, ingredients, skew=3.0,
+                 search_vectors=True):
+    """
+    Generate ``users`` users sharing ``recipes`` recipes, each with
+    ``tags`` tags and ``ingredients`` ingredients, in bulk SQL. Returns
+    the time it took in seconds.
+    """
+    params = {
+        'domain': BENCH_EMAIL_DOMAIN,
+        'users': users,
+        'tags': tags,
+        'ingredients': ingredients,
+        'per_user': max(recipes // users, 1),
+        'skew': skew,
+    }
+    started = time.perf_counter()
+    with transaction.atomic(), connection.cursor() as cursor:
+        for sql in SEED_SQL:
+            cursor.execute(sql, params)
+        if search_vectors:
+            Recipe.objects.filter(**bench_users_filter('user__')) \
+                .update_search_vectors()
+        # Fresh statistics before COMMIT runs the deferred foreign key
+        # checks, otherwise they are planned as seq scans of "empty"
+        # tables.
+        cursor.execute('ANALYZE')
+    return time.perf_counter() - started
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of the sorted list ``ordered``."""
+    if not ordered:
+        return 0.0
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
@@ -0,0 +1,187 @@
+import zlib
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Content-Encoding -> file suffix of its precompressed sidecars.
+SIDECAR_SUFFIXES = {'br': '.br', 'zstd': '.zst', 'gzip': '.gz'}
+
+
+class _GzipStream:
+    def __init__(self, level):
+        # wbits 31: gzip container, with a zero mtime so that the output
+        # only depends on the input.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def sync(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def sync(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _ZstdStream:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level) \
+            .compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def sync(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+# Content-Encoding -> streaming compressor, for the installed libraries.
+COMPRESSORS = {'gzip': _GzipStream}
+if brotli is not None:
+    COMPRESSORS['br'] = _BrotliStream
+if zstandard is not None:
+    COMPRESSORS['zstd'] = _ZstdStream
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    compressor = COMPRESSORS[encoding](level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_stream(chunks, encoding: str, level: int):
+    """
+    Compress an iterable of byte strings, flushing after each one so that
+    a slowly produced stream reaches the client as it goes.
+    """
+    compressor = COMPRESSORS[encoding](level)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.sync()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def negotiate(accept_encoding: str, encodings):
+    """
+    The encoding of ``encodings``, in order of preference, that the
+    ``Accept-Encoding`` header value rates highest; None for identity.
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def min_size(content_type: str):
+    """
+    Smallest body of ``content_type`` worth compressing, per
+    ``COMPRESSION_RULES``; None if it is not compressed.
+    """
+    media_type = content_type.split(';')[0].strip().lower()
+    rules = settings.COMPRESSION_RULES
+    if media_type in rules:
+        return rules[media_type]
+    for pattern, size in rules.items():
+        if pattern.endswith('/') and media_type.startswith(pattern):
+            return size
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the first of ``COMPRESSION_ENCODINGS`` the
+    client accepts, for the content types of ``COMPRESSION_RULES`` from
+    their minimum size up. Files are left alone: compress_assets writes
+    precompressed sidecars for the file views to send instead.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encodings = [
+            encoding for encoding in settings.COMPRESSION_ENCODINGS
+            if encoding in COMPRESSORS
+        ]
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.status_code in (204, 206, 304) or \
+                isinstance(response, FileResponse) or \
+                response.has_header('Content-Encoding'):
+            return response
+        size = min_size(response.get('Content-Type', ''))
+        if size is None or \
+                not response.streaming and len(response.content) < size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings
+        )
+        if encoding is None:
+            return response
+
+        level = settings.COMPRESSION_LEVELS[encoding]
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding, level
+            )
+            del response['Content-Length']
+        else:
+            compressed = compress(response.content, encoding, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # Different bytes for the same representation: a weak validator,
+        # which If-None-Match still matches.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
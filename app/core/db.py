@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.dispatch import receiver
+
+
+# Connected after django.db's own close_old_connections receivers, which
+# drop the connections that outlived CONN_MAX_AGE.
+@receiver(request_started)
+def check_reused_connections(**kwargs):
+    """
+    Ping the persistent connections (``CONN_MAX_AGE``) that sat idle for
+    ``DB_HEALTH_CHECK_IDLE`` seconds and drop the dead ones, so a request
+    reconnects instead of failing on a connection the database or a
+    proxy closed in the meantime.
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        idle_since = getattr(connection, 'idle_since', None)
+        if connection.connection is None or idle_since is None:
+            continue
+        if now - idle_since >= settings.DB_HEALTH_CHECK_IDLE \
+                and not connection.is_usable():
+            connection.close()
+
+
+@receiver(request_finished)
+def mark_idle_connections(**kwargs):
+    now = time.monotonic()
+    for connection in connections.all():
+        connection.idle_since = now if connection.connection else None
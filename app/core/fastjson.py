@@ -0,0 +1,78 @@
+import codecs
+import decimal
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_fallback_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # What orjson has no native type for; same output as DRF's encoder.
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    return _fallback_encoder.default(obj)
+
+
+def dumps(data) -> bytes:
+    """
+    ``data`` as compact UTF-8 JSON, matching JSONRenderer: UTC datetimes
+    end in ``Z``, Decimals are numbers and lazy strings, UUIDs, querysets
+    and the like are converted the way DRF's encoder does.
+    """
+    content = orjson.dumps(
+        data, default=_default,
+        option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    )
+    # Keep the output a strict JavaScript subset, as JSONRenderer does.
+    if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028') \
+            .replace(b'\xe2\x80\xa9', b'\\u2029')
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer on orjson. Indented output (the browsable API) and data
+    orjson refuses, such as integers over 64 bits, go through the stdlib
+    encoder, as does everything when orjson is not installed.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+        if orjson is None or not self.compact or self.get_indent(
+                accepted_media_type, renderer_context or {}) is not None:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            return dumps(data)
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser on orjson, for UTF-8 request bodies."""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get(
+            'encoding', settings.DEFAULT_CHARSET
+        )
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
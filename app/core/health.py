@@ -0,0 +1,65 @@
+import os
+
+from django.conf import settings
+from django.db import connections, DatabaseError
+from django.http import JsonResponse
+
+
+def _check_database():
+    with connections['default'].cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def _check_media():
+    if not os.access(settings.MEDIA_ROOT, os.W_OK | os.X_OK):
+        raise OSError(f'{settings.MEDIA_ROOT} is not writable')
+
+
+READINESS_CHECKS = {
+    'database': _check_database,
+    'media': _check_media,
+}
+
+
+def _response(checks, ok):
+    response = JsonResponse(
+        {'status': 'ok' if ok else 'unavailable', 'checks': checks},
+        status=200 if ok else 503
+    )
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def healthz(request):
+    """Liveness: the process serves requests; checks no dependency."""
+    return _response({}, True)
+
+
+def readyz(request):
+    """Readiness: the database answers and media storage is writable."""
+    checks = {}
+    for name, check in READINESS_CHECKS.items():
+        try:
+            check()
+            checks[name] = 'ok'
+        except (DatabaseError, OSError) as e:
+            checks[name] = f'{type(e).__name__}: {e}'.strip()
+    return _response(checks, all(v == 'ok' for v in checks.values()))
+
+
+class HealthCheckMiddleware:
+    """
+    Answer the ``/healthz`` and ``/readyz`` probes ahead of the rest of
+    the stack: no host validation (probes address pods by IP), session or
+    authentication work.
+    """
+    views = {'/healthz': healthz, '/readyz': readyz}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        view = self.views.get(request.path_info.rstrip('/'))
+        if view is not None and request.method in ('GET', 'HEAD'):
+            return view(request)
+        return self.get_response(request)
@@ -0,0 +1,394 @@
+import datetime
+import json
+import statistics
+import tempfile
+import time
+from collections import namedtuple
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from django.urls import get_resolver, reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.bench import BENCH_EMAIL_DOMAIN, percentile
+from core.models import Tag, Ingredient, Recipe
+from core.queries import log_queries
+
+# URL namespaces every route of which needs a scenario.
+NAMESPACES = ('recipe', 'user')
+BENCH_PASSWORD = 'bench-password'
+LATENCIES = ('p50_ms', 'p95_ms', 'p99_ms')
+
+# ``path`` and ``body`` may be callables of the request number, for
+# requests that need a fresh object or value each time.
+Scenario = namedtuple('Scenario', 'name route method path body format')
+
+
+def scenario(name, route, method='get', kwargs=None, query='', body=None,
+             format='json'):
+    path = reverse(route, kwargs=kwargs) + (f'?{query}' if query else '')
+    return Scenario(name, route, method, path, body, format)
+
+
+def route_names(namespace):
+    """The names of the routes under ``namespace``, namespaced."""
+    _, resolver = get_resolver().namespace_dict[namespace]
+    names = set()
+    patterns = list(resolver.url_patterns)
+    while patterns:
+        pattern = patterns.pop()
+        if hasattr(pattern, 'url_patterns'):
+            patterns.extend(pattern.url_patterns)
+        elif pattern.name:
+            names.add(f'{namespace}:{pattern.name}')
+    return names
+
+
+def _jpeg():
+    content = BytesIO()
+    Image.new('RGB', (1200, 800), (200, 120, 40)).save(content, 'JPEG')
+    return SimpleUploadedFile(
+        'bench.jpg', content.getvalue(), content_type='image/jpeg'
+    )
+
+
+def _call(value, n):
+    return value(n) if callable(value) else value
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every endpoint of the recipe and user APIs in-process '
+        'against the dataset of generate_data: p50/p95/p99 latency and '
+        'queries per request of each scenario. Writes run inside a '
+        'transaction that is rolled back. Results can be saved with '
+        '--output and compared with a saved --baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email', default=f'bench-1@{BENCH_EMAIL_DOMAIN}',
+            help='Generated user whose data the requests use.'
+        )
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Repeatable; only run scenarios whose name contains it.'
+        )
+        parser.add_argument(
+            '--cached', action='store_true',
+            help='Keep the recipe response caches on.'
+        )
+        parser.add_argument('--output', help='Write the results as JSON.')
+        parser.add_argument('--baseline', help='JSON results to compare to.')
+        parser.add_argument(
+            '--metric', choices=LATENCIES, default='p50_ms',
+            help='Latency compared with the baseline.'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help='Slowdown in percent reported as a regression.'
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Exit with an error if any scenario regressed.'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] <= 0:
+            raise CommandError('--repeat must be positive.')
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as file:
+                    baseline = json.load(file)['results']
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError(f'Cannot read the baseline: {error}')
+
+        user = get_user_model().objects \
+            .filter(email=options['email']).first()
+        if user is None or not Recipe.objects.filter(user=user).exists():
+            raise CommandError(
+                f'No recipes for {options["email"]}; run generate_data first.'
+            )
+
+        # APIClient requests are for "testserver"; image processing runs
+        # inline since workers would not see the uncommitted uploads.
+        overrides = {
+            'ALLOWED_HOSTS': ['testserver'], 'RECIPE_IMAGE_WORKERS': 0
+        }
+        if not options['cached']:
+            overrides.update(
+                RECIPE_RESPONSE_CACHE_TTL=0, RECIPE_FACETS_CACHE_TTL=0
+            )
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root, **overrides), \
+                transaction.atomic():
+            scenarios = self._scenarios(user, options)
+            self._check_coverage(scenarios)
+            if options['scenarios']:
+                scenarios = [
+                    s for s in scenarios
+                    if any(name in s.name for name in options['scenarios'])
+                ]
+            results = self._run(user, scenarios, options)
+            transaction.set_rollback(True)
+
+        report = {
+            'meta': {
+                'created': datetime.datetime.now(datetime.timezone.utc)
+                .isoformat(timespec='seconds'),
+                'email': options['email'],
+                'recipes': Recipe.objects.filter(user=user).count(),
+                'repeat': options['repeat'],
+                'warmup': options['warmup'],
+                'cached': options['cached'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2, sort_keys=True)
+                file.write('\n')
+
+        regressions = self._report(results, baseline, options)
+        if regressions and options['fail_on_regression']:
+            raise CommandError(
+                f'{len(regressions)} regressed: {", ".join(regressions)}'
+            )
+
+    # noinspection PyMethodMayBeStatic
+    def _scenarios(self, user, options):
+        """The requests to time, with the objects they need."""
+        requests = options['warmup'] + options['repeat']
+        user.set_password(BENCH_PASSWORD)
+        user.save(update_fields=['password'])
+
+        tags = list(
+            Tag.objects.filter(user=user)
+            .order_by('-recipe_count', 'id').values_list('id', flat=True)[:2]
+        )
+        ingredients = list(
+            Ingredient.objects.filter(user=user)
+            .order_by('-recipe_count', 'id').values_list('id', flat=True)[:3]
+        )
+        recipe = Recipe.objects.filter(user=user).latest('id')
+        doomed_recipes = list(
+            Recipe.objects.filter(user=user)
+            .order_by('id').values_list('id', flat=True)[:requests]
+        )
+        if len(doomed_recipes) < requests:
+            raise CommandError(
+                f'{options["email"]} needs at least {requests} recipes.'
+            )
+
+        def new_recipe(n):
+            return {
+                'title': f'Bench stew {n}', 'time_minutes': 30,
+                'price': '7.50', 'tags': tags, 'ingredients': ingredients,
+            }
+
+        tag_csv = ','.join(map(str, tags))
+        ingredient_csv = ','.join(map(str, ingredients))
+        scenarios = [
+            scenario('api root', 'recipe:api-root'),
+            scenario('recipes', 'recipe:recipe-list'),
+            scenario(
+                'recipes by tags', 'recipe:recipe-list',
+                query=f'tags={tag_csv}'
+            ),
+            scenario(
+                'recipes by all ingredients', 'recipe:recipe-list',
+                query=f'ingredients={ingredient_csv}&match=all'
+            ),
+            scenario(
+                'recipes by price', 'recipe:recipe-list',
+                query='max_price=20&ordering=price'
+            ),
+            scenario(
+                'recipes search', 'recipe:recipe-list',
+                query='search=chicken'
+            ),
+            scenario(
+                'recipes sparse fields', 'recipe:recipe-list',
+                query='fields=id,title'
+            ),
+            scenario(
+                'recipes with includes', 'recipe:recipe-list',
+                query='include=tags,ingredients'
+            ),
+            scenario(
+                'recipes stream', 'recipe:recipe-list',
+                query='stream=ndjson&max_price=5'
+            ),
+            scenario('recipe export', 'recipe:export'),
+            scenario(
+                'recipe detail', 'recipe:recipe-detail',
+                kwargs={'pk': recipe.pk}
+            ),
+            scenario('recipe facets', 'recipe:recipe-facets'),
+            scenario(
+                'recipe facets by tags', 'recipe:recipe-facets',
+                query=f'tags={tag_csv}'
+            ),
+            scenario(
+                'recipe create', 'recipe:recipe-list', 'post',
+                body=new_recipe
+            ),
+            scenario(
+                'recipe update', 'recipe:recipe-detail', 'patch',
+                kwargs={'pk': recipe.pk},
+                body=lambda n: {'title': f'Bench curry {n}', 'tags': tags}
+            ),
+            Scenario(
+                'recipe delete', 'recipe:recipe-detail', 'delete',
+                lambda n: reverse(
+                    'recipe:recipe-detail', args=[doomed_recipes[n]]
+                ),
+                None, 'json'
+            ),
+            scenario(
+                'recipe bulk create', 'recipe:recipe-bulk', 'post',
+                body=lambda n: [new_recipe(f'{n}.{i}') for i in range(10)]
+            ),
+            scenario(
+                'recipe upload image', 'recipe:recipe-upload-image', 'post',
+                kwargs={'pk': recipe.pk}, body=lambda n: {'image': _jpeg()},
+                format='multipart'
+            ),
+        ]
+        for name in ('tag', 'ingredient'):
+            scenarios += [
+                scenario(f'{name}s', f'recipe:{name}-list'),
+                scenario(
+                    f'{name}s assigned', f'recipe:{name}-list',
+                    query='assigned_only=1'
+                ),
+                scenario(
+                    f'{name}s popular', f'recipe:{name}-list',
+                    query='ordering=-recipe_count'
+                ),
+                scenario(
+                    f'{name} autocomplete', f'recipe:{name}-autocomplete',
+                    query='q=to'
+                ),
+                scenario(
+                    f'{name} create', f'recipe:{name}-list', 'post',
+                    body=lambda n, name=name: {'name': f'bench {name} {n}'}
+                ),
+                scenario(
+                    f'{name} bulk create', f'recipe:{name}-bulk', 'post',
+                    body=lambda n, name=name: [
+                        {'name': f'bench {name} {n}.{i}'} for i in range(10)
+                    ]
+                ),
+            ]
+        scenarios += [
+            scenario('user me', 'user:me'),
+            scenario(
+                'user update', 'user:me', 'patch',
+                body=lambda n: {'name': f'bench {n}'}
+            ),
+            scenario(
+                'user token', 'user:token', 'post',
+                body={'email': user.email, 'password': BENCH_PASSWORD}
+            ),
+            scenario(
+                'user create', 'user:create', 'post',
+                body=lambda n: {
+                    'email': f'bench-new-{n}@{BENCH_EMAIL_DOMAIN}',
+                    'password': BENCH_PASSWORD, 'name': 'bench',
+                }
+            ),
+        ]
+        return scenarios
+
+    def _check_coverage(self, scenarios):
+        covered = {s.route for s in scenarios}
+        routes = set().union(*(route_names(ns) for ns in NAMESPACES))
+        for route in sorted(routes - covered):
+            self.stderr.write(f'No scenario for {route}')
+
+    # noinspection PyMethodMayBeStatic
+    def _run(self, user, scenarios, options):
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        results = {}
+        for s in scenarios:
+            timings, queries, statuses = [], [], set()
+            for n in range(options['warmup'] + options['repeat']):
+                path, body = _call(s.path, n), _call(s.body, n)
+                with log_queries() as query_log:
+                    started = time.perf_counter()
+                    response = getattr(client, s.method)(
+                        path, body, format=s.format
+                    )
+                    if response.streaming:
+                        for _ in response.streaming_content:
+                            pass
+                    elapsed = (time.perf_counter() - started) * 1000
+                if n < options['warmup']:
+                    continue
+                timings.append(elapsed)
+                queries.append(len(query_log.queries))
+                statuses.add(response.status_code)
+            timings.sort()
+            results[s.name] = {
+                'method': s.method.upper(),
+                'path': path,
+                'status': sorted(statuses),
+                'p50_ms': round(percentile(timings, 0.50), 3),
+                'p95_ms': round(percentile(timings, 0.95), 3),
+                'p99_ms': round(percentile(timings, 0.99), 3),
+                'mean_ms': round(statistics.mean(timings), 3),
+                'queries': max(queries),
+            }
+        return results
+
+    def _report(self, results, baseline, options):
+        """Print the results table; returns the regressed scenarios."""
+        metric = options['metric']
+        self.stdout.write(
+            f'{"scenario":<28} {"status":>7} {"p50":>8} {"p95":>8} '
+            f'{"p99":>8} {"queries":>7}' +
+            (f' {"baseline":>9} {"change":>8}' if baseline else '')
+        )
+        regressions = []
+        for name, result in results.items():
+            line = (
+                f'{name:<28} {",".join(map(str, result["status"])):>7} '
+                f'{result["p50_ms"]:>8.2f} {result["p95_ms"]:>8.2f} '
+                f'{result["p99_ms"]:>8.2f} {result["queries"]:>7}'
+            )
+            before = (baseline or {}).get(name)
+            if before:
+                change = (
+                    (result[metric] - before[metric]) / before[metric] * 100
+                    if before[metric] else 0.0
+                )
+                line += f' {before[metric]:>9.2f} {change:>+7.1f}%'
+                if change > options['threshold']:
+                    regressions.append(name)
+                    line += ' slower'
+                extra_queries = result['queries'] - before['queries']
+                if extra_queries > 0:
+                    if name not in regressions:
+                        regressions.append(name)
+                    line += f' queries +{extra_queries}'
+            elif baseline is not None:
+                line += ' new'
+            if any(code >= 400 for code in result['status']):
+                line = self.style.ERROR(line)
+            elif name in regressions:
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
+        return regressions
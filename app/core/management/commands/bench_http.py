@@ -0,0 +1,120 @@
+import http.client
+import itertools
+import threading
+import time
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from core.bench import percentile
+from core.models import Recipe
+
+DEFAULT_PATHS = ('/api/recipe/recipes/{id}/', '/api/recipe/recipes/')
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test a running server: --concurrency keep-alive clients '
+        'request --path for --duration seconds, then requests/second and '
+        'latency percentiles are reported. Requests are made as a '
+        'benchmark user created (with --recipes recipes) in the configured '
+        'database, which must be the one the server uses. "{id}" in a '
+        'path is replaced by the ids of those recipes in turn.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help=f'Repeatable; default: {" ".join(DEFAULT_PATHS)}'
+        )
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--recipes', type=int, default=200)
+        parser.add_argument('--email', default='bench-http@bench.invalid')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('--url must be an http:// URL.')
+
+        token, recipe_ids = self._seed(options['email'], options['recipes'])
+        paths = [
+            path.format(id=recipe_id)
+            for path in options['paths'] or DEFAULT_PATHS
+            for recipe_id in (recipe_ids if '{id}' in path else [None])
+        ]
+        headers = {'Authorization': f'Token {token}'}
+
+        results = []
+        deadline = time.monotonic() + options['duration']
+        clients = [
+            threading.Thread(target=self._client, args=(
+                url, paths[offset::options['concurrency']] or paths,
+                headers, deadline, results
+            ))
+            for offset in range(options['concurrency'])
+        ]
+        started = time.monotonic()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - started
+
+        latencies = sorted(ms for ok, ms in results if ok)
+        errors = sum(1 for ok, _ in results if not ok)
+        self.stdout.write(
+            f'{len(results)} requests in {elapsed:.1f}s '
+            f'({options["concurrency"]} clients), {errors} errors\n'
+            f'requests/s: {len(latencies) / elapsed:.1f}\n'
+            f'latency ms: p50 {percentile(latencies, 0.50):.2f} '
+            f'p95 {percentile(latencies, 0.95):.2f} '
+            f'p99 {percentile(latencies, 0.99):.2f}'
+        )
+
+    # noinspection PyMethodMayBeStatic
+    def _seed(self, email, recipes):
+        user = get_user_model().objects.filter(email=email).first()
+        if user is None:
+            user = get_user_model().objects.create_user(
+                email, get_user_model().objects.make_random_password()
+            )
+        missing = recipes - Recipe.objects.filter(user=user).count()
+        Recipe.objects.bulk_create([
+            Recipe(user=user, title=f'recipe {n}', time_minutes=n % 120,
+                   price=Decimal(n % 9999) / 100)
+            for n in range(max(missing, 0))
+        ])
+        token, _ = Token.objects.get_or_create(user=user)
+        ids = list(
+            Recipe.objects.filter(user=user).order_by('id')
+            .values_list('id', flat=True)[:recipes]
+        )
+        return token.key, ids
+
+    # noinspection PyMethodMayBeStatic
+    def _client(self, url, paths, headers, deadline, results):
+        connection = http.client.HTTPConnection(
+            url.hostname, url.port or 80, timeout=30
+        )
+        timings = []
+        for path in itertools.cycle(paths):
+            if time.monotonic() >= deadline:
+                break
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = 200 <= response.status < 300
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                ok = False
+            timings.append((ok, (time.perf_counter() - started) * 1000))
+        connection.close()
+        # list.extend is atomic under the GIL.
+        results.extend(timings)
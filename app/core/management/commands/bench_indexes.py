@@ -0,0 +1,158 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.bench import bench_users_filter, dataset_exists, delete_dataset, \
+    seed_dataset
+from core.models import Tag, Ingredient, Recipe
+
+# Indexes added by core.0006_recipe_filter_indexes; dropped inside a rolled
+# back transaction to measure the "before" plans.
+FILTER_INDEXES = (
+    'core_tag_user_name_idx',
+    'core_ingredient_user_name_idx',
+    'core_tag_user_count_idx',
+    'core_ingredient_user_count_idx',
+    'core_recipe_user_id_idx',
+    'core_recipe_user_price_idx',
+    'core_recipe_user_time_idx',
+    'core_recipe_tags_tag_recipe_idx',
+    'core_recipe_ingredients_ingredient_recipe_idx',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic recipe catalog and compare EXPLAIN plans and '
+        'latency of the recipe API filter queries with and without the '
+        'composite indexes. Drops indexes inside a transaction: run it '
+        'against a benchmark database, never production.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=20)
+        parser.add_argument('--ingredients', type=int, default=50)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--reseed', action='store_true',
+            help='Delete previously seeded benchmark users first.'
+        )
+
+    def handle(self, *args, **options):
+        self._seed(options)
+
+        user_id = Recipe.objects.filter(**bench_users_filter('user__')) \
+            .values_list('user_id', flat=True).first()
+        if user_id is None:
+            self.stderr.write('No benchmark data to query.')
+            return
+        queries = self._queries(user_id, options['page_size'])
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for index in FILTER_INDEXES:
+                    cursor.execute(f'DROP INDEX {index}')
+            before = self._measure(queries, options['repeat'])
+            transaction.set_rollback(True)
+        after = self._measure(queries, options['repeat'])
+
+        for name in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {name}'))
+            for label, result in (('before', before), ('after', after)):
+                median_ms, plan = result[name]
+                self.stdout.write(f'-- {label}: median {median_ms:.3f} ms')
+                self.stdout.write(plan)
+
+        self.stdout.write(self.style.MIGRATE_HEADING('== summary (ms)'))
+        for name in queries:
+            self.stdout.write(
+                f'{name:<28} {before[name][0]:>10.3f} {after[name][0]:>10.3f}'
+            )
+
+    def _seed(self, options):
+        if options['reseed']:
+            delete_dataset()
+        elif dataset_exists():
+            self.stdout.write('Reusing existing benchmark data.')
+            return
+        elapsed = seed_dataset(
+            options['users'], options['recipes'], options['tags'],
+            options['ingredients']
+        )
+        self.stdout.write(
+            f'Seeded {options["recipes"]} recipes in {elapsed:.1f}s'
+        )
+
+    # noinspection PyMethodMayBeStatic
+    def _queries(self, user_id, page_size):
+        tag_ids = list(
+            Tag.objects.filter(user_id=user_id)
+            .order_by('id').values_list('id', flat=True)[:2]
+        )
+        ingredient_ids = list(
+            Ingredient.objects.filter(user_id=user_id)
+            .order_by('id').values_list('id', flat=True)[:2]
+        )
+        queries = {
+            'tags by name': Tag.objects
+            .filter(user_id=user_id)
+            .order_by('-name', 'id'),
+            'ingredients by name': Ingredient.objects
+            .filter(user_id=user_id)
+            .order_by('-name', 'id'),
+            'assigned tags': Tag.objects
+            .assigned()
+            .filter(user_id=user_id)
+            .order_by('-name', 'id'),
+            'popular ingredients': Ingredient.objects
+            .filter(user_id=user_id)
+            .order_by('-recipe_count', 'id'),
+            'recipes page': Recipe.objects
+            .filter(user_id=user_id)
+            .order_by('-id'),
+            'recipes by tags': Recipe.objects
+            .linked_to('tags', tag_ids)
+            .filter(user_id=user_id)
+            .order_by('-id'),
+            'recipes by all tags': Recipe.objects
+            .linked_to('tags', tag_ids, match_all=True)
+            .filter(user_id=user_id)
+            .order_by('-id'),
+            'recipes by ingredients': Recipe.objects
+            .linked_to('ingredients', ingredient_ids)
+            .filter(user_id=user_id)
+            .order_by('-id'),
+            'cheapest recipes': Recipe.objects
+            .filter(user_id=user_id, price__lte=10)
+            .order_by('price', 'id'),
+            'quickest recipes': Recipe.objects
+            .filter(user_id=user_id, time_minutes__lte=30)
+            .order_by('time_minutes', 'id'),
+        }
+        return {
+            name: queryset[:page_size]
+            for name, queryset in queries.items()
+        }
+
+    # noinspection PyMethodMayBeStatic
+    def _measure(self, queries, repeat):
+        results = {}
+        with connection.cursor() as cursor:
+            for name, queryset in queries.items():
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + sql, params)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                    timings.append((time.perf_counter() - started) * 1000)
+                results[name] = (statistics.median(timings), plan)
+        return results
@@ -0,0 +1,114 @@
+import datetime
+import json
+import statistics
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.fastjson import FastJSONParser, FastJSONRenderer, orjson
+
+
+def _page(recipes, include=False, raw=False):
+    """A list response page of ``recipes`` RecipeSerializer items."""
+    created = timezone.now()
+    results = []
+    for n in range(recipes):
+        tags = [n % 30 + 1, n % 7 + 40, n % 3 + 50]
+        ingredients = [n % 200 + 100 + i for i in range(5)]
+        if include:
+            tags = [
+                OrderedDict([('id', pk), ('name', f'Tag {pk}')])
+                for pk in tags
+            ]
+            ingredients = [
+                OrderedDict([('id', pk), ('name', f'Ingredient {pk}')])
+                for pk in ingredients
+            ]
+        price = Decimal(n % 6000) / 100
+        item = OrderedDict([
+            ('id', n + 1),
+            ('title', f'Spicy chicken curry {n}'),
+            ('time_minutes', 5 + n % 175),
+            ('price', price if raw else str(price)),
+            ('link', f'https://example.com/recipes/{n}'),
+            ('ingredients', ingredients),
+            ('tags', tags),
+            ('srcset', {
+                'image/webp': f'https://cdn.example.com/{n}-320.webp 320w, '
+                              f'https://cdn.example.com/{n}-640.webp 640w',
+            }),
+        ])
+        if raw:
+            item['created'] = created - datetime.timedelta(minutes=n)
+        results.append(item)
+    return OrderedDict([
+        ('next', 'https://example.com/api/recipe/recipes/?cursor=abc'),
+        ('previous', None),
+        ('results', results),
+    ])
+
+
+def _median_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        'Micro-benchmark rendering and parsing a recipe list page of '
+        '--recipes items with the stdlib JSONRenderer/JSONParser and the '
+        'orjson FastJSONRenderer/FastJSONParser: with tag and ingredient '
+        'ids, with include=tags,ingredients objects, and with raw Decimal '
+        'prices and datetimes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson is not installed.')
+
+        pages = {
+            'ids': _page(options['recipes']),
+            'include': _page(options['recipes'], include=True),
+            'raw values': _page(options['recipes'], raw=True),
+        }
+        codecs = {
+            'stdlib': (JSONRenderer(), JSONParser()),
+            'orjson': (FastJSONRenderer(), FastJSONParser()),
+        }
+        self.stdout.write(
+            f'{"page":<12} {"codec":<8} {"size KB":>8} {"render ms":>10} '
+            f'{"parse ms":>9}'
+        )
+        for name, data in pages.items():
+            baseline = None
+            for codec, (renderer, parser) in codecs.items():
+                content = renderer.render(data, 'application/json')
+                if baseline is None:
+                    baseline = json.loads(content.decode())
+                elif json.loads(content.decode()) != baseline:
+                    raise CommandError(f'{codec} rendered {name} differently.')
+                render_ms = _median_ms(
+                    lambda: renderer.render(data, 'application/json'),
+                    options['repeat']
+                )
+                parse_ms = _median_ms(
+                    lambda: parser.parse(BytesIO(content)), options['repeat']
+                )
+                self.stdout.write(
+                    f'{name:<12} {codec:<8} {len(content) / 1024:>8.1f} '
+                    f'{render_ms:>10.2f} {parse_ms:>9.2f}'
+                )
@@ -0,0 +1,80 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.compression import COMPRESSORS, SIDECAR_SUFFIXES, compress, \
+    min_size
+
+
+class Command(BaseCommand):
+    help = (
+        'Write .br/.zst/.gz sidecars of the compressible files under '
+        'STATIC_ROOT and MEDIA_ROOT (or --root), at '
+        'COMPRESSION_ASSET_LEVELS, for serve_static and serve_media to '
+        'send instead of the file. Up to date sidecars are kept; run it '
+        'after collectstatic.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--root', action='append', dest='roots',
+            help='Repeatable; default: STATIC_ROOT and MEDIA_ROOT.'
+        )
+
+    def handle(self, *args, **options):
+        roots = options['roots'] or [settings.STATIC_ROOT, settings.MEDIA_ROOT]
+        sidecar_suffixes = tuple(SIDECAR_SUFFIXES.values())
+        written = kept = saved = 0
+        for root in roots:
+            for directory, _, filenames in os.walk(root):
+                for filename in filenames:
+                    if filename.endswith(sidecar_suffixes):
+                        continue
+                    path = os.path.join(directory, filename)
+                    for encoding in COMPRESSORS:
+                        result = self._compress(path, encoding)
+                        if result is None:
+                            kept += 1
+                        elif result:
+                            written += 1
+                            saved += result
+        self.stdout.write(
+            f'{written} sidecars written ({saved / 1024:.0f} KB saved), '
+            f'{kept} up to date'
+        )
+
+    # noinspection PyMethodMayBeStatic
+    def _compress(self, path, encoding):
+        """
+        Bytes saved by the sidecar written, None if it was up to date and
+        0 if the file is not worth compressing.
+        """
+        content_type, file_encoding = mimetypes.guess_type(path)
+        stat = os.stat(path)
+        threshold = min_size(content_type or '')
+        if file_encoding or threshold is None or stat.st_size < threshold:
+            return 0
+
+        sidecar = path + SIDECAR_SUFFIXES[encoding]
+        try:
+            if os.stat(sidecar).st_mtime_ns >= stat.st_mtime_ns:
+                return None
+        except OSError:
+            pass
+
+        with open(path, 'rb') as file:
+            content = file.read()
+        compressed = compress(
+            content, encoding, settings.COMPRESSION_ASSET_LEVELS[encoding]
+        )
+        if len(compressed) >= len(content):
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+            return 0
+        temp_path = f'{sidecar}.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(compressed)
+        os.replace(temp_path, sidecar)
+        return len(content) - len(compressed)
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.bench import BENCH_EMAIL_DOMAIN, dataset_exists, delete_dataset, \
+    seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        f'Generate a large synthetic dataset for benchmarks: --users users '
+        f'(bench-N@{BENCH_EMAIL_DOMAIN}) sharing --recipes recipes, each '
+        f'user with --tags tags and --ingredients ingredients. Popularity '
+        f'of tags, ingredients, dishes, prices and cooking times follows a '
+        f'power law; a higher --skew concentrates it on fewer of them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=500000)
+        parser.add_argument('--tags', type=int, default=30)
+        parser.add_argument('--ingredients', type=int, default=200)
+        parser.add_argument('--skew', type=float, default=3.0)
+        parser.add_argument(
+            '--reseed', action='store_true',
+            help='Delete previously generated users and their data first.'
+        )
+
+    def handle(self, *args, **options):
+        for option in ('users', 'recipes', 'tags', 'ingredients', 'skew'):
+            if options[option] <= 0:
+                raise CommandError(f'--{option} must be positive.')
+
+        if options['reseed']:
+            delete_dataset()
+        elif dataset_exists():
+            raise CommandError(
+                'Benchmark data already exists; pass --reseed to replace it.'
+            )
+
+        elapsed = seed_dataset(
+            options['users'], options['recipes'], options['tags'],
+            options['ingredients'], options['skew']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {options["users"]} users, {options["recipes"]} '
+            f'recipes in {elapsed:.1f}s'
+        ))
@@ -1,17 +1,36 @@
 import time
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import connections, OperationalError
 
 
 class Command(BaseCommand):
+    help = (
+        'Wait until the database accepts connections, retrying with '
+        'exponential backoff; fails after --timeout seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument('--initial-delay', type=float, default=0.1)
+        parser.add_argument('--max-delay', type=float, default=5)
+
     def handle(self, *args, **options):
         self.stdout.write("waiting db ...")
-        db_conn = None
-        while not db_conn:
+        connection = connections[options['database']]
+        deadline = time.monotonic() + options['timeout']
+        delay = options['initial_delay']
+        while True:
             try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write("DB unavailable, wait 1s ...")
-                time.sleep(1)
+                connection.ensure_connection()
+                break
+            except OperationalError as e:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(f'DB unavailable: {e}')
+                delay = min(delay, options['max_delay'], remaining)
+                self.stdout.write(f"DB unavailable, wait {delay:.1f}s ...")
+                time.sleep(delay)
+                delay *= 2
         self.stdout.write(self.style.SUCCESS('DB available!'))
@@ -0,0 +1,389 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+# Families exposed by metrics_response(): name -> (type, help).
+METRICS = {
+    'recipe_api_requests_total': (
+        'counter', 'Requests by view, method and status.'
+    ),
+    'recipe_api_request_duration_seconds': (
+        'histogram', 'Wall time of the request, middleware included.'
+    ),
+    'recipe_api_response_size_bytes': (
+        'summary', 'Size of the response body as sent.'
+    ),
+    'recipe_api_db_queries': (
+        'summary', 'Database queries per sampled request.'
+    ),
+    'recipe_api_db_duration_seconds': (
+        'summary', 'Time spent in database queries per sampled request.'
+    ),
+    'recipe_api_serializer_duration_seconds': (
+        'summary', 'Time spent building serializer data per sampled request.'
+    ),
+    'recipe_api_render_duration_seconds': (
+        'summary', 'Time spent rendering the response per sampled request.'
+    ),
+}
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf')
+)
+
+
+class Registry:
+    """
+    Thread-safe in-process samples, as ``{(sample name, labels): value}``.
+    Every value is a counter or a sum, so registries of several processes
+    add up.
+    """
+
+    def __init__(self):
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, amount=1.0):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] += amount
+
+    def observe(self, name, labels, value, buckets=()):
+        self.inc(f'{name}_count', labels)
+        self.inc(f'{name}_sum', labels, value)
+        for bound in buckets:
+            if value <= bound:
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                self.inc(f'{name}_bucket', dict(labels, le=le))
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+registry = Registry()
+_local = threading.local()
+# Serializer class -> its subclass made by _timed().
+_timed_classes = {}
+
+
+class RequestTimings:
+    """Costs of one sampled request, in seconds."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db = 0.0
+        self.serializer = 0.0
+        self.render = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.db_queries += 1
+
+
+def _timed(serializer_class):
+    """
+    A subclass of ``serializer_class`` whose ``data`` is timed into the
+    sampled request's ``serializer`` time, made once per class.
+    """
+    timed = _timed_classes.get(serializer_class)
+    if timed is None:
+        def data(serializer):
+            timings = getattr(_local, 'timings', None)
+            if timings is None:
+                return super(timed, serializer).data
+            started = time.perf_counter()
+            try:
+                return super(timed, serializer).data
+            finally:
+                timings.serializer += time.perf_counter() - started
+
+        timed = _timed_classes[serializer_class] = type(
+            serializer_class.__name__, (serializer_class,),
+            {'data': property(data)}
+        )
+    return timed
+
+
+class SerializerTimingMixin:
+    """
+    Counts the time the view's serializers spend building ``data`` as the
+    serializer time of sampled requests. Nested serializers are built as
+    part of their parent, so only the top-level one is timed.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        serializer.__class__ = _timed(type(serializer))
+        return serializer
+
+
+def view_name(request):
+    """``RecipeViewSet.list`` style label of the view that served it."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view = match.func
+    cls = getattr(view, 'cls', None)
+    if cls is None:
+        return getattr(view, '__name__', type(view).__name__)
+    actions = getattr(view, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{cls.__name__}.{action}'
+
+
+def _response_size(response):
+    if response.has_header('Content-Length'):
+        return int(response['Content-Length'])
+    if not response.streaming:
+        return len(response.content)
+    return None
+
+
+# File in PERF_METRICS_DIR holding the summed samples of exited workers.
+RETIRED_FILE = 'retired.json'
+
+
+def _write_samples(path, samples):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump(
+            [[name, list(labels), value]
+             for (name, labels), value in samples.items()],
+            file
+        )
+    os.replace(temp_path, path)
+
+
+def _read_samples(path):
+    try:
+        with open(path) as file:
+            samples = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return {
+        (name, tuple(tuple(pair) for pair in labels)): value
+        for name, labels, value in samples
+    }
+
+
+def flush(path=None):
+    """
+    Write this process' samples to ``PERF_METRICS_DIR`` for
+    metrics_response() of the other worker processes to add up.
+    """
+    directory = settings.PERF_METRICS_DIR
+    if not directory:
+        return
+    path = path or os.path.join(directory, f'{os.getpid()}.json')
+    _write_samples(path, registry.snapshot())
+
+
+def retire_worker(directory, pid):
+    """
+    Add the last flushed samples of the exited worker ``pid`` to
+    ``RETIRED_FILE`` and remove its own file, so its counts stay in the
+    totals and a new worker given the same pid does not overwrite them.
+    Called by the gunicorn master, which reaps the workers one at a time.
+    """
+    path = os.path.join(directory, f'{pid}.json')
+    if not os.path.exists(path):
+        return
+    retired_path = os.path.join(directory, RETIRED_FILE)
+    totals = defaultdict(float, _read_samples(retired_path))
+    for key, value in _read_samples(path).items():
+        totals[key] += value
+    _write_samples(retired_path, totals)
+    os.remove(path)
+
+
+def clear_flushed(directory):
+    """Drop the samples a previous run left in ``directory``."""
+    for filename in os.listdir(directory) if os.path.isdir(directory) else ():
+        if filename.endswith(('.json', '.tmp')):
+            os.remove(os.path.join(directory, filename))
+
+
+def collect():
+    """
+    Samples of this process plus the flushed ones of the other workers
+    and those of the exited ones.
+    """
+    totals = defaultdict(float, registry.snapshot())
+    directory = settings.PERF_METRICS_DIR
+    own_file = f'{os.getpid()}.json'
+    for filename in os.listdir(directory) if directory else ():
+        if not filename.endswith('.json') or filename == own_file:
+            continue
+        samples = _read_samples(os.path.join(directory, filename))
+        for key, value in samples.items():
+            totals[key] += value
+    return totals
+
+
+def _family(sample_name):
+    for suffix in ('_bucket', '_count', '_sum'):
+        if sample_name.endswith(suffix) and \
+                sample_name[:-len(suffix)] in METRICS:
+            return sample_name[:-len(suffix)]
+    return sample_name
+
+
+def _sort_key(sample):
+    # Histogram buckets in increasing order of their numeric bound.
+    (name, labels), _ = sample
+    bound = dict(labels).get('le')
+    other_labels = tuple(pair for pair in labels if pair[0] != 'le')
+    return name, other_labels, float(bound) if bound else 0.0
+
+
+def metrics_response():
+    """The collected samples in the Prometheus text format."""
+    by_family = defaultdict(list)
+    for (name, labels), value in sorted(collect().items(), key=_sort_key):
+        by_family[_family(name)].append((name, labels, value))
+
+    lines = []
+    for family, samples in by_family.items():
+        metric_type, description = METRICS.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {description}')
+        lines.append(f'# TYPE {family} {metric_type}')
+        for name, labels, value in samples:
+            label_text = ','.join(
+                '{}="{}"'.format(
+                    key, str(label).replace('\\', r'\\').replace('"', r'\"')
+                )
+                for key, label in labels
+            )
+            lines.append(f'{name}{{{label_text}}} {value!r}')
+    return HttpResponse(
+        '\n'.join(lines) + '\n',
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+class PerformanceMiddleware:
+    """
+    Per view and action: request count, wall time and response size for
+    every request; DB queries and time, serializer and render time for a
+    ``PERF_SAMPLE_RATE`` share of them; serializer time in views that use
+    SerializerTimingMixin. Served as Prometheus metrics on
+    ``PERF_METRICS_PATH`` to direct requests from
+    ``PERF_METRICS_ALLOWED_IPS``, and as a ``Server-Timing`` header when
+    ``PERF_SERVER_TIMING`` is on.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.last_flush = time.monotonic()
+
+    def __call__(self, request):
+        if request.path_info == settings.PERF_METRICS_PATH:
+            # Behind a reverse proxy on the same host every request comes
+            # from an allowed address; only direct scrapes are answered.
+            if request.META.get('REMOTE_ADDR') not in \
+                    settings.PERF_METRICS_ALLOWED_IPS \
+                    or 'HTTP_X_FORWARDED_FOR' in request.META:
+                raise Http404()
+            return metrics_response()
+
+        timings = None
+        if random.random() < settings.PERF_SAMPLE_RATE:
+            timings = RequestTimings()
+        _local.timings = timings
+
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                if timings is not None:
+                    for connection in connections.all():
+                        stack.enter_context(
+                            connection.execute_wrapper(timings)
+                        )
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+        duration = time.perf_counter() - started
+
+        self._record(request, response, duration, timings)
+        if settings.PERF_SERVER_TIMING:
+            response['Server-Timing'] = self._server_timing(
+                duration, timings
+            )
+        return response
+
+    # noinspection PyMethodMayBeStatic
+    def process_template_response(self, request, response):
+        # DRF responses render after the view returns; time that too.
+        timings = getattr(_local, 'timings', None)
+        if timings is not None:
+            started = time.perf_counter()
+
+            def rendered(_):
+                timings.render += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def _record(self, request, response, duration, timings):
+        labels = {'view': view_name(request), 'method': request.method}
+        registry.inc(
+            'recipe_api_requests_total',
+            dict(labels, status=str(response.status_code))
+        )
+        registry.observe(
+            'recipe_api_request_duration_seconds', labels, duration,
+            DURATION_BUCKETS
+        )
+        size = _response_size(response)
+        if size is not None:
+            registry.observe('recipe_api_response_size_bytes', labels, size)
+        if timings is not None:
+            registry.observe(
+                'recipe_api_db_queries', labels, timings.db_queries
+            )
+            registry.observe(
+                'recipe_api_db_duration_seconds', labels, timings.db
+            )
+            registry.observe(
+                'recipe_api_serializer_duration_seconds', labels,
+                timings.serializer
+            )
+            registry.observe(
+                'recipe_api_render_duration_seconds', labels, timings.render
+            )
+
+        now = time.monotonic()
+        if now - self.last_flush >= settings.PERF_METRICS_FLUSH_INTERVAL:
+            self.last_flush = now
+            flush()
+
+    # noinspection PyMethodMayBeStatic
+    def _server_timing(self, duration, timings):
+        metrics = []
+        if timings is not None:
+            metrics += [
+                f'db;dur={timings.db * 1000:.2f};'
+                f'desc="{timings.db_queries} queries"',
+                f'serializer;dur={timings.serializer * 1000:.2f}',
+                f'render;dur={timings.render * 1000:.2f}',
+            ]
+        metrics.append(f'total;dur={duration * 1000:.2f}')
+        return ', '.join(metrics)
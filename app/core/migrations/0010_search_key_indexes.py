@@ -0,0 +1,37 @@
+from django.contrib.postgres.operations import UnaccentExtension
+from django.db import migrations
+
+
+def search_key_index(table):
+    name = f'{table}_user_search_key_idx'
+    return migrations.RunSQL(
+        f'CREATE INDEX {name} ON {table} '
+        f'(user_id, (core_search_key(name) COLLATE "C"), id);',
+        f'DROP INDEX {name};',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_search_vector'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        # unaccent() is only STABLE (its dictionary could change), so it
+        # cannot be indexed directly; this wrapper pins the dictionary.
+        migrations.RunSQL(
+            """
+            CREATE FUNCTION core_search_key(text) RETURNS text AS $$
+                SELECT lower(public.unaccent('public.unaccent'::regdictionary,
+                                             $1))
+            $$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+            """,
+            'DROP FUNCTION core_search_key(text);',
+        ),
+        # In "C" collation the btree serves both the LIKE 'prefix%' range
+        # and the ORDER BY of the autocomplete query.
+        search_key_index('core_tag'),
+        search_key_index('core_ingredient'),
+    ]
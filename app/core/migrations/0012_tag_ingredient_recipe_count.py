@@ -0,0 +1,45 @@
+# Generated by Django 2.1.15 on 2026-10-18 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_range_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        # Backfill; afterwards recipe.counters keeps the columns current.
+        migrations.RunSQL(
+            """
+            UPDATE core_tag t SET recipe_count = (
+                SELECT count(*) FROM core_recipe_tags rt
+                WHERE rt.tag_id = t.id
+            );
+            UPDATE core_ingredient i SET recipe_count = (
+                SELECT count(*) FROM core_recipe_ingredients ri
+                WHERE ri.ingredient_id = i.id
+            );
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-recipe_count', 'id'], name='core_ingredient_user_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-recipe_count', 'id'], name='core_tag_user_count_idx'),
+        ),
+    ]
@@ -4,7 +4,11 @@ import uuid
 from django.conf import settings
 from django.contrib.auth.base_user import BaseUserManager, AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models.functions import Coalesce
 
 
 class UserManager(BaseUserManager):
@@ -38,12 +42,53 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class SearchKey(models.Func):
+    """
+    Lower-cased, unaccented text in byte order, the form the
+    ``core_*_user_search_key_idx`` indexes store names in.
+    """
+    function = 'core_search_key'
+    template = '(%(function)s(%(expressions)s) COLLATE "C")'
+    output_field = models.TextField()
+
+
+class RecipeAttrQuerySet(models.QuerySet):
+    def autocomplete(self, prefix: str, limit: int):
+        """
+        The first ``limit`` rows whose name starts with ``prefix``, ignoring
+        case and accents, as one range scan of the search key index.
+        """
+        return self.annotate(search_key=SearchKey('name')) \
+            .filter(search_key__startswith=SearchKey(models.Value(prefix))) \
+            .order_by('search_key', 'id')[:limit]
+
+    def assigned(self):
+        """Rows used by at least one recipe."""
+        return self.filter(recipe_count__gt=0)
+
+
 class Tag(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
     name = models.CharField(max_length=255)
+    # Number of recipes linked to this row, maintained by recipe.counters.
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='core_tag_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', '-recipe_count', 'id'],
+                name='core_tag_user_count_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -55,6 +100,22 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE
     )
     name = models.CharField(max_length=255)
+    # Number of recipes linked to this row, maintained by recipe.counters.
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='core_ingredient_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', '-recipe_count', 'id'],
+                name='core_ingredient_user_count_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -67,7 +128,63 @@ def recipe_image_file_path(instance, filename: str):
     return os.path.join('uploads/recipe/', filename)
 
 
+class RecipeQuerySet(models.QuerySet):
+    def linked_to(self, field_name: str, ids, match_all: bool = False):
+        """
+        Recipes linked through the ``field_name`` M2M to any (or all) of
+        ``ids``, as a semi-join on the through table so no row is repeated.
+        """
+        field = self.model._meta.get_field(field_name)
+        recipe_column = field.m2m_field_name()
+        target_column = field.m2m_reverse_field_name()
+        links = field.remote_field.through.objects \
+            .filter(**{f'{target_column}__in': ids})
+
+        if match_all:
+            links = links.values(recipe_column) \
+                .annotate(matched=models.Count(target_column)) \
+                .filter(matched=len(set(ids)))
+
+        return self.filter(id__in=links.values(recipe_column))
+
+    def update_search_vectors(self):
+        """
+        Recompute ``search_vector`` from the title (weight A) and the tag
+        and ingredient names (weight B), in one UPDATE.
+        """
+        config = settings.RECIPE_SEARCH_CONFIG
+        vector = SearchVector('title', weight='A', config=config)
+        for field_name in ('tags', 'ingredients'):
+            related_model = self.model._meta.get_field(field_name) \
+                .related_model
+            names = related_model.objects \
+                .filter(recipe=models.OuterRef('pk')) \
+                .values('recipe') \
+                .annotate(names=StringAgg('name', ' ')) \
+                .values('names')
+            vector += SearchVector(
+                Coalesce(
+                    models.Subquery(names, output_field=models.TextField()),
+                    models.Value('')
+                ),
+                weight='B',
+                config=config
+            )
+        return self.update(search_vector=vector)
+
+
 class Recipe(models.Model):
+    IMAGE_PENDING = 'pending'
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -79,6 +196,39 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_status = models.CharField(
+        max_length=10,
+        choices=IMAGE_STATUS_CHOICES,
+        blank=True,
+        default=''
+    )
+    # Content hash and width of the processed image, which key its variants.
+    image_hash = models.CharField(max_length=64, blank=True, default='')
+    image_width = models.PositiveIntegerField(null=True)
+    # Maintained by recipe.search; see RecipeQuerySet.update_search_vectors.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_idx'
+            ),
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='core_recipe_user_price_idx'
+            ),
+            models.Index(
+                fields=['user', 'time_minutes', 'id'],
+                name='core_recipe_user_time_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -0,0 +1,160 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+from core.metrics import view_name
+
+logger = logging.getLogger(__name__)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROW_LIST_RE = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE_RE = re.compile(r'\s+')
+# Transaction bookkeeping, repeated by design.
+_IGNORED_RE = re.compile(
+    r'^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b', re.I
+)
+
+
+def query_shape(sql: str) -> str:
+    """
+    ``sql`` with its literals and placeholders replaced by ``?`` and
+    ``IN``/``VALUES`` lists collapsed, so queries that differ only in
+    their values share a shape.
+    """
+    shape = _STRING_RE.sub('?', sql)
+    shape = shape.replace('%s', '?')
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = _PLACEHOLDER_LIST_RE.sub('(...)', shape)
+    shape = _ROW_LIST_RE.sub('(...)', shape)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+
+class QueryLog:
+    """``connection.execute_wrapper()`` recording SQL and its duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not _IGNORED_RE.match(sql):
+                self.queries.append(
+                    (sql, (time.perf_counter() - started) * 1000)
+                )
+
+    def problems(self, max_repeats: int, slow_ms: float):
+        """
+        Descriptions of the shapes run more than ``max_repeats`` times and
+        of the queries slower than ``slow_ms``.
+        """
+        found = []
+        shapes = Counter(query_shape(sql) for sql, _ in self.queries)
+        for shape, count in shapes.items():
+            if count > max_repeats:
+                found.append(
+                    f'{count} queries of the same shape '
+                    f'(limit {max_repeats}): {shape}'
+                )
+        for sql, duration_ms in self.queries:
+            if duration_ms > slow_ms:
+                found.append(
+                    f'query took {duration_ms:.1f} ms '
+                    f'(budget {slow_ms} ms): {sql}'
+                )
+        return found
+
+
+@contextmanager
+def log_queries():
+    """Record the queries run inside the block on every connection."""
+    query_log = QueryLog()
+    wrapped = list(connections.all())
+    for connection in wrapped:
+        connection.execute_wrappers.append(query_log)
+    try:
+        yield query_log
+    finally:
+        for connection in wrapped:
+            connection.execute_wrappers.remove(query_log)
+
+
+class QueryCheckMiddleware:
+    """
+    Log a warning for each request that repeats a query shape more than
+    ``QUERY_CHECK_MAX_REPEATS`` times (N+1 queries) or runs a query slower
+    than ``QUERY_CHECK_SLOW_MS``. Only active with ``QUERY_CHECK`` on,
+    e.g. in staging.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_CHECK:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with log_queries() as query_log:
+            response = self.get_response(request)
+        for problem in query_log.problems(
+                settings.QUERY_CHECK_MAX_REPEATS,
+                settings.QUERY_CHECK_SLOW_MS):
+            logger.warning(
+                '%s %s (%s): %s', request.method, request.path,
+                view_name(request), problem
+            )
+        return response
+
+
+class QueryCheckMixin:
+    """
+    TestCase mixin failing any test client request that repeats a query
+    shape more than ``query_max_repeats`` times or runs a query slower than
+    ``query_slow_ms``. ``assertQueriesOk()`` checks other code the same way.
+    """
+    query_max_repeats = 1
+    query_slow_ms = None
+
+    def _pre_setup(self):
+        super()._pre_setup()
+        self._query_log = None
+        request_started.connect(self._request_started, weak=False)
+        request_finished.connect(self._request_finished, weak=False)
+
+    def _post_teardown(self):
+        request_started.disconnect(self._request_started)
+        request_finished.disconnect(self._request_finished)
+        super()._post_teardown()
+
+    def _request_started(self, **kwargs):
+        self._query_check = log_queries()
+        self._query_log = self._query_check.__enter__()
+
+    def _request_finished(self, **kwargs):
+        if self._query_log is None:
+            return
+        query_log, self._query_log = self._query_log, None
+        self._query_check.__exit__(None, None, None)
+        self._fail_on_problems(query_log)
+
+    @contextmanager
+    def assertQueriesOk(self):
+        with log_queries() as query_log:
+            yield
+        self._fail_on_problems(query_log)
+
+    def _fail_on_problems(self, query_log):
+        slow_ms = self.query_slow_ms or settings.QUERY_CHECK_SLOW_MS
+        problems = query_log.problems(self.query_max_repeats, slow_ms)
+        if problems:
+            self.fail('\n'.join(problems))
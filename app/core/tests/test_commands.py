@@ -1,20 +1,128 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.db import OperationalError
-from django.test import TestCase
+from django.test import LiveServerTestCase, TestCase
+
+from core.models import Tag, Recipe
+
+
+ENSURE_CONNECTION = \
+    'django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection'
 
 
 class CommandsTests(TestCase):
     def test_wait_for_db_ready(self):
-        with(patch('django.db.utils.ConnectionHandler.__getitem__')) as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        with patch(ENSURE_CONNECTION) as ec:
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(ec.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
-        with(patch('django.db.utils.ConnectionHandler.__getitem__')) as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(ec.call_count, 6)
+        self.assertEqual(
+            [call[0][0] for call in ts.call_args_list],
+            [0.1, 0.2, 0.4, 0.8, 1.6]
+        )
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        with patch(ENSURE_CONNECTION, side_effect=OperationalError):
+            with patch('core.management.commands.wait_for_db.time.monotonic',
+                       side_effect=[0, 1, 2, 3]):
+                with self.assertRaises(CommandError):
+                    call_command('wait_for_db', timeout=2.5, stdout=StringIO())
+
+    def test_bench_indexes(self):
+        out = StringIO()
+        call_command(
+            'bench_indexes', recipes=20, users=2, repeat=1, stdout=out
+        )
+        output = out.getvalue()
+        self.assertIn('recipes by tags', output)
+        self.assertIn('summary', output)
+
+    def test_generate_data(self):
+        call_command(
+            'generate_data', users=2, recipes=20, tags=15, ingredients=8,
+            stdout=StringIO()
+        )
+        recipes = Recipe.objects.filter(user__email__startswith='bench-')
+        self.assertEqual(recipes.count(), 20)
+        self.assertFalse(recipes.filter(search_vector=None).exists())
+        self.assertEqual(
+            Tag.objects.filter(name='Vegan 2').count(), 2
+        )
+        for tag in Tag.objects.all():
+            self.assertEqual(tag.recipe_count, tag.recipe_set.count())
+
+        with self.assertRaises(CommandError):
+            call_command('generate_data', users=1, recipes=5)
+        call_command(
+            'generate_data', users=1, recipes=5, tags=5, ingredients=8,
+            reseed=True, stdout=StringIO()
+        )
+        self.assertEqual(Recipe.objects.count(), 5)
+
+    def test_bench_api(self):
+        call_command(
+            'generate_data', users=1, recipes=10, tags=5, ingredients=8,
+            stdout=StringIO()
+        )
+        out, err = StringIO(), StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command(
+                'bench_api', repeat=2, warmup=0, output=output, stdout=out,
+                stderr=err
+            )
+            with open(output) as file:
+                report = json.load(file)
+
+            baseline = os.path.join(directory, 'baseline.json')
+            report['results']['tags']['queries'] = 0
+            with open(baseline, 'w') as file:
+                json.dump(report, file)
+            with self.assertRaisesMessage(CommandError, '1 regressed: tags'):
+                call_command(
+                    'bench_api', repeat=1, warmup=1, scenarios=['tags'],
+                    baseline=baseline, threshold=1e9,
+                    fail_on_regression=True, stdout=StringIO()
+                )
+
+        self.assertEqual(err.getvalue(), '')
+        results = report['results']
+        self.assertIn('recipe upload image', results)
+        self.assertIn('user token', results)
+        for name, result in results.items():
+            self.assertLess(max(result['status']), 400, name)
+        self.assertEqual(results['recipe detail']['queries'], 3)
+        # Writes were rolled back.
+        self.assertEqual(Recipe.objects.count(), 10)
+
+    def test_bench_json(self):
+        out = StringIO()
+        call_command('bench_json', recipes=5, repeat=1, stdout=out)
+        output = out.getvalue()
+        self.assertIn('include', output)
+        self.assertIn('orjson', output)
+
+
+class BenchHttpCommandTests(LiveServerTestCase):
+    def test_bench_http(self):
+        out = StringIO()
+        call_command(
+            'bench_http', url=self.live_server_url, duration=0.5,
+            concurrency=2, recipes=3, stdout=out
+        )
+        output = out.getvalue()
+        self.assertIn(', 0 errors', output)
+        self.assertIn('requests/s', output)
+        self.assertEqual(Recipe.objects.count(), 3)
@@ -0,0 +1,170 @@
+import gzip
+import os
+import tempfile
+import unittest
+from io import StringIO
+
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.compression import CompressionMiddleware, brotli, compress, \
+    compress_stream, min_size, negotiate, zstandard
+
+JSON = b'{"id": 1, "title": "Spicy chicken curry"}' * 100
+
+
+def _middleware(response, encodings=('zstd', 'br', 'gzip')):
+    with override_settings(COMPRESSION_ENCODINGS=list(encodings)):
+        middleware = CompressionMiddleware(lambda request: response)
+    return middleware
+
+
+def _respond(accept_encoding, response=None, **kwargs):
+    if response is None:
+        response = HttpResponse(JSON, content_type='application/json')
+    request = RequestFactory().get(
+        '/', HTTP_ACCEPT_ENCODING=accept_encoding
+    )
+    return _middleware(response, **kwargs)(request)
+
+
+class NegotiateTests(SimpleTestCase):
+    def test_server_preference_among_equals(self):
+        self.assertEqual(negotiate('gzip, br', ['br', 'gzip']), 'br')
+        self.assertEqual(negotiate('gzip, br', ['gzip', 'br']), 'gzip')
+
+    def test_quality_values(self):
+        self.assertEqual(
+            negotiate('br;q=0.5, gzip;q=0.8', ['br', 'gzip']), 'gzip'
+        )
+        self.assertIsNone(negotiate('gzip;q=0', ['gzip']))
+        self.assertIsNone(negotiate('identity', ['gzip']))
+        self.assertIsNone(negotiate('', ['gzip']))
+
+    def test_wildcard(self):
+        self.assertEqual(negotiate('*', ['br', 'gzip']), 'br')
+        self.assertEqual(negotiate('br;q=0, *', ['br', 'gzip']), 'gzip')
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def test_gzip(self):
+        response = HttpResponse(JSON, content_type='application/json')
+        response['ETag'] = '"abc"'
+
+        res = _respond('gzip', response)
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), JSON)
+        self.assertEqual(res['Content-Length'], str(len(res.content)))
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+        self.assertEqual(res['ETag'], 'W/"abc"')
+
+    @unittest.skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        res = _respond('gzip, br')
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(res.content), JSON)
+
+    @unittest.skipIf(zstandard is None, 'zstandard is not installed')
+    def test_zstd(self):
+        res = _respond('gzip, br, zstd')
+
+        self.assertEqual(res['Content-Encoding'], 'zstd')
+        self.assertEqual(
+            zstandard.ZstdDecompressor().decompressobj()
+            .decompress(res.content),
+            JSON
+        )
+
+    def test_not_accepted(self):
+        res = _respond('identity')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res.content, JSON)
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+
+    def test_below_minimum_size(self):
+        res = _respond('gzip', HttpResponse(
+            b'{"id": 1}', content_type='application/json'
+        ))
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertFalse(res.has_header('Vary'))
+
+    def test_content_type_rules(self):
+        with override_settings(COMPRESSION_RULES={
+                'application/json': 0, 'text/': 2000}):
+            self.assertEqual(min_size('application/json; charset=utf-8'), 0)
+            self.assertEqual(min_size('text/csv'), 2000)
+            self.assertIsNone(min_size('image/jpeg'))
+
+            res = _respond(
+                'gzip', HttpResponse(JSON, content_type='image/png')
+            )
+            self.assertFalse(res.has_header('Content-Encoding'))
+            res = _respond('gzip', HttpResponse(
+                JSON[:1500], content_type='text/plain'
+            ))
+            self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_streaming(self):
+        response = StreamingHttpResponse(
+            iter([JSON, JSON]), content_type='application/x-ndjson'
+        )
+
+        res = _respond('gzip', response)
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertFalse(res.has_header('Content-Length'))
+        self.assertEqual(
+            gzip.decompress(b''.join(res.streaming_content)), JSON * 2
+        )
+
+    def test_stream_flushes_each_chunk(self):
+        chunks = compress_stream(iter([JSON, JSON]), 'gzip', 6)
+        first = next(chunks)
+
+        self.assertGreater(len(first), 0)
+        decompressed = gzip.decompress(first + b''.join(chunks))
+        self.assertEqual(decompressed, JSON * 2)
+
+    def test_already_encoded(self):
+        response = HttpResponse(
+            compress(JSON, 'gzip', 6), content_type='application/json'
+        )
+        response['Content-Encoding'] = 'gzip'
+
+        res = _respond('gzip, br', response)
+
+        self.assertEqual(gzip.decompress(res.content), JSON)
+
+    def test_encodings_without_library_skipped(self):
+        res = _respond('unknown, gzip', encodings=('unknown', 'gzip'))
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+
+
+class CompressAssetsCommandTests(SimpleTestCase):
+    def test_writes_and_keeps_sidecars(self):
+        with tempfile.TemporaryDirectory() as root:
+            for name, content in (('app.js', JSON), ('tiny.css', b'a{}'),
+                                  ('photo.jpg', JSON)):
+                with open(os.path.join(root, name), 'wb') as file:
+                    file.write(content)
+
+            out = StringIO()
+            call_command('compress_assets', root=[root], stdout=out)
+
+            with open(os.path.join(root, 'app.js.gz'), 'rb') as file:
+                self.assertEqual(gzip.decompress(file.read()), JSON)
+            for skipped in ('tiny.css.gz', 'photo.jpg.gz'):
+                self.assertFalse(
+                    os.path.exists(os.path.join(root, skipped))
+                )
+            self.assertIn('0 up to date', out.getvalue())
+
+            out = StringIO()
+            call_command('compress_assets', root=[root], stdout=out)
+            self.assertIn('0 sidecars written', out.getvalue())
@@ -0,0 +1,49 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings
+
+from core.db import check_reused_connections, mark_idle_connections
+
+
+def fake_connection(usable=True, idle_since=None):
+    connection = MagicMock(idle_since=idle_since)
+    connection.is_usable.return_value = usable
+    return connection
+
+
+@override_settings(DB_HEALTH_CHECK_IDLE=10)
+@patch('core.db.time.monotonic', return_value=100.0)
+class ConnectionHealthCheckTests(SimpleTestCase):
+    def test_dead_idle_connection_closed(self, monotonic):
+        connection = fake_connection(usable=False, idle_since=80.0)
+        with patch('core.db.connections.all', return_value=[connection]):
+            check_reused_connections()
+
+        connection.close.assert_called_once_with()
+
+    def test_recently_used_connection_not_pinged(self, monotonic):
+        connection = fake_connection(usable=False, idle_since=95.0)
+        with patch('core.db.connections.all', return_value=[connection]):
+            check_reused_connections()
+
+        connection.is_usable.assert_not_called()
+        connection.close.assert_not_called()
+
+    def test_live_connection_kept(self, monotonic):
+        connection = fake_connection(usable=True, idle_since=0.0)
+        with patch('core.db.connections.all', return_value=[connection]):
+            check_reused_connections()
+
+        connection.is_usable.assert_called_once_with()
+        connection.close.assert_not_called()
+
+    def test_mark_idle(self, monotonic):
+        open_connection = fake_connection()
+        closed_connection = fake_connection(idle_since=50.0)
+        closed_connection.connection = None
+        with patch('core.db.connections.all',
+                   return_value=[open_connection, closed_connection]):
+            mark_idle_connections()
+
+        self.assertEqual(open_connection.idle_since, 100.0)
+        self.assertIsNone(closed_connection.idle_since)
@@ -0,0 +1,82 @@
+import datetime
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.fastjson import FastJSONParser, FastJSONRenderer
+
+DATA = OrderedDict([
+    ('id', 1),
+    ('price', Decimal('5.50')),
+    ('created', datetime.datetime(
+        2020, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc
+    )),
+    ('naive', datetime.datetime(2020, 1, 2, 3, 4, 5)),
+    ('day', datetime.date(2020, 1, 2)),
+    ('uuid', uuid.UUID('12345678-1234-5678-1234-567812345678')),
+    ('lazy', gettext_lazy('Invalid token.')),
+    ('title', 'Crème brûlée \u2028\u2029'),
+    ('counts', {1: 2}),
+    ('tags', [OrderedDict([('id', 3), ('name', 'Vegan')])]),
+    ('empty', None),
+])
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_same_output_as_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+        )
+
+    def test_indented_output_as_json_renderer(self):
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            FastJSONRenderer().render(DATA, media_type),
+            JSONRenderer().render(DATA, media_type)
+        )
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_falls_back_on_unsupported_data(self):
+        self.assertEqual(
+            FastJSONRenderer().render({'big': 2 ** 70}),
+            b'{"big":1180591620717411303424}'
+        )
+
+    def test_without_orjson(self):
+        with patch('core.fastjson.orjson', None):
+            self.assertEqual(
+                FastJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+            )
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def test_parse(self):
+        content = JSONRenderer().render(DATA)
+        self.assertEqual(
+            FastJSONParser().parse(BytesIO(content)),
+            JSONParser().parse(BytesIO(content))
+        )
+
+    def test_parse_error(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"id": '))
+
+    def test_other_encoding(self):
+        content = '{"name": "Crème"}'.encode('latin-1')
+        self.assertEqual(
+            FastJSONParser().parse(
+                BytesIO(content), parser_context={'encoding': 'latin-1'}
+            ),
+            {'name': 'Crème'}
+        )
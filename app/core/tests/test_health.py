@@ -0,0 +1,55 @@
+import tempfile
+from unittest.mock import patch
+
+from django.db import OperationalError
+from django.test import TestCase
+
+
+class HealthCheckTests(TestCase):
+    def setUp(self) -> None:
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = self.settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_healthz(self):
+        res = self.client.get('/healthz')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['status'], 'ok')
+        self.assertEqual(res['Cache-Control'], 'no-store')
+
+    def test_readyz(self):
+        res = self.client.get('/readyz', HTTP_HOST='10.0.0.7')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            res.json()['checks'], {'database': 'ok', 'media': 'ok'}
+        )
+
+    def test_readyz_database_down(self):
+        with patch('core.health.connections') as connections:
+            connections.__getitem__.return_value.cursor.side_effect = \
+                OperationalError('connection refused')
+            res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['status'], 'unavailable')
+        self.assertEqual(
+            res.json()['checks']['database'],
+            'OperationalError: connection refused'
+        )
+
+    def test_readyz_media_not_writable(self):
+        with self.settings(MEDIA_ROOT='/nonexistent/media'):
+            res = self.client.get('/readyz/')
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['checks']['database'], 'ok')
+        self.assertIn('not writable', res.json()['checks']['media'])
+
+    def test_other_methods_fall_through(self):
+        res = self.client.post('/healthz')
+
+        self.assertEqual(res.status_code, 404)
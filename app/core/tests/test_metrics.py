@@ -0,0 +1,143 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APIClient
+
+from core import metrics
+from recipe.tests.test_recipe_api import sample_recipe
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(PERF_SAMPLE_RATE=1, PERF_SERVER_TIMING=True,
+                   PERF_METRICS_DIR=None, RECIPE_RESPONSE_CACHE_TTL=0)
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        metrics.registry.clear()
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        sample_recipe(self.user)
+        self.base_serializer_data = BaseSerializer.data
+
+    def scrape(self):
+        res = self.client.get('/metrics')
+        self.assertEqual(res.status_code, 200)
+        return res.content.decode()
+
+    def test_server_timing(self):
+        res = self.client.get(RECIPE_URL)
+
+        timing = res['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('serializer;dur=', timing)
+        self.assertNotIn('serializer;dur=0.00,', timing)
+        self.assertIn('render;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_metrics_per_view_and_action(self):
+        self.client.get(RECIPE_URL)
+        self.client.get(RECIPE_URL)
+        self.client.get(reverse('recipe:tag-autocomplete'), {'q': 'a'})
+
+        output = self.scrape()
+        labels = 'method="GET",status="200",view="RecipeViewSet.list"'
+        self.assertIn(f'recipe_api_requests_total{{{labels}}} 2.0', output)
+        self.assertIn(
+            'recipe_api_requests_total{method="GET",status="200",'
+            'view="TagViewSet.autocomplete"} 1.0',
+            output
+        )
+        self.assertIn('# TYPE recipe_api_request_duration_seconds histogram',
+                      output)
+        self.assertIn(
+            'recipe_api_request_duration_seconds_bucket{le="+Inf",'
+            'method="GET",view="RecipeViewSet.list"} 2.0',
+            output
+        )
+        self.assertIn(
+            'recipe_api_db_queries_count{method="GET",'
+            'view="RecipeViewSet.list"} 2.0',
+            output
+        )
+        self.assertIn('recipe_api_serializer_duration_seconds_sum', output)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_requests_only_counted(self):
+        res = self.client.get(RECIPE_URL)
+
+        self.assertRegex(res['Server-Timing'], r'^total;dur=[\d.]+$')
+        output = self.scrape()
+        self.assertIn('recipe_api_requests_total', output)
+        self.assertNotIn('recipe_api_db_queries', output)
+
+    @override_settings(PERF_SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        res = self.client.get(RECIPE_URL)
+
+        self.assertFalse(res.has_header('Server-Timing'))
+
+    def test_metrics_not_public(self):
+        res = self.client.get('/metrics', REMOTE_ADDR='203.0.113.9')
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_metrics_not_served_through_proxy(self):
+        res = self.client.get(
+            '/metrics', HTTP_X_FORWARDED_FOR='203.0.113.9'
+        )
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_serializers_not_patched_globally(self):
+        self.client.get(RECIPE_URL)
+
+        self.assertIs(BaseSerializer.data, self.base_serializer_data)
+
+    def test_worker_processes_add_up(self):
+        self.client.get(RECIPE_URL)
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(PERF_METRICS_DIR=directory):
+                # As if flushed by another worker process.
+                metrics.flush(os.path.join(directory, 'other.json'))
+                output = self.scrape()
+
+        labels = 'method="GET",status="200",view="RecipeViewSet.list"'
+        self.assertIn(f'recipe_api_requests_total{{{labels}}} 2.0', output)
+
+    def test_exited_worker_counts_kept(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                self.settings(PERF_METRICS_DIR=directory):
+            path = os.path.join(directory, '4242.json')
+            for _ in range(2):
+                # A worker serves a request and exits, then a new one is
+                # given the same pid.
+                metrics.registry.clear()
+                self.client.get(RECIPE_URL)
+                metrics.flush(path)
+                metrics.retire_worker(directory, 4242)
+            metrics.registry.clear()
+            self.client.get(RECIPE_URL)
+            metrics.flush(path)
+
+            self.assertEqual(
+                sorted(os.listdir(directory)),
+                ['4242.json', metrics.RETIRED_FILE]
+            )
+            metrics.registry.clear()
+            output = self.scrape()
+
+            metrics.clear_flushed(directory)
+            self.assertEqual(os.listdir(directory), [])
+
+        labels = 'method="GET",status="200",view="RecipeViewSet.list"'
+        self.assertIn(f'recipe_api_requests_total{{{labels}}} 3.0', output)
@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from core.queries import QueryCheckMiddleware, QueryCheckMixin, \
+    QueryLog, query_shape
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class QueryShapeTests(TestCase):
+    def test_values_ignored(self):
+        self.assertEqual(
+            query_shape('SELECT * FROM t WHERE id = %s LIMIT 21'),
+            query_shape("SELECT * FROM t WHERE id = 'x'  LIMIT 5"),
+        )
+
+    def test_lists_collapsed(self):
+        self.assertEqual(
+            query_shape('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            'SELECT * FROM t WHERE id IN (...)'
+        )
+        self.assertEqual(
+            query_shape('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO t (a, b) VALUES (...)'
+        )
+
+    def test_identifiers_kept(self):
+        self.assertEqual(
+            query_shape('SELECT U0."id" FROM "core_tag" U0'),
+            'SELECT U0."id" FROM "core_tag" U0'
+        )
+
+
+class QueryLogTests(TestCase):
+    def test_repeated_shape_and_slow_query(self):
+        query_log = QueryLog()
+        query_log.queries = [
+            ('SELECT * FROM t WHERE id = %s', 1.0),
+            ('SELECT * FROM t WHERE id = %s', 1.0),
+            ('SELECT * FROM t WHERE id = %s', 300.0),
+            ('SELECT 1', 2.0),
+        ]
+
+        problems = query_log.problems(max_repeats=2, slow_ms=100)
+
+        self.assertEqual(len(problems), 2)
+        self.assertIn('3 queries of the same shape (limit 2)', problems[0])
+        self.assertIn('query took 300.0 ms (budget 100 ms)', problems[1])
+
+    def test_savepoints_ignored(self):
+        query_log = QueryLog()
+        connection.execute_wrappers.append(query_log)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SAVEPOINT "s1"')
+                cursor.execute('RELEASE SAVEPOINT "s1"')
+        finally:
+            connection.execute_wrappers.remove(query_log)
+
+        self.assertEqual(query_log.queries, [])
+
+
+class QueryCheckMiddlewareTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+
+    def test_disabled_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryCheckMiddleware(lambda request: None)
+
+    @override_settings(QUERY_CHECK=True, QUERY_CHECK_MAX_REPEATS=0,
+                       RECIPE_RESPONSE_CACHE_TTL=0)
+    def test_logs_problems(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertLogs('core.queries', 'WARNING') as logs:
+            client.get(TAGS_URL)
+
+        self.assertIn('GET /api/recipe/tags/ (TagViewSet.list)',
+                      logs.output[0])
+        self.assertIn('queries of the same shape', logs.output[0])
+
+
+class QueryCheckMixinTests(QueryCheckMixin, TestCase):
+    query_slow_ms = 50
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Dessert')
+        ]
+
+    def test_repeated_query(self):
+        with self.assertRaisesMessage(AssertionError, '2 queries'):
+            with self.assertQueriesOk():
+                for tag in self.tags:
+                    Tag.objects.get(pk=tag.pk)
+
+        with self.assertQueriesOk():
+            Tag.objects.in_bulk([tag.pk for tag in self.tags])
+
+    def test_slow_query(self):
+        with self.assertRaisesMessage(AssertionError, 'budget 50 ms'):
+            with self.assertQueriesOk():
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_sleep(0.1)')
+
+    @override_settings(RECIPE_RESPONSE_CACHE_TTL=0)
+    def test_requests_checked(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get(TAGS_URL)
+
+        self.query_max_repeats = 0
+        with self.assertRaisesMessage(AssertionError, 'same shape'):
+            client.get(TAGS_URL)
@@ -0,0 +1,175 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+
+class ServeMediaTests(TestCase):
+    def setUp(self) -> None:
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = self.settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.content = bytes(range(256)) * 4
+        self._write('uploads/variants/ab/abc/160.jpg', self.content)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def _write(self, path, content):
+        full_path = os.path.join(self.media_root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as file:
+            file.write(content)
+
+    def _get(self, path='uploads/variants/ab/abc/160.jpg', **headers):
+        return self.client.get(reverse('media', args=[path]), **headers)
+
+    def test_full_response(self):
+        res = self._get()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), self.content)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Content-Length'], str(len(self.content)))
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', res['Cache-Control'])
+
+    def test_mutable_paths_not_immutable(self):
+        self._write('other/file.txt', b'x')
+
+        res = self._get('other/file.txt')
+
+        self.assertNotIn('immutable', res['Cache-Control'])
+
+    def test_if_none_match(self):
+        etag = self._get()['ETag']
+
+        res = self._get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_if_modified_since(self):
+        last_modified = self._get()['Last-Modified']
+
+        res = self._get(HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_if_modified_since_older(self):
+        res = self._get(HTTP_IF_MODIFIED_SINCE=http_date(0))
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_range(self):
+        res = self._get(HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), self.content[10:20])
+        self.assertEqual(res['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(res['Content-Length'], '10')
+
+    def test_suffix_and_open_ended_ranges(self):
+        suffix = self._get(HTTP_RANGE='bytes=-4')
+        open_ended = self._get(HTTP_RANGE='bytes=1020-')
+
+        self.assertEqual(b''.join(suffix.streaming_content),
+                         self.content[-4:])
+        self.assertEqual(b''.join(open_ended.streaming_content),
+                         self.content[1020:])
+
+    def test_unsatisfiable_range(self):
+        res = self._get(HTTP_RANGE='bytes=2000-')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], 'bytes */1024')
+
+    def test_if_range_mismatch_sends_whole_file(self):
+        res = self._get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_missing_and_escaping_paths(self):
+        self.assertEqual(self._get('uploads/none.jpg').status_code, 404)
+        self.assertEqual(self._get('../etc/passwd').status_code, 404)
+        self.assertEqual(self._get('uploads/variants').status_code, 404)
+
+    @override_settings(RECIPE_IMAGE_UPLOAD_TEMP_DIR='uploads/tmp')
+    def test_upload_temp_dir_not_served(self):
+        self._write('uploads/tmp/x.part', b'partial')
+
+        self.assertEqual(self._get('uploads/tmp/x.part').status_code, 404)
+        for path in ('uploads//tmp/x.part', 'uploads/./tmp/x.part',
+                     'uploads/variants/../tmp/x.part'):
+            self.assertEqual(self._get(path).status_code, 404, path)
+
+    @override_settings(RECIPE_IMAGE_UPLOAD_TEMP_DIR='uploads/tmp')
+    def test_upload_temp_dir_matched_by_component(self):
+        self._write('uploads/tmpfile.jpg', b'image')
+
+        self.assertEqual(self._get('uploads/tmpfile.jpg').status_code, 200)
+
+    def test_post_not_allowed(self):
+        res = self.client.post(
+            reverse('media', args=['uploads/variants/ab/abc/160.jpg'])
+        )
+
+        self.assertEqual(res.status_code, 405)
+
+    def test_precompressed_sidecar(self):
+        self._write('other/data.json', b'{"a": 1}' * 200)
+        call_command('compress_assets', root=[self.media_root],
+                     stdout=StringIO())
+
+        res = self._get('other/data.json', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            gzip.decompress(b''.join(res.streaming_content)),
+            b'{"a": 1}' * 200
+        )
+        self.assertNotEqual(res['ETag'], self._get('other/data.json')['ETag'])
+
+    def test_sidecar_not_accepted(self):
+        self._write('other/data.json', b'{"a": 1}' * 200)
+        call_command('compress_assets', root=[self.media_root],
+                     stdout=StringIO())
+
+        res = self._get('other/data.json', HTTP_ACCEPT_ENCODING='identity')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+        self.assertEqual(res['Content-Length'], '1600')
+
+    def test_stale_sidecar_ignored(self):
+        self._write('other/data.json', b'{"a": 1}' * 200)
+        self._write('other/data.json.gz', gzip.compress(b'old'))
+        os.utime(os.path.join(self.media_root, 'other/data.json.gz'),
+                 ns=(0, 0))
+
+        res = self._get('other/data.json', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+
+class ServeStaticTests(TestCase):
+    def test_serve_static(self):
+        with tempfile.TemporaryDirectory() as static_root, \
+                self.settings(STATIC_ROOT=static_root):
+            with open(os.path.join(static_root, 'app.css'), 'w') as file:
+                file.write('body {}')
+
+            res = self.client.get(reverse('static', args=['app.css']))
+
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(b''.join(res.streaming_content), b'body {}')
+            self.assertEqual(res['Content-Type'], 'text/css')
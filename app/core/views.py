@@ -0,0 +1,182 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, \
+    HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from core.compression import SIDECAR_SUFFIXES, negotiate
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def _etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [
+            tag.strip() for tag in if_none_match.split(',')
+        ]
+    modified_since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+    )
+    return modified_since is not None and int(mtime) <= modified_since
+
+
+def _byte_range(request, etag, size):
+    """
+    ``(start, end)`` of a single satisfiable Range, ``None`` to send the
+    whole file, or ``False`` when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+    if not match or request.META.get('HTTP_IF_RANGE', etag) != etag:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _cache_control(path):
+    if path.startswith(settings.MEDIA_IMMUTABLE_PREFIXES):
+        return 'public, max-age=31536000, immutable'
+    return f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+
+
+def _precompressed(request, full_path, stat):
+    """
+    ``(encoding, path, stat)`` of the up to date sidecar of ``full_path``
+    (written by compress_assets) that the client prefers, else None.
+    """
+    sidecars = {}
+    for encoding in settings.COMPRESSION_ENCODINGS:
+        sidecar = full_path + SIDECAR_SUFFIXES[encoding]
+        try:
+            sidecar_stat = os.stat(sidecar)
+        except OSError:
+            continue
+        if sidecar_stat.st_mtime_ns >= stat.st_mtime_ns:
+            sidecars[encoding] = (encoding, sidecar, sidecar_stat)
+    if not sidecars:
+        return None
+    encoding = negotiate(
+        request.META.get('HTTP_ACCEPT_ENCODING', ''), list(sidecars)
+    )
+    # An empty tuple: nothing acceptable, but the response still varies.
+    return sidecars[encoding] if encoding else ()
+
+
+def _serve_file(request, root, path, cache_control):
+    try:
+        full_path = safe_join(root, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404()
+    if not os.path.isfile(full_path):
+        raise Http404()
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    precompressed = _precompressed(request, full_path, stat)
+    file_path = full_path
+    if precompressed:
+        encoding, file_path, stat = precompressed
+
+    etag = _etag(stat)
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        byte_range = _byte_range(request, etag, stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+        elif byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(file_path, start, end - start + 1), status=206
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = end - start + 1
+        else:
+            response = FileResponse(open(file_path, 'rb'))
+            response['Content-Length'] = stat.st_size
+
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Accept-Ranges'] = 'bytes'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+
+    if precompressed is not None:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def _in_upload_temp_dir(path):
+    """
+    Whether ``path`` under ``MEDIA_ROOT`` lies in the upload temp
+    directory, compared by whole components once both are normalised, so
+    ``uploads//tmp`` and ``uploads/x/../tmp`` count and ``uploads/tmpx``
+    does not.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        return False
+    temp_dir = safe_join(
+        settings.MEDIA_ROOT, settings.RECIPE_IMAGE_UPLOAD_TEMP_DIR
+    )
+    return os.path.commonpath([full_path, temp_dir]) == temp_dir
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file from ``MEDIA_ROOT`` with validators, long-lived caching
+    of never-rewritten paths, single byte-range requests and the
+    precompressed sidecar the client accepts.
+    """
+    if _in_upload_temp_dir(path):
+        raise Http404()
+    return _serve_file(
+        request, settings.MEDIA_ROOT, path, _cache_control(path)
+    )
+
+
+@require_safe
+def serve_static(request, path):
+    """Serve a collected static file the way serve_media does."""
+    return _serve_file(
+        request, settings.STATIC_ROOT, path,
+        f'public, max-age={settings.STATIC_CACHE_MAX_AGE}'
+    )
@@ -0,0 +1,52 @@
+"""
+Gunicorn settings of the production serving profile
+(``gunicorn app.wsgi``, see README.md), overridable through the
+environment.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Processes for CPU parallelism, threads to overlap DB and cache waits.
+# Each thread holds its own persistent DB connection, so Postgres must
+# accept workers * threads connections per app container.
+workers = int(os.environ.get(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1
+))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Recycle workers now and then to bound memory growth; the jitter keeps
+# them from restarting all at once.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+# Each worker flushes its metrics to PERF_METRICS_DIR (see core.metrics);
+# the master folds an exited worker's file into the shared retired totals.
+metrics_dir = os.environ.get('PERF_METRICS_DIR')
+
+
+def on_starting(server):
+    if metrics_dir:
+        from core.metrics import clear_flushed
+        clear_flushed(metrics_dir)
+
+
+def worker_exit(server, worker):
+    if metrics_dir:
+        from core.metrics import flush
+        flush()
+
+
+def child_exit(server, worker):
+    if metrics_dir:
+        from core.metrics import retire_worker
+        retire_worker(metrics_dir, worker.pid)
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class RecipeConfig(AppConfig):
     name = 'recipe'
+
+    def ready(self):
+        # Connects the response cache invalidation, usage counter and search
+        # vector maintenance signal handlers.
+        from recipe import cache, counters, search  # noqa: F401
@@ -0,0 +1,37 @@
+import threading
+from collections import Counter
+
+
+class Batched:
+    """
+    Calls ``apply(changes)`` right away, or, inside ``with batched:``,
+    once when the outermost block exits, with the ``{key: amount}``
+    changes of every call inside it added up. Lets a write that fires
+    several signals update derived data in one query.
+    """
+
+    def __init__(self, apply):
+        self.apply = apply
+        self._local = threading.local()
+
+    def __call__(self, changes):
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            self.apply(changes)
+        else:
+            pending.update(changes)
+
+    def __enter__(self):
+        depth = getattr(self._local, 'depth', 0)
+        if not depth:
+            self._local.pending = Counter()
+        self._local.depth = depth + 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+        pending, self._local.pending = self._local.pending, None
+        if exc_type is None and pending:
+            self.apply(pending)
@@ -0,0 +1,314 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, Value, When, prefetch_related_objects
+from django.dispatch import Signal
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+from rest_framework.response import Response
+
+from recipe.cache import invalidate_user
+
+# Sent by BulkListSerializer after writing, since bulk writes bypass the
+# per-object post_save and m2m_changed signals. ``related`` maps each
+# related model to the pks whose links were added or removed.
+bulk_saved = Signal(providing_args=['instances', 'created', 'related'])
+
+
+def bulk_update(model, instances, changed_fields):
+    """
+    Write ``changed_fields[i]`` of ``instances[i]`` in a single UPDATE with
+    one CASE expression per column (Django 2.1 has no ``bulk_update``).
+    """
+    columns = {}
+    for instance, fields in zip(instances, changed_fields):
+        for name in fields:
+            columns.setdefault(name, []).append(instance)
+    if not columns:
+        return
+
+    updates = {}
+    for name, changed in columns.items():
+        field = model._meta.get_field(name)
+        updates[name] = Case(
+            *[
+                When(pk=instance.pk, then=Value(
+                    getattr(instance, field.attname), output_field=field
+                ))
+                for instance in changed
+            ],
+            default=F(name),
+            output_field=field,
+        )
+    pks = {instance.pk for instance in instances}
+    model.objects.filter(pk__in=pks).update(**updates)
+
+
+def _set_relations(model, instances, relations, replace):
+    """
+    Insert M2M rows straight into the through tables, one query each;
+    returns ``{related model: pks}`` of the rows linked or unlinked.
+    """
+    touched = {}
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        source = field.m2m_field_name() + '_id'
+        target = field.m2m_reverse_field_name() + '_id'
+        changed = [
+            (instance, related[field.name])
+            for instance, related in zip(instances, relations)
+            if field.name in related
+        ]
+        if not changed:
+            continue
+
+        pks = touched.setdefault(field.related_model, set())
+        if replace:
+            old = through.objects.filter(**{
+                f'{source}__in': [instance.pk for instance, _ in changed]
+            })
+            pks.update(old.values_list(target, flat=True))
+            old.delete()
+        pks.update(obj.pk for _, objs in changed for obj in objs)
+        through.objects.bulk_create([
+            through(**{source: instance.pk, target: obj.pk})
+            for instance, objs in changed
+            for obj in set(objs)
+        ])
+    return touched
+
+
+def _parse_pks(model, values):
+    """The valid pks of ``model`` among ``values``, if it is a list."""
+    pks = set()
+    for value in values if isinstance(values, list) else ():
+        try:
+            pks.add(model._meta.pk.to_python(value))
+        except (TypeError, ValueError, ValidationError):
+            pass
+    return pks
+
+
+class PrefetchedManyRelatedField(ManyRelatedField):
+    """Loads every pk of the list in one query before validating them."""
+
+    def to_internal_value(self, data):
+        loaded = self.context.setdefault('related_objects', {})
+        queryset = self.child_relation.get_queryset()
+        if queryset.model not in loaded:
+            loaded[queryset.model] = queryset.in_bulk(
+                _parse_pks(queryset.model, data)
+            )
+        return super().to_internal_value(data)
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Looks pks up in ``context['related_objects']``, loaded by the list
+    field or by a bulk serializer for all items, instead of one query per
+    pk.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return PrefetchedManyRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        loaded = self.context.get('related_objects', {})
+        queryset = self.get_queryset()
+        if queryset.model not in loaded:
+            return super().to_internal_value(data)
+
+        try:
+            pk = queryset.model._meta.pk.to_python(data)
+        except (TypeError, ValueError, ValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in loaded[queryset.model]:
+            self.fail('does_not_exist', pk_value=data)
+        return loaded[queryset.model][pk]
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """Create or update a list of objects with a fixed number of queries."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self._load_related_objects(data)
+        return super().to_internal_value(data)
+
+    def _load_related_objects(self, items):
+        loaded = self.context.setdefault('related_objects', {})
+        for field in self.child.fields.values():
+            relation = getattr(field, 'child_relation', None)
+            if field.read_only or not isinstance(
+                    relation, PrefetchedPrimaryKeyRelatedField):
+                continue
+
+            queryset = relation.get_queryset()
+            pks = set()
+            for item in items:
+                if isinstance(item, dict):
+                    pks |= _parse_pks(
+                        queryset.model, item.get(field.field_name)
+                    )
+            loaded[queryset.model] = queryset.in_bulk(pks)
+
+    def _split(self, validated_data):
+        model = self.child.Meta.model
+        m2m = {field.name for field in model._meta.many_to_many}
+        rows, relations = [], []
+        for attrs in validated_data:
+            relations.append(
+                {name: attrs.pop(name) for name in list(attrs) if name in m2m}
+            )
+            rows.append(attrs)
+        return rows, relations
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        rows, relations = self._split(validated_data)
+        instances = model.objects.bulk_create(
+            [model(**attrs) for attrs in rows]
+        )
+        related = _set_relations(model, instances, relations, replace=False)
+        bulk_saved.send(
+            sender=model, instances=instances, created=True, related=related
+        )
+        self._prefetch_relations(model, instances)
+        return instances
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        rows, relations = self._split(validated_data)
+        for instance, attrs in zip(instances, rows):
+            for name, value in attrs.items():
+                setattr(instance, name, value)
+        bulk_update(model, instances, [list(attrs) for attrs in rows])
+        related = _set_relations(model, instances, relations, replace=True)
+        bulk_saved.send(
+            sender=model, instances=instances, created=False, related=related
+        )
+        self._prefetch_relations(model, instances)
+        return instances
+
+    # noinspection PyMethodMayBeStatic
+    def _prefetch_relations(self, model, instances):
+        """Load the M2M ids rendered in the response, one query each."""
+        for instance in instances:
+            getattr(instance, '_prefetched_objects_cache', {}).clear()
+        prefetch_related_objects(
+            instances, *[field.name for field in model._meta.many_to_many]
+        )
+
+
+class BulkModelMixin:
+    """
+    ``<list>/bulk/`` endpoint taking a JSON array:
+
+    * POST: objects to create,
+    * PATCH: partial objects to update, each with its ``id``,
+    * DELETE: ids to delete.
+
+    Each request runs in one transaction and either applies every item or,
+    if any item is invalid, none; errors are returned as a list aligned
+    with the input.
+    """
+
+    @action(methods=['post', 'patch', 'delete'], detail=False,
+            url_path='bulk')
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'non_field_errors': ['Expected a list of items.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > settings.API_BULK_MAX_ITEMS:
+            return Response(
+                {'non_field_errors': [
+                    f'At most {settings.API_BULK_MAX_ITEMS} items per request.'
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        handler = {
+            'POST': self._bulk_create,
+            'PATCH': self._bulk_update,
+            'DELETE': self._bulk_destroy,
+        }[request.method]
+        with transaction.atomic():
+            response = handler(items)
+        if status.is_success(response.status_code):
+            invalidate_user(request.user.pk)
+        return response
+
+    def _bulk_create(self, items):
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer.save(user=self.request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def _bulk_update(self, items):
+        instances, errors = self._get_bulk_instances(
+            [item.get('id') if isinstance(item, dict) else None
+             for item in items]
+        )
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(
+            instances, data=items, many=True, partial=True
+        )
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer.save()
+        return Response(serializer.data)
+
+    def _bulk_destroy(self, items):
+        instances, errors = self._get_bulk_instances(items)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        self.perform_bulk_destroy(self.get_queryset().filter(
+            pk__in=[instance.pk for instance in instances]
+        ))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    # noinspection PyMethodMayBeStatic
+    def perform_bulk_destroy(self, queryset):
+        queryset.delete()
+
+    def _get_bulk_instances(self, ids):
+        """
+        The user's objects for ``ids``, in order, in one query. An id that
+        is not an integer, not found or repeats an earlier item is an
+        error on that item.
+        """
+        # bool is an int subclass, but True is not an id.
+        def is_id(pk):
+            return isinstance(pk, int) and not isinstance(pk, bool)
+
+        found = self.get_queryset().in_bulk([pk for pk in ids if is_id(pk)])
+
+        instances, errors, seen = [], [], set()
+        for pk in ids:
+            instance = found.get(pk) if is_id(pk) else None
+            instances.append(instance)
+            if instance is None:
+                errors.append({'id': ['Not found.']})
+            elif pk in seen:
+                errors.append({'id': ['Duplicate id.']})
+            else:
+                errors.append({})
+                seen.add(pk)
+        return instances, errors
@@ -0,0 +1,147 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.models import Tag, Ingredient, Recipe
+
+# Query params holding id lists whose order does not change the result.
+ID_LIST_PARAMS = ('tags', 'ingredients')
+
+
+def _cache():
+    return caches[settings.RECIPE_RESPONSE_CACHE]
+
+
+def _version_key(user_id):
+    return f'recipe-response-version:{user_id}'
+
+
+def _new_version():
+    # A version key the cache evicted starts again from a value no earlier
+    # generation had, so the responses cached under those stay orphaned.
+    return time.time_ns()
+
+
+def user_version(user_id) -> int:
+    """Current generation of ``user_id``'s cached responses."""
+    cache = _cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), _new_version(), None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def invalidate_user(user_id):
+    """Orphan every cached response of ``user_id`` in O(1)."""
+    cache = _cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), _new_version(), None)
+
+
+def normalize_query_params(query_params):
+    params = []
+    for name in sorted(query_params):
+        value = query_params.get(name)
+        if name in ID_LIST_PARAMS:
+            value = ','.join(sorted(set(value.split(','))))
+        elif name == 'assigned_only':
+            value = '1' if value not in ('', '0') else '0'
+        params.append(f'{name}={value}')
+    return '&'.join(params)
+
+
+def response_cache_key(request, name):
+    """
+    Key of a cached response to ``request``: per user and generation,
+    renderer, host and normalized query string (hashed, since free text
+    such as ``?search=`` is not a valid key).
+    """
+    user_id = request.user.pk
+    params = normalize_query_params(request.query_params)
+    return ':'.join((
+        'recipe-response',
+        str(user_id),
+        str(user_version(user_id)),
+        name,
+        request.accepted_renderer.format,
+        request.get_host(),
+        hashlib.md5(params.encode()).hexdigest(),
+    ))
+
+
+def etag_matches(etag, if_none_match):
+    """
+    Whether an ``If-None-Match`` header value lists ``etag``, by weak
+    comparison: CompressionMiddleware sends it back with a ``W/`` prefix.
+    """
+    tags = parse_etags(if_none_match)
+    if tags == ['*']:
+        return True
+    return any(
+        (tag[2:] if tag.startswith('W/') else tag) == etag for tag in tags
+    )
+
+
+def get_or_compute(key, ttl, compute):
+    """``compute()``, cached under ``key`` for ``ttl`` seconds if not 0."""
+    if not ttl:
+        return compute()
+    data = _cache().get(key)
+    if data is None:
+        data = compute()
+        _cache().set(key, data, ttl)
+    return data
+
+
+class CachedListMixin:
+    """
+    Serve ``list`` from a per-user cache, with an ETag so clients that
+    already hold the current page get an empty 304.
+
+    The key includes the user's version, so any write to their tags,
+    ingredients or recipes makes every earlier entry (and ETag) stale.
+    """
+
+    def list(self, request, *args, **kwargs):
+        key = response_cache_key(request, self.basename)
+        etag = '"{}"'.format(hashlib.md5(key.encode()).hexdigest())
+
+        if etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = get_or_compute(
+                key, settings.RECIPE_RESPONSE_CACHE_TTL,
+                lambda: super(CachedListMixin, self)
+                .list(request, *args, **kwargs).data
+            )
+            response = Response(data)
+
+        response['ETag'] = etag
+        return response
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def _invalidate_on_write(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def _invalidate_on_m2m_change(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_user(instance.user_id)
@@ -0,0 +1,177 @@
+import threading
+from collections import Counter, defaultdict
+
+from django.db.models import Case, Count, F, IntegerField, OuterRef, \
+    Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import m2m_changed, post_delete, pre_delete
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.batching import Batched
+from recipe.bulk import bulk_saved
+
+# Recipe M2M field counted by each model's ``recipe_count``.
+COUNTED_FIELDS = {Tag: 'tags', Ingredient: 'ingredients'}
+
+
+def _links(model):
+    """The through model and its recipe and ``model`` columns."""
+    field = Recipe._meta.get_field(COUNTED_FIELDS[model])
+    return (
+        field.remote_field.through,
+        field.m2m_field_name() + '_id',
+        field.m2m_reverse_field_name() + '_id',
+    )
+
+
+def adjust_recipe_counts(model, deltas):
+    """
+    Add ``deltas[pk]`` to the ``recipe_count`` of each row, in one atomic
+    UPDATE.
+    """
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(pk)
+    if not by_delta:
+        return
+    increment = Case(
+        *[When(pk__in=pks, then=Value(delta))
+          for delta, pks in by_delta.items()],
+        output_field=IntegerField()
+    )
+    pks = [pk for group in by_delta.values() for pk in group]
+    model.objects.filter(pk__in=pks).update(
+        recipe_count=Greatest(F('recipe_count') + increment, Value(0))
+    )
+
+
+def _apply_count_changes(changes):
+    by_model = defaultdict(dict)
+    for (model, pk), delta in changes.items():
+        by_model[model][pk] = delta
+    for model, deltas in by_model.items():
+        adjust_recipe_counts(model, deltas)
+
+
+# Adds {(model, pk): delta} to recipe counts; inside `with count_updates:`
+# the deltas are summed and applied at the end.
+count_updates = Batched(_apply_count_changes)
+
+
+def refresh_recipe_counts(queryset):
+    """
+    Recount the ``recipe_count`` of the rows of ``queryset`` from the
+    through table; returns how many were out of date.
+    """
+    through, recipe_column, target_column = _links(queryset.model)
+    actual = Coalesce(
+        Subquery(
+            through.objects
+            .filter(**{target_column: OuterRef('pk')})
+            .values(target_column)
+            .annotate(count=Count('*'))
+            .values('count'),
+            output_field=IntegerField()
+        ),
+        Value(0)
+    )
+    return queryset.order_by() \
+        .annotate(actual=actual) \
+        .exclude(recipe_count=F('actual')) \
+        .update(recipe_count=actual)
+
+
+def _linked_counts(model, **filters):
+    through, recipe_column, target_column = _links(model)
+    return Counter(dict(
+        through.objects.filter(**filters)
+        .values(target_column)
+        .annotate(count=Count('*'))
+        .values_list(target_column, 'count')
+    ))
+
+
+# Set while delete_recipes() runs, whose counts are already taken.
+_bulk_delete = threading.local()
+
+
+def delete_recipes(queryset):
+    """
+    Delete the recipes of ``queryset``, taking their links off the recipe
+    counts with one grouped query per counted model, instead of the two
+    queries per recipe the delete signals cost.
+    """
+    pks = list(queryset.values_list('pk', flat=True))
+    with count_updates:
+        for model in COUNTED_FIELDS:
+            recipe_column = _links(model)[1]
+            removed = _linked_counts(model, **{f'{recipe_column}__in': pks})
+            count_updates({
+                (model, pk): -count for pk, count in removed.items()
+            })
+        _bulk_delete.active = True
+        try:
+            return Recipe.objects.filter(pk__in=pks).delete()
+        finally:
+            _bulk_delete.active = False
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def _relations_changed(sender, instance, action, reverse, model, pk_set,
+                       **kwargs):
+    counted = type(instance) if reverse else model
+    through, recipe_column, target_column = _links(counted)
+    if reverse:
+        own_column, other_column = target_column, recipe_column
+    else:
+        own_column, other_column = recipe_column, target_column
+
+    if action == 'post_add':
+        # Django only reports the rows it actually inserted.
+        if reverse:
+            count_updates({(counted, instance.pk): len(pk_set)})
+        else:
+            count_updates({(counted, pk): 1 for pk in pk_set})
+    elif action in ('pre_remove', 'pre_clear'):
+        # remove() reports every pk it was given, linked or not.
+        filters = {own_column: instance.pk}
+        if action == 'pre_remove':
+            filters[f'{other_column}__in'] = pk_set
+        instance._recipe_count_removed = _linked_counts(counted, **filters)
+    elif action in ('post_remove', 'post_clear'):
+        removed = instance._recipe_count_removed
+        count_updates({
+            (counted, pk): -count for pk, count in removed.items()
+        })
+
+
+@receiver(pre_delete, sender=Recipe)
+def _recipe_deleting(sender, instance, **kwargs):
+    if getattr(_bulk_delete, 'active', False):
+        return
+    # The through rows are gone by post_delete.
+    instance._recipe_count_removed = {
+        model: _linked_counts(model, **{_links(model)[1]: instance.pk})
+        for model in COUNTED_FIELDS
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def _recipe_deleted(sender, instance, **kwargs):
+    if getattr(_bulk_delete, 'active', False):
+        return
+    count_updates({
+        (model, pk): -count
+        for model, removed in instance._recipe_count_removed.items()
+        for pk, count in removed.items()
+    })
+
+
+@receiver(bulk_saved, sender=Recipe)
+def _recipes_bulk_saved(sender, instances, related=None, **kwargs):
+    for model, pks in (related or {}).items():
+        if model in COUNTED_FIELDS and pks:
+            refresh_recipe_counts(model.objects.filter(pk__in=pks))
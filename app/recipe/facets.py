@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, \
+    Func, IntegerField, Value
+
+from core.models import Recipe
+
+
+class Floor(Func):
+    function = 'FLOOR'
+    output_field = IntegerField()
+
+
+def related_counts(recipes, field_name):
+    """
+    ``[{id, name, count}]`` of the tags or ingredients (``field_name``) of
+    ``recipes``, most used first, aggregated on the through table.
+    """
+    field = Recipe._meta.get_field(field_name)
+    recipe_column = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    rows = field.remote_field.through.objects \
+        .filter(**{f'{recipe_column}__in': recipes.values('id')}) \
+        .values(target, f'{target}__name') \
+        .annotate(count=Count('*')) \
+        .order_by('-count', f'{target}__name', target)
+    return [
+        {'id': row[target], 'name': row[f'{target}__name'],
+         'count': row['count']}
+        for row in rows
+    ]
+
+
+def histogram(recipes, field_name, width):
+    """
+    ``[{min, max, count}]`` of the non-empty ``[min, max)`` buckets of
+    ``width`` that ``field_name`` falls into.
+    """
+    bucket = Floor(ExpressionWrapper(
+        F(field_name) / Value(Decimal(width)),
+        output_field=DecimalField()
+    ))
+    rows = recipes.order_by() \
+        .annotate(bucket=bucket) \
+        .values('bucket') \
+        .annotate(count=Count('id')) \
+        .order_by('bucket')
+    return [
+        {'min': row['bucket'] * width, 'max': (row['bucket'] + 1) * width,
+         'count': row['count']}
+        for row in rows
+    ]
+
+
+def recipe_facets(recipes, price_width: Decimal, time_width: int):
+    """Counts for filter UIs over ``recipes``, one query per facet."""
+    recipes = recipes.order_by()
+    return {
+        'count': recipes.count(),
+        'tags': related_counts(recipes, 'tags'),
+        'ingredients': related_counts(recipes, 'ingredients'),
+        'price': [
+            dict(bucket, min=str(bucket['min']), max=str(bucket['max']))
+            for bucket in histogram(recipes, 'price', price_width)
+        ],
+        'time_minutes': histogram(recipes, 'time_minutes', time_width),
+    }
@@ -0,0 +1,267 @@
+import datetime
+import hashlib
+import io
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.models import Recipe
+from recipe.cache import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+# EXIF orientation tag value -> transposes that make the image upright.
+EXIF_ORIENTATION = 0x0112
+ORIENTATION_TRANSPOSES = {
+    2: (Image.FLIP_LEFT_RIGHT,),
+    3: (Image.ROTATE_180,),
+    4: (Image.FLIP_TOP_BOTTOM,),
+    5: (Image.ROTATE_270, Image.FLIP_LEFT_RIGHT),
+    6: (Image.ROTATE_270,),
+    7: (Image.ROTATE_90, Image.FLIP_LEFT_RIGHT),
+    8: (Image.ROTATE_90,),
+}
+
+VARIANT_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_widths(image_width: int):
+    """Widths of the variants of an image ``image_width`` pixels wide."""
+    widths = [
+        width for width in settings.RECIPE_IMAGE_VARIANT_WIDTHS
+        if width < image_width
+    ]
+    return widths + [image_width]
+
+
+def variant_name(image_hash: str, width: int, image_format: str) -> str:
+    """
+    Storage name of a variant. Names are derived from the source content,
+    so identical uploads share their variants and a name never changes
+    content.
+    """
+    return os.path.join(
+        settings.RECIPE_IMAGE_VARIANT_DIR, image_hash[:2], image_hash,
+        f'{width}.{VARIANT_EXTENSIONS[image_format]}'
+    )
+
+
+def variant_names(image_hash: str, image_width: int):
+    """``{format: {width: name}}`` of every variant of an image."""
+    return {
+        image_format: {
+            width: variant_name(image_hash, width, image_format)
+            for width in variant_widths(image_width)
+        }
+        for image_format in settings.RECIPE_IMAGE_VARIANT_FORMATS
+    }
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-image'
+            )
+        return _executor
+
+
+def enqueue(recipe: Recipe):
+    """
+    Process ``recipe``'s freshly stored upload in the worker pool once the
+    current transaction commits, since workers read the recipe through
+    their own database connection; or right away, inline, when
+    ``RECIPE_IMAGE_WORKERS`` is 0.
+
+    The pool only lives as long as this process: process_pending_images
+    picks up the uploads a restarted worker dropped.
+    """
+    if settings.RECIPE_IMAGE_WORKERS <= 0:
+        process_image(recipe.pk, recipe.image.name)
+        return
+    job = (recipe.pk, recipe.image.name)
+    transaction.on_commit(lambda: _get_executor().submit(_run_job, *job))
+
+
+def process_stale(older_than: float) -> int:
+    """
+    Process, inline, the uploads that have been pending or processing for
+    over ``older_than`` seconds, e.g. because the worker that had them was
+    restarted. Returns how many were picked up.
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=older_than)
+    stale = Recipe.objects.filter(
+        image_status__in=(Recipe.IMAGE_PENDING, Recipe.IMAGE_PROCESSING)
+    ).values_list('pk', 'image')
+    resumed = 0
+    for recipe_id, name in stale:
+        try:
+            if default_storage.get_modified_time(name) > cutoff:
+                continue
+        except (NotImplementedError, OSError):
+            pass
+        # A job that died half way leaves the recipe processing.
+        Recipe.objects.filter(
+            pk=recipe_id, image=name, image_status=Recipe.IMAGE_PROCESSING
+        ).update(image_status=Recipe.IMAGE_PENDING)
+        process_image(recipe_id, name)
+        resumed += 1
+    return resumed
+
+
+def _run_job(recipe_id, name):
+    close_old_connections()
+    try:
+        process_image(recipe_id, name)
+    finally:
+        close_old_connections()
+
+
+def fix_orientation(image: Image.Image) -> Image.Image:
+    """Apply the EXIF orientation, which the re-encoded file drops."""
+    try:
+        exif = image._getexif() or {}
+    except (AttributeError, KeyError, IndexError, TypeError, ValueError):
+        exif = {}
+    for method in ORIENTATION_TRANSPOSES.get(exif.get(EXIF_ORIENTATION), ()):
+        image = image.transpose(method)
+    return image
+
+
+def to_rgb(image: Image.Image) -> Image.Image:
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    return image.convert('RGB')
+
+
+def encode(image: Image.Image, image_format: str) -> ContentFile:
+    buffer = io.BytesIO()
+    if image_format == 'JPEG':
+        options = {'optimize': True, 'progressive': True}
+    else:
+        options = {'method': 4}
+    image.save(
+        buffer, format=image_format,
+        quality=settings.RECIPE_IMAGE_QUALITY, **options
+    )
+    return ContentFile(buffer.getvalue())
+
+
+def content_hash(file) -> str:
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def _claim(recipe_id, name, status):
+    """Move the recipe to ``status`` unless its image was replaced."""
+    return Recipe.objects.filter(pk=recipe_id, image=name) \
+        .update(image_status=status)
+
+
+def _write_variant(name: str, content: ContentFile):
+    """
+    Write ``content`` under a temporary name beside ``name``, then rename
+    it into place: another process never sees a half-written variant as
+    finished, and two processes writing the same variant do not end up
+    with a second, suffixed copy.
+    """
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(temp_path, 'wb') as file:
+            file.write(content.read())
+        if default_storage.file_permissions_mode is not None:
+            os.chmod(temp_path, default_storage.file_permissions_mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def write_variants(image: Image.Image, image_hash: str):
+    """
+    Write every missing variant of ``image``; returns the name of the
+    full-width JPEG, which becomes the recipe's image.
+    """
+    names = variant_names(image_hash, image.width)
+    for image_format, by_width in names.items():
+        for width, name in by_width.items():
+            if default_storage.exists(name):
+                continue
+            variant = image
+            if width < image.width:
+                variant = image.resize(
+                    (width, max(1, round(image.height * width / image.width))),
+                    Image.LANCZOS
+                )
+            _write_variant(name, encode(variant, image_format))
+    return variant_name(image_hash, image.width, 'JPEG')
+
+
+def process_image(recipe_id, name):
+    """
+    Decode the stored upload ``name``, make it upright, cap it at
+    ``RECIPE_IMAGE_MAX_SIZE`` and write its variants, then point the
+    recipe at the full-width JPEG one and drop the upload.
+    """
+    # Only a pending upload is claimed, so a job enqueued twice runs once.
+    if not Recipe.objects.filter(
+            pk=recipe_id, image=name, image_status=Recipe.IMAGE_PENDING
+    ).update(image_status=Recipe.IMAGE_PROCESSING):
+        return
+
+    try:
+        with default_storage.open(name) as source:
+            image_hash = content_hash(source)
+            image = Image.open(source)
+            image.load()
+        image = to_rgb(fix_orientation(image))
+
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        processed_name = write_variants(image, image_hash)
+    except Exception:
+        logger.exception('Processing image %s of recipe %s failed',
+                         name, recipe_id)
+        _claim(recipe_id, name, Recipe.IMAGE_FAILED)
+        _invalidate(recipe_id)
+        return
+
+    # Variants are shared by content, so they stay even if the recipe's
+    # image was replaced while we were working.
+    updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image=processed_name, image_hash=image_hash,
+        image_width=image.width, image_status=Recipe.IMAGE_READY
+    )
+    if updated:
+        default_storage.delete(name)
+        _invalidate(recipe_id)
+
+
+def _invalidate(recipe_id):
+    user_id = Recipe.objects.filter(pk=recipe_id) \
+        .values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate_user(user_id)
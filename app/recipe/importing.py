@@ -0,0 +1,206 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+
+from core.fastjson import orjson
+from core.models import Tag, Ingredient, Recipe
+
+# Separates the tag and ingredient names of a CSV cell.
+NAME_SEPARATOR = '|'
+
+# Recipe M2M field of each model whose names an import resolves.
+NAME_FIELDS = {Tag: 'tags', Ingredient: 'ingredients'}
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+class InvalidRow(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f'Line {line}: {message}')
+
+
+def _text(line, row, name, required=True):
+    value = row.get(name)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise InvalidRow(line, f'{name} is required.')
+    if len(value) > 255:
+        raise InvalidRow(line, f'{name} is longer than 255 characters.')
+    # Postgres text cannot hold NUL, and COPY would fail on it later,
+    # without the line number.
+    if '\0' in value:
+        raise InvalidRow(line, f'{name} contains a NUL character.')
+    return value
+
+
+def _names(line, row, name):
+    names = row.get(name) or []
+    if isinstance(names, str):
+        names = names.split(NAME_SEPARATOR)
+    elif not isinstance(names, list):
+        raise InvalidRow(line, f'{name} must be a list of names.')
+    names = [str(value).strip() for value in names]
+    if any(len(value) > 255 for value in names):
+        raise InvalidRow(line, f'{name} has a name over 255 characters.')
+    if any('\0' in value for value in names):
+        raise InvalidRow(line, f'{name} has a name with a NUL character.')
+    return list(dict.fromkeys(value for value in names if value))
+
+
+def parse_row(line, row):
+    """
+    ``(title, time_minutes, price, link, tag names, ingredient names)``
+    of a recipe record, validated as the Recipe columns require.
+    """
+    if not isinstance(row, dict):
+        raise InvalidRow(line, 'Expected an object.')
+    try:
+        time_minutes = int(row.get('time_minutes'))
+    except (TypeError, ValueError):
+        raise InvalidRow(line, 'time_minutes must be an integer.')
+    if not -2 ** 31 <= time_minutes < 2 ** 31:
+        raise InvalidRow(line, 'time_minutes is out of range.')
+    try:
+        price = Decimal(str(row.get('price'))).quantize(Decimal('0.01'))
+        if not price.is_finite():
+            raise InvalidRow(line, 'price must be a number.')
+    except InvalidOperation:
+        raise InvalidRow(line, 'price must be a number.')
+    if not abs(price) < 1000:
+        raise InvalidRow(line, 'price must be under 1000.')
+    return (
+        _text(line, row, 'title'),
+        time_minutes,
+        price,
+        _text(line, row, 'link', required=False),
+        _names(line, row, 'tags'),
+        _names(line, row, 'ingredients'),
+    )
+
+
+def read_csv(file):
+    """
+    Recipe rows of a CSV file with a header line, with the tag and
+    ingredient names of a cell separated by ``NAME_SEPARATOR``.
+    """
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield parse_row(reader.line_num, row)
+
+
+def read_ndjson(file):
+    """
+    Recipe rows of an NDJSON file: recipe objects with tag and ingredient
+    names, or the typed lines of the account export, whose recipes refer
+    to the tags and ingredients before them by id.
+    """
+    exported = {'tag': {}, 'ingredient': {}}
+    for line, text in enumerate(file, 1):
+        if not text.strip():
+            continue
+        try:
+            row = _loads(text)
+        except ValueError:
+            raise InvalidRow(line, 'Invalid JSON.')
+        if isinstance(row, dict) and 'type' in row:
+            data = row.get('data') or {}
+            if not isinstance(data, dict):
+                raise InvalidRow(line, 'data must be an object.')
+            if row['type'] in exported:
+                exported[row['type']][data.get('id')] = data.get('name')
+                continue
+            if row['type'] != 'recipe':
+                raise InvalidRow(line, f'Unknown type {row["type"]}.')
+            row = dict(data)
+            for name, names in (('tags', exported['tag']),
+                                ('ingredients', exported['ingredient'])):
+                try:
+                    row[name] = [names[pk] for pk in row.get(name) or []]
+                except (KeyError, TypeError):
+                    raise InvalidRow(line, f'Unknown {name} id.')
+        yield parse_row(line, row)
+
+
+class NameResolver:
+    """
+    Ids of a user's tags or ingredients by name, creating the missing
+    ones in bulk. Names that are already taken by several rows resolve
+    to the oldest.
+    """
+
+    def __init__(self, model, user):
+        self.model = model
+        self.user = user
+        self.created = 0
+        self._ids = dict(
+            model.objects.filter(user=user).order_by('-id')
+            .values_list('name', 'id')
+        )
+
+    def create_missing(self, names):
+        """Create the ``names`` not known yet, in one INSERT."""
+        missing = [name for name in dict.fromkeys(names)
+                   if name not in self._ids]
+        if missing:
+            objects = self.model.objects.bulk_create([
+                self.model(user=self.user, name=name) for name in missing
+            ])
+            self._ids.update((obj.name, obj.pk) for obj in objects)
+            self.created += len(objects)
+
+    def ids(self, names):
+        return [self._ids[name] for name in names]
+
+
+def _copy(cursor, table, columns, rows):
+    content = io.StringIO()
+    csv.writer(content, quoting=csv.QUOTE_ALL).writerows(rows)
+    content.seek(0)
+    cursor.copy_expert(
+        f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+        content
+    )
+
+
+def load_batch(user_id, records):
+    """
+    Insert ``records`` of ``(title, time_minutes, price, link, tag ids,
+    ingredient ids)`` for ``user_id`` with COPY, in one transaction, and
+    fill in their search vectors. Recipe ids come from the table's
+    sequence up front, so the links are copied in the same round.
+    Returns the number of recipes.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+            'FROM generate_series(1, %s)',
+            [Recipe._meta.db_table, 'id', len(records)]
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        _copy(
+            cursor, Recipe._meta.db_table,
+            ('id', 'user_id', 'title', 'time_minutes', 'price', 'link',
+             'image_status', 'image_hash'),
+            (
+                (pk, user_id, title, time_minutes, price, link, '', '')
+                for pk, (title, time_minutes, price, link, _, _)
+                in zip(ids, records)
+            )
+        )
+        # The tag and ingredient ids follow the four recipe columns.
+        for position, field_name in enumerate(NAME_FIELDS.values(), 4):
+            field = Recipe._meta.get_field(field_name)
+            _copy(
+                cursor, field.remote_field.through._meta.db_table,
+                (field.m2m_column_name(), field.m2m_reverse_name()),
+                (
+                    (pk, related_id)
+                    for pk, record in zip(ids, records)
+                    for related_id in set(record[position])
+                )
+            )
+        Recipe.objects.filter(pk__in=ids).update_search_vectors()
+    return len(ids)
@@ -0,0 +1,96 @@
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare creating N objects one request at a time against one '
+        'bulk request. Runs inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000)
+        parser.add_argument(
+            '--endpoint', choices=('tags', 'ingredients', 'recipes'),
+            default='ingredients'
+        )
+
+    def handle(self, *args, **options):
+        endpoint = options['endpoint']
+        basename = {
+            'tags': 'tag', 'ingredients': 'ingredient', 'recipes': 'recipe'
+        }[endpoint]
+
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                f'bench-bulk-{uuid.uuid4()}@bench.invalid', uuid.uuid4().hex
+            )
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(user)
+            payload = self._payload(user, endpoint, options['items'])
+
+            per_object = self._run(lambda: [
+                client.post(
+                    reverse(f'recipe:{basename}-list'), item, format='json'
+                )
+                for item in payload
+            ])
+            bulk = self._run(lambda: client.post(
+                reverse(f'recipe:{basename}-bulk'), payload, format='json'
+            ))
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{options["items"]} {endpoint}')
+        self.stdout.write(
+            f'{"mode":<12}{"seconds":>10}{"items/s":>12}{"queries":>10}'
+        )
+        for mode, (seconds, queries) in (('per-object', per_object),
+                                         ('bulk', bulk)):
+            self.stdout.write(
+                f'{mode:<12}{seconds:>10.3f}'
+                f'{options["items"] / seconds:>12.0f}{queries:>10}'
+            )
+
+    # noinspection PyMethodMayBeStatic
+    def _payload(self, user, endpoint, items):
+        if endpoint != 'recipes':
+            return [{'name': f'{endpoint} {n}'} for n in range(items)]
+
+        tags = [Tag.objects.create(user=user, name=f't{n}') for n in range(5)]
+        ingredients = [
+            Ingredient.objects.create(user=user, name=f'i{n}')
+            for n in range(10)
+        ]
+        return [
+            {
+                'title': f'recipe {n}',
+                'time_minutes': n % 120,
+                'price': '9.99',
+                'tags': [tags[n % 5].id],
+                'ingredients': [i.id for i in ingredients[:n % 10]],
+            }
+            for n in range(items)
+        ]
+
+    # noinspection PyMethodMayBeStatic
+    def _run(self, func):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            func()
+            seconds = time.perf_counter() - started
+        return seconds, queries
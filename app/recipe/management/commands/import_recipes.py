@@ -0,0 +1,166 @@
+import contextlib
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from recipe.cache import invalidate_user
+from recipe.counters import refresh_recipe_counts
+from recipe.importing import NAME_FIELDS, InvalidRow, NameResolver, \
+    load_batch, read_csv, read_ndjson
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+class Command(BaseCommand):
+    help = (
+        'Import recipes for --user from a CSV or NDJSON file ("-" for '
+        'stdin), e.g. an account export. Tags and ingredients are matched '
+        'by name and created when missing. Recipes and their links are '
+        'loaded with COPY, --batch-size at a time, by --workers processes; '
+        'each batch is committed on its own.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='Owner email.')
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Default: csv for .csv files, ndjson otherwise.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--workers', type=int, default=min(4, os.cpu_count() or 1),
+            help='0 loads the batches in this process.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 0:
+            raise CommandError(
+                '--batch-size must be positive and --workers not negative.'
+            )
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user {options["user"]}.')
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'ndjson'
+        )
+
+        if path == '-':
+            file = contextlib.nullcontext(sys.stdin)
+        else:
+            try:
+                file = open(path, newline='', encoding='utf-8')
+            except OSError as exc:
+                raise CommandError(exc)
+        with file as lines:
+            self._import(user, READERS[file_format](lines), options)
+
+    def _import(self, user, rows, options):
+        resolvers = [NameResolver(model, user) for model in NAME_FIELDS]
+        pool = None
+        if options['workers']:
+            # Fork the workers while no connection is open, so each one
+            # opens its own.
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(
+                options['workers']
+            )
+
+        started = last_report = time.perf_counter()
+        imported = 0
+        error = None
+        pending = deque()
+        try:
+            try:
+                while True:
+                    try:
+                        batch = list(
+                            itertools.islice(rows, options['batch_size'])
+                        )
+                    except InvalidRow as exc:
+                        error = exc
+                        break
+                    if not batch:
+                        break
+                    records = self._resolve(batch, resolvers)
+                    if pool is None:
+                        imported += load_batch(user.pk, records)
+                    else:
+                        pending.append(
+                            pool.apply_async(load_batch, (user.pk, records))
+                        )
+                        # Keep every worker busy without reading ahead of
+                        # them.
+                        while len(pending) > 2 * options['workers']:
+                            imported += pending.popleft().get()
+                    if time.perf_counter() - last_report >= 1:
+                        last_report = time.perf_counter()
+                        self._report(imported, started)
+                while pending:
+                    imported += pending.popleft().get()
+            except Exception as exc:
+                error = error or exc
+                # The batches the workers already have commit on their own.
+                imported += self._drain(pending)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            if pool is not None or imported:
+                for model in NAME_FIELDS:
+                    refresh_recipe_counts(model.objects.filter(user=user))
+                invalidate_user(user.pk)
+
+        if error is not None:
+            raise CommandError(
+                f'{error} {imported} recipes of the other batches were '
+                f'imported.'
+            )
+        created = ', '.join(
+            f'{resolver.created} {resolver.model._meta.verbose_name_plural}'
+            for resolver in resolvers
+        )
+        self._report(imported, started)
+        self.stdout.write(f'Done; created {created}.')
+
+    # noinspection PyMethodMayBeStatic
+    def _drain(self, pending):
+        """Wait for the ``pending`` batches; the recipes of those loaded."""
+        loaded = 0
+        while pending:
+            try:
+                loaded += pending.popleft().get()
+            except Exception:
+                pass
+        return loaded
+
+    # noinspection PyMethodMayBeStatic
+    def _resolve(self, batch, resolvers):
+        """The rows of ``batch`` with tag and ingredient ids for names."""
+        for position, resolver in enumerate(resolvers, 4):
+            resolver.create_missing(itertools.chain.from_iterable(
+                row[position] for row in batch
+            ))
+        return [
+            row[:4] + tuple(
+                resolver.ids(row[position])
+                for position, resolver in enumerate(resolvers, 4)
+            )
+            for row in batch
+        ]
+
+    def _report(self, imported, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{imported} recipes in {elapsed:.1f}s '
+            f'({imported / max(elapsed, 1e-9):.0f} rows/s)'
+        )
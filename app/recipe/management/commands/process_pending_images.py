@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recipe import images
+
+
+class Command(BaseCommand):
+    help = (
+        'Process the recipe image uploads that have been pending or '
+        'processing for over --older-than seconds, e.g. because the worker '
+        'pool that had them was restarted. Run it before starting the '
+        'workers with --older-than 0.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=float, default=600)
+
+    def handle(self, *args, **options):
+        processed = images.process_stale(options['older_than'])
+        self.stdout.write(f'{processed} images processed')
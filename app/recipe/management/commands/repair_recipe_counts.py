@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipe.counters import COUNTED_FIELDS, refresh_recipe_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount the recipe_count of every tag and ingredient from the '
+        'recipe links and fix the rows that drifted, e.g. after raw SQL '
+        'writes that bypassed the signal handlers.'
+    )
+
+    def handle(self, *args, **options):
+        for model in COUNTED_FIELDS:
+            fixed = refresh_recipe_counts(model.objects.all())
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {fixed} fixed'
+            )
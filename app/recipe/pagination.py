@@ -0,0 +1,178 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+Cursor = namedtuple('Cursor', ['reverse', 'position'])
+
+
+def _reverse_ordering(ordering):
+    return tuple(
+        field[1:] if field.startswith('-') else '-' + field
+        for field in ordering
+    )
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a composite key, e.g. ``('-name', 'id')``.
+
+    The cursor carries the full sort key of the row at the page boundary,
+    so every page is a ``WHERE (key) > (position) ... LIMIT n`` range scan
+    and deep pages cost the same as the first one.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request, queryset)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = _reverse_ordering(self.ordering) \
+            if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                self._after_position(ordering, self.cursor.position)
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_page_size(self, request):
+        page_size = settings.API_PAGE_SIZE
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+
+        if requested > 0:
+            return min(requested, settings.API_MAX_PAGE_SIZE)
+        return page_size
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(getattr(view, 'ordering', None) or self.ordering)
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            # The key must be unique for the position to be unambiguous.
+            ordering += ('id',)
+        return ordering
+
+    # noinspection PyMethodMayBeStatic
+    def _after_position(self, ordering, position):
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clause = Q(**{f'{name}__{lookup}': position[index]})
+            for previous, value in zip(ordering[:index], position):
+                clause &= Q(**{previous.lstrip('-'): value})
+            condition |= clause
+        return condition
+
+    def _get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            if isinstance(instance, dict):
+                value = instance[name]
+            else:
+                value = getattr(instance, name)
+            position.append(None if value is None else str(value))
+        return position
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            cursor = Cursor(
+                reverse=bool(payload['r']),
+                position=list(payload['p'])
+            )
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if len(cursor.position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # The values go straight into the WHERE clause: parse them as the
+        # ordering columns' types so a tampered cursor is a 404, not a 500.
+        position = []
+        for field, value in zip(self.ordering, cursor.position):
+            try:
+                value = self._ordering_field(queryset, field).to_python(value)
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            # Postgres text cannot hold NUL either.
+            if value is None or isinstance(value, str) and '\0' in value:
+                raise NotFound(self.invalid_cursor_message)
+            position.append(value)
+        return cursor._replace(position=position)
+
+    # noinspection PyMethodMayBeStatic
+    def _ordering_field(self, queryset, field):
+        """The model field or annotation ``field`` sorts on."""
+        name = field.lstrip('-')
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        if name == 'pk':
+            return queryset.model._meta.pk
+        return queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, cursor):
+        payload = json.dumps({'r': int(cursor.reverse), 'p': cursor.position})
+        encoded = urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(
+            Cursor(reverse=False, position=self._get_position(self.page[-1]))
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(
+            Cursor(reverse=True, position=self._get_position(self.page[0]))
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
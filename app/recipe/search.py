@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+    pre_delete
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.batching import Batched
+from recipe.bulk import bulk_saved
+
+# Recipe M2M field linking to each searchable related model.
+RELATION_FIELDS = {Tag: 'tags', Ingredient: 'ingredients'}
+
+
+def search_recipes(queryset, text: str):
+    """
+    Recipes of ``queryset`` matching every word of ``text``, annotated with
+    their ``rank``.
+
+    The rank is cast to double precision so that it round-trips exactly
+    through a pagination cursor.
+    """
+    query = SearchQuery(text, config=settings.RECIPE_SEARCH_CONFIG)
+    return queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+    )
+
+
+def _update(recipe_ids):
+    Recipe.objects.filter(pk__in=recipe_ids).update_search_vectors()
+
+
+# Recomputes the search vectors of recipe ids; inside `with vector_updates:`
+# each recipe is updated once, at the end.
+vector_updates = Batched(_update)
+
+
+def _linked_recipe_ids(related_model, related):
+    field_name = RELATION_FIELDS[related_model]
+    return Recipe.objects.filter(**{f'{field_name}__in': related}) \
+        .values_list('pk', flat=True)
+
+
+@receiver(post_save, sender=Recipe)
+def _recipe_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'title' in update_fields:
+        vector_updates([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def _name_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or 'name' in update_fields):
+        vector_updates(_linked_recipe_ids(sender, [instance]))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def _name_deleting(sender, instance, **kwargs):
+    # The through rows are gone by post_delete.
+    instance._search_recipe_ids = list(
+        _linked_recipe_ids(sender, [instance])
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def _name_deleted(sender, instance, **kwargs):
+    if instance._search_recipe_ids:
+        vector_updates(instance._search_recipe_ids)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def _relations_changed(sender, instance, action, reverse, model, pk_set,
+                       **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            vector_updates([instance.pk])
+    elif action == 'pre_clear':
+        instance._search_recipe_ids = list(
+            _linked_recipe_ids(type(instance), [instance])
+        )
+    elif action == 'post_clear':
+        vector_updates(instance._search_recipe_ids)
+    elif action in ('post_add', 'post_remove'):
+        vector_updates(pk_set)
+
+
+@receiver(bulk_saved, sender=Recipe)
+def _recipes_bulk_saved(sender, instances, **kwargs):
+    vector_updates([instance.pk for instance in instances])
+
+
+@receiver(bulk_saved, sender=Tag)
+@receiver(bulk_saved, sender=Ingredient)
+def _names_bulk_saved(sender, instances, created, **kwargs):
+    if not created:
+        vector_updates(_linked_recipe_ids(sender, instances))
@@ -1,7 +1,11 @@
-from PIL import ImageSequence
+from PIL import Image, ImageSequence
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
 from core.models import Tag, Ingredient, Recipe
+from recipe.bulk import BulkListSerializer, PrefetchedPrimaryKeyRelatedField
+from recipe.images import variant_names
+from recipe.uploads import HeaderOnlyImageField
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -9,6 +13,7 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ('id', 'name')
         read_only = ('id',)
+        list_serializer_class = BulkListSerializer
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -16,25 +21,79 @@ class IngredientSerializer(serializers.ModelSerializer):
         model = Ingredient
         fields = ('id', 'name')
         read_only = ('id',)
+        list_serializer_class = BulkListSerializer
+
+
+class SrcsetField(serializers.Field):
+    """
+    ``{mime type: srcset}`` of the processed image's variants, for
+    ``<source type=... srcset=...>``; empty until processing is done.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image_hash or recipe.image_status != Recipe.IMAGE_READY:
+            return {}
+
+        request = self.context.get('request')
+        # Image.MIME only lists the formats of the plugins loaded so far.
+        Image.init()
+        srcset = {}
+        names = variant_names(recipe.image_hash, recipe.image_width)
+        for image_format, by_width in names.items():
+            candidates = []
+            for width, name in by_width.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                candidates.append(f'{url} {width}w')
+            srcset[Image.MIME[image_format]] = ', '.join(candidates)
+        return srcset
 
 
 class RecipeSerializer(serializers.ModelSerializer):
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = PrefetchedPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = PrefetchedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
+    srcset = SrcsetField()
+
+    # Relations that ``include`` renders as objects instead of ids.
+    nested_serializers = {
+        'ingredients': IngredientSerializer,
+        'tags': TagSerializer,
+    }
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'title', 'time_minutes',
-            'price', 'link', 'ingredients', 'tags'
+            'price', 'link', 'ingredients', 'tags', 'srcset'
         )
         read_only = ('id',)
+        list_serializer_class = BulkListSerializer
+
+    def __init__(self, *args, fields=None, include=(), **kwargs):
+        """
+        ``fields`` limits the output to those fields; the relations in
+        ``include`` are rendered as ``{id, name}`` objects.
+        """
+        super().__init__(*args, **kwargs)
+        for name in include:
+            self.fields[name] = self.nested_serializers[name](
+                many=True, read_only=True
+            )
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -44,14 +103,19 @@ class RecipeDetailSerializer(RecipeSerializer):
     class Meta:
         model = Recipe
         fields = (
-            'id', 'title', 'time_minutes',
-            'price', 'link', 'ingredients', 'tags', 'image'
+            'id', 'title', 'time_minutes', 'price', 'link', 'ingredients',
+            'tags', 'image', 'image_status', 'srcset'
         )
         read_only = ('id',)
+        read_only_fields = ('image_status',)
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
+    image = HeaderOnlyImageField()
+    srcset = SrcsetField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'image_status', 'srcset')
         read_only = ('id',)
+        read_only_fields = ('image_status',)
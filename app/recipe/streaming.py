@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+
+from core.fastjson import FastJSONRenderer
+
+# ?stream= values -> content type of the response.
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+_renderer = FastJSONRenderer()
+
+
+def batches(queryset, size):
+    """
+    Lists of up to ``size`` objects of ``queryset``, read through a
+    server-side cursor. ``iterator()`` drops prefetch_related, so its
+    lookups run once per batch instead.
+    """
+    lookups = queryset._prefetch_related_lookups
+    batch = []
+    for obj in queryset.prefetch_related(None).iterator(chunk_size=size):
+        batch.append(obj)
+        if len(batch) == size:
+            prefetch_related_objects(batch, *lookups)
+            yield batch
+            batch = []
+    if batch:
+        prefetch_related_objects(batch, *lookups)
+        yield batch
+
+
+def json_array(pages):
+    """One JSON array, in a chunk per list of items of ``pages``."""
+    yield b'['
+    separator = b''
+    for items in pages:
+        if items:
+            yield separator + _renderer.render(items)[1:-1]
+            separator = b','
+    yield b']'
+
+
+def ndjson(pages):
+    """A JSON document per line, in a chunk per list of ``pages``."""
+    for items in pages:
+        yield b''.join(_renderer.render(item) + b'\n' for item in items)
+
+
+def stream_serialized(queryset, serialize, stream_format='json'):
+    """
+    A streaming response of ``queryset``, serialized a batch of
+    ``API_STREAM_BATCH_SIZE`` objects at a time by ``serialize(objects)``.
+    """
+    pages = (
+        serialize(batch)
+        for batch in batches(queryset, settings.API_STREAM_BATCH_SIZE)
+    )
+    encode = json_array if stream_format == 'json' else ndjson
+    return StreamingHttpResponse(
+        encode(pages), content_type=STREAM_FORMATS[stream_format]
+    )
+
+
+class StreamingListMixin:
+    """
+    ``list`` with ``?stream=json`` or ``?stream=ndjson`` sends every
+    matching object, unpaginated, as a JSON array or one object per line.
+    Objects are read, serialized and written out a batch at a time, so
+    memory stays flat however large the account.
+    """
+
+    def list(self, request, *args, **kwargs):
+        stream_format = request.query_params.get('stream')
+        if stream_format is None:
+            return super().list(request, *args, **kwargs)
+        if stream_format not in STREAM_FORMATS:
+            raise ValidationError({
+                'stream': f'Expected one of {", ".join(STREAM_FORMATS)}.'
+            })
+        return stream_serialized(
+            self.filter_queryset(self.get_queryset()),
+            lambda objects: self.get_serializer(objects, many=True).data,
+            stream_format
+        )
@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient
+from recipe.tests.test_recipe_api import sample_ingredient, sample_recipe, \
+    sample_tag
+
+INGREDIENT_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+TAG_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _names(self, url, params):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in res.data]
+
+    def test_prefix_ignores_case_and_accents(self):
+        for name in ['Crème fraîche', 'CREAM', 'crepe', 'Carrot']:
+            sample_ingredient(self.user, name)
+
+        names = self._names(INGREDIENT_AUTOCOMPLETE_URL, {'q': 'CRÉ'})
+
+        self.assertEqual(names, ['CREAM', 'Crème fraîche', 'crepe'])
+
+    def test_like_wildcards_are_literal(self):
+        sample_tag(self.user, '50% off')
+        sample_tag(self.user, '500 club')
+
+        names = self._names(TAG_AUTOCOMPLETE_URL, {'q': '50%'})
+
+        self.assertEqual(names, ['50% off'])
+
+    def test_limit(self):
+        for n in range(5):
+            sample_tag(self.user, f'Tag {n}')
+
+        self.assertEqual(
+            self._names(TAG_AUTOCOMPLETE_URL, {'q': 'tag', 'limit': 2}),
+            ['Tag 0', 'Tag 1']
+        )
+
+    @override_settings(API_AUTOCOMPLETE_MAX_LIMIT=3)
+    def test_limit_capped(self):
+        for n in range(5):
+            sample_tag(self.user, f'Tag {n}')
+
+        names = self._names(TAG_AUTOCOMPLETE_URL, {'q': 'tag', 'limit': 50})
+
+        self.assertEqual(len(names), 3)
+
+    def test_invalid_limit(self):
+        res = self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'a', 'limit': 'x'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_nul_in_prefix(self):
+        res = self.client.get(TAG_AUTOCOMPLETE_URL, {'q': 'a\0'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('q', res.data)
+
+    def test_empty_prefix(self):
+        sample_tag(self.user, 'Vegan')
+
+        self.assertEqual(self._names(TAG_AUTOCOMPLETE_URL, {'q': ' '}), [])
+
+    def test_scoped_to_user_and_assigned_only(self):
+        other = get_user_model().objects.create_user(
+            'b@gmmail.com',
+            'mypassword'
+        )
+        sample_tag(other, 'Vegan')
+        used = sample_tag(self.user, 'Vegetarian')
+        sample_tag(self.user, 'Veggie')
+        sample_recipe(self.user).tags.add(used)
+
+        self.assertEqual(
+            self._names(TAG_AUTOCOMPLETE_URL, {'q': 've'}),
+            ['Vegetarian', 'Veggie']
+        )
+        self.assertEqual(
+            self._names(
+                TAG_AUTOCOMPLETE_URL, {'q': 've', 'assigned_only': 1}
+            ),
+            ['Vegetarian']
+        )
+
+    def test_single_query(self):
+        sample_ingredient(self.user, 'Salt')
+
+        with self.assertNumQueries(1):
+            self.client.get(INGREDIENT_AUTOCOMPLETE_URL, {'q': 'sa'})
+
+    def test_served_by_search_key_index(self):
+        queryset = Ingredient.objects.filter(user=self.user) \
+            .autocomplete('sa', 10)
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+
+        self.assertIn('core_ingredient_user_search_key_idx', plan)
@@ -0,0 +1,231 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.tests.test_recipe_api import sample_ingredient, sample_recipe, \
+    sample_tag
+
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+RECIPE_URL = reverse('recipe:recipe-list')
+INGREDIENT_BULK_URL = reverse('recipe:ingredient-bulk')
+TAG_BULK_URL = reverse('recipe:tag-bulk')
+
+
+class BulkApiTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_ingredients(self):
+        payload = [{'name': f'i{n}'} for n in range(50)]
+
+        with self.assertNumQueries(3):
+            res = self.client.post(INGREDIENT_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 50)
+        self.assertTrue(all(item['id'] for item in res.data))
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 50
+        )
+
+    def test_bulk_create_reports_errors_per_item(self):
+        payload = [{'name': 'ok'}, {'name': ''}, {'name': 'ok too'}]
+
+        res = self.client.post(TAG_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertEqual(res.data[2], {})
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_create_recipes_with_relations(self):
+        tag = sample_tag(self.user)
+        ingredients = [sample_ingredient(self.user, f'i{n}') for n in range(3)]
+        payload = [
+            {
+                'title': f'r{n}', 'time_minutes': n, 'price': '1.50',
+                'tags': [tag.id],
+                'ingredients': [i.id for i in ingredients[:n]],
+            }
+            for n in range(4)
+        ]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [r.ingredients.count() for r in recipes], [0, 1, 2, 3]
+        )
+        self.assertEqual(tag.recipe_set.count(), 4)
+
+    def test_bulk_create_recipes_query_count_is_fixed(self):
+        tag = sample_tag(self.user)
+        ingredient = sample_ingredient(self.user)
+        payload = [
+            {
+                'title': f'r{n}', 'time_minutes': n, 'price': '1.50',
+                'tags': [tag.id], 'ingredients': [ingredient.id],
+            }
+            for n in range(20)
+        ]
+
+        # Savepoint, related lookups, recipes, through rows, usage counters,
+        # search vectors, response reads.
+        with self.assertNumQueries(12):
+            res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data[0]['tags'], [tag.id])
+
+    def test_bulk_update_recipes(self):
+        recipe1 = sample_recipe(self.user, title='one')
+        recipe2 = sample_recipe(self.user, title='two')
+        recipe1.tags.add(sample_tag(self.user, 'old'))
+        new_tag = sample_tag(self.user, 'new')
+        payload = [
+            {'id': recipe1.id, 'price': '7.25', 'tags': [new_tag.id]},
+            {'id': recipe2.id, 'title': 'renamed'},
+        ]
+
+        res = self.client.patch(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe1.price, Decimal('7.25'))
+        self.assertEqual(recipe1.title, 'one')
+        self.assertEqual(list(recipe1.tags.all()), [new_tag])
+        self.assertEqual(recipe2.title, 'renamed')
+        self.assertEqual(recipe2.price, Decimal('5.00'))
+
+    def test_bulk_update_unknown_id(self):
+        recipe = sample_recipe(self.user)
+        other = get_user_model().objects.create_user(
+            'b@gmmail.com',
+            'mypassword'
+        )
+        foreign = sample_recipe(other)
+        payload = [
+            {'id': recipe.id, 'title': 'changed'},
+            {'id': foreign.id, 'title': 'hijacked'},
+        ]
+
+        res = self.client.patch(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Sample')
+
+    def test_bulk_update_duplicate_id(self):
+        tag = sample_tag(self.user)
+        recipe = sample_recipe(self.user)
+        payload = [
+            {'id': recipe.id, 'tags': [tag.id]},
+            {'id': recipe.id, 'tags': [tag.id]},
+            {'id': True, 'title': 'Bool'},
+        ]
+
+        res = self.client.patch(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertEqual(res.data[1], {'id': ['Duplicate id.']})
+        self.assertIn('id', res.data[2])
+        self.assertFalse(recipe.tags.exists())
+
+    def test_bulk_delete(self):
+        tags = [sample_tag(self.user, f't{n}') for n in range(3)]
+
+        res = self.client.delete(
+            TAG_BULK_URL, [tags[0].id, tags[2].id], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Tag.objects.all()), [tags[1]])
+
+    def test_bulk_delete_recipes_query_count_is_fixed(self):
+        tags = [sample_tag(self.user, f't{n}') for n in range(2)]
+        salt = sample_ingredient(self.user, 'Salt')
+        queries = []
+        for size in (2, 6):
+            recipes = [sample_recipe(self.user) for _ in range(size)]
+            for recipe in recipes:
+                recipe.tags.add(*tags)
+                recipe.ingredients.add(salt)
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.delete(
+                    RECIPE_BULK_URL, [recipe.id for recipe in recipes],
+                    format='json'
+                )
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+            queries.append(len(context))
+
+        self.assertEqual(queries[0], queries[1])
+        self.assertFalse(Recipe.objects.exists())
+        for tag in tags:
+            tag.refresh_from_db()
+            self.assertEqual(tag.recipe_count, 0)
+        salt.refresh_from_db()
+        self.assertEqual(salt.recipe_count, 0)
+
+    def test_bulk_delete_keeps_other_recipe_counts(self):
+        tag = sample_tag(self.user)
+        recipes = [sample_recipe(self.user) for _ in range(3)]
+        for recipe in recipes:
+            recipe.tags.add(tag)
+
+        self.client.delete(
+            RECIPE_BULK_URL, [recipes[0].id, recipes[1].id], format='json'
+        )
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
+
+    def test_bulk_write_invalidates_list_cache(self):
+        self.client.get(RECIPE_URL)
+        self.client.post(RECIPE_BULK_URL, [{
+            'title': 'r', 'time_minutes': 1, 'price': '1.00',
+            'tags': [], 'ingredients': [],
+        }], format='json')
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    @override_settings(API_BULK_MAX_ITEMS=2)
+    def test_bulk_item_limit(self):
+        res = self.client.post(
+            TAG_BULK_URL, [{'name': 'a'}] * 3, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_requires_list(self):
+        res = self.client.post(TAG_BULK_URL, {'name': 'a'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bench_bulk_command(self):
+        out = StringIO()
+        call_command('bench_bulk', items=3, endpoint='recipes', stdout=out)
+
+        self.assertIn('per-object', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
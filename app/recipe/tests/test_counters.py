@@ -0,0 +1,124 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from recipe.tests.test_recipe_api import sample_ingredient, sample_recipe, \
+    sample_tag
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def counts(*objs):
+    return [type(obj).objects.get(pk=obj.pk).recipe_count for obj in objs]
+
+
+class RecipeCountTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = sample_tag(self.user, 'Vegan')
+        self.dessert = sample_tag(self.user, 'Dessert')
+        self.salt = sample_ingredient(self.user, 'Salt')
+
+    def test_add_and_remove_from_recipe(self):
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.vegan, self.dessert)
+        recipe.tags.add(self.vegan)
+        self.assertEqual(counts(self.vegan, self.dessert), [1, 1])
+
+        recipe.tags.remove(self.vegan, sample_tag(self.user, 'Unused'))
+        self.assertEqual(counts(self.vegan, self.dessert), [0, 1])
+
+        recipe.tags.clear()
+        self.assertEqual(counts(self.dessert), [0])
+
+    def test_add_and_remove_from_tag(self):
+        first = sample_recipe(self.user)
+        second = sample_recipe(self.user)
+        self.vegan.recipe_set.add(first, second)
+        self.assertEqual(counts(self.vegan), [2])
+
+        self.vegan.recipe_set.remove(first, first)
+        self.assertEqual(counts(self.vegan), [1])
+
+        self.vegan.recipe_set.clear()
+        self.assertEqual(counts(self.vegan), [0])
+
+    def test_set_and_recipe_delete(self):
+        recipe = sample_recipe(self.user)
+        recipe.tags.set([self.vegan])
+        recipe.ingredients.set([self.salt])
+        recipe.tags.set([self.dessert])
+        self.assertEqual(counts(self.vegan, self.dessert), [0, 1])
+
+        recipe.delete()
+        self.assertEqual(counts(self.dessert, self.salt), [0, 0])
+
+    def test_bulk_create_and_update(self):
+        res = self.client.post(RECIPE_BULK_URL, [
+            {'title': 'Curry', 'time_minutes': 20, 'price': '4.00',
+             'tags': [self.vegan.id], 'ingredients': [self.salt.id]},
+            {'title': 'Cake', 'time_minutes': 50, 'price': '9.00',
+             'tags': [self.vegan.id, self.dessert.id], 'ingredients': []},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(counts(self.vegan, self.dessert, self.salt),
+                         [2, 1, 1])
+
+        res = self.client.patch(RECIPE_BULK_URL, [
+            {'id': res.data[1]['id'], 'tags': [self.dessert.id]},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(counts(self.vegan, self.dessert), [1, 1])
+
+    def test_assigned_only_uses_counter(self):
+        sample_recipe(self.user).tags.add(self.vegan)
+        Tag.objects.filter(pk=self.vegan.pk).update(recipe_count=0)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_order_by_popularity(self):
+        sample_recipe(self.user).tags.add(self.vegan, self.dessert)
+        sample_recipe(self.user).tags.add(self.vegan)
+
+        res = self.client.get(TAGS_URL, {'ordering': '-recipe_count'})
+
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Vegan', 'Dessert']
+        )
+
+    def test_invalid_ordering(self):
+        res = self.client.get(TAGS_URL, {'ordering': 'user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_repair_command(self):
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.vegan)
+        recipe.ingredients.add(self.salt)
+        Tag.objects.filter(pk=self.vegan.pk).update(recipe_count=5)
+        Ingredient.objects.filter(pk=self.salt.pk).update(recipe_count=0)
+
+        out = StringIO()
+        call_command('repair_recipe_counts', stdout=out)
+
+        self.assertEqual(counts(self.vegan, self.dessert, self.salt),
+                         [1, 0, 1])
+        self.assertIn('tags: 1 fixed', out.getvalue())
+        self.assertIn('ingredients: 1 fixed', out.getvalue())
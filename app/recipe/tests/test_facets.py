@@ -0,0 +1,124 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.tests.test_recipe_api import sample_ingredient, sample_recipe, \
+    sample_tag
+
+FACETS_URL = reverse('recipe:recipe-facets')
+
+
+@override_settings(RECIPE_FACETS_CACHE_TTL=0)
+class RecipeFacetsTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.vegan = sample_tag(self.user, 'Vegan')
+        self.dessert = sample_tag(self.user, 'Dessert')
+        self.salt = sample_ingredient(self.user, 'Salt')
+        self.curry = sample_recipe(self.user, title='Curry',
+                                   price=Decimal('4.00'), time_minutes=20)
+        self.curry.tags.add(self.vegan)
+        self.curry.ingredients.add(self.salt)
+        self.cake = sample_recipe(self.user, title='Cake',
+                                  price=Decimal('12.50'), time_minutes=55)
+        self.cake.tags.add(self.vegan, self.dessert)
+        self.soup = sample_recipe(self.user, title='Soup',
+                                  price=Decimal('3.00'), time_minutes=10)
+        self.soup.ingredients.add(self.salt)
+
+    def test_facets(self):
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual(res.data['tags'], [
+            {'id': self.vegan.id, 'name': 'Vegan', 'count': 2},
+            {'id': self.dessert.id, 'name': 'Dessert', 'count': 1},
+        ])
+        self.assertEqual(res.data['ingredients'], [
+            {'id': self.salt.id, 'name': 'Salt', 'count': 2},
+        ])
+        self.assertEqual(res.data['price'], [
+            {'min': '0.00', 'max': '5.00', 'count': 2},
+            {'min': '10.00', 'max': '15.00', 'count': 1},
+        ])
+        self.assertEqual(res.data['time_minutes'], [
+            {'min': 0, 'max': 15, 'count': 1},
+            {'min': 15, 'max': 30, 'count': 1},
+            {'min': 45, 'max': 60, 'count': 1},
+        ])
+
+    def test_facets_follow_list_filters(self):
+        res = self.client.get(
+            FACETS_URL, {'tags': self.vegan.id, 'max_price': '10'}
+        )
+
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(
+            res.data['tags'],
+            [{'id': self.vegan.id, 'name': 'Vegan', 'count': 1}]
+        )
+
+    def test_facets_of_search(self):
+        res = self.client.get(FACETS_URL, {'search': 'cake'})
+
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(len(res.data['tags']), 2)
+
+    def test_bucket_widths(self):
+        res = self.client.get(
+            FACETS_URL, {'price_bucket': '2.5', 'time_bucket': 60}
+        )
+
+        self.assertEqual(res.data['price'][0],
+                         {'min': '2.5', 'max': '5.0', 'count': 2})
+        self.assertEqual(res.data['time_minutes'],
+                         [{'min': 0, 'max': 60, 'count': 3}])
+
+    def test_invalid_bucket_widths(self):
+        for params in ({'price_bucket': '0'}, {'price_bucket': 'NaN'},
+                       {'price_bucket': 'Infinity'}, {'time_bucket': 'x'},
+                       {'price_bucket': '1e-30'}, {'price_bucket': '0.009'},
+                       {'time_bucket': '0'}):
+            res = self.client.get(FACETS_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_one_query_per_facet(self):
+        with self.assertNumQueries(5):
+            self.client.get(FACETS_URL)
+
+    def test_scoped_to_user(self):
+        other = get_user_model().objects.create_user(
+            'b@gmmail.com',
+            'mypassword'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.data['count'], 0)
+        self.assertEqual(res.data['tags'], [])
+
+    @override_settings(RECIPE_FACETS_CACHE_TTL=30)
+    def test_cached_until_write(self):
+        self.client.get(FACETS_URL)
+        with self.assertNumQueries(0):
+            self.client.get(FACETS_URL)
+
+        self.soup.tags.add(self.dessert)
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.data['tags'][0]['count'], 2)
+        self.assertEqual(res.data['tags'][1]['count'], 2)
@@ -0,0 +1,171 @@
+import io
+import os
+import shutil
+import struct
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import Recipe
+from recipe import images
+from recipe.tests.test_recipe_api import sample_recipe
+
+
+def image_bytes(size=(40, 20), mode='RGB', fmt='JPEG', orientation=None):
+    buffer = io.BytesIO()
+    kwargs = {}
+    if orientation is not None:
+        # Big-endian TIFF header with one IFD entry: Orientation (SHORT).
+        kwargs['exif'] = b'Exif\x00\x00MM\x00\x2a' + struct.pack(
+            '>IHHHIHHI', 8, 1, 0x0112, 3, 1, orientation, 0, 0
+        )
+    Image.new(mode, size).save(buffer, format=fmt, **kwargs)
+    return buffer.getvalue()
+
+
+@override_settings(RECIPE_IMAGE_WORKERS=0, RECIPE_IMAGE_MAX_SIZE=32,
+                   RECIPE_IMAGE_VARIANT_WIDTHS=(8, 16, 64))
+class ImagePipelineTests(TestCase):
+    def setUp(self) -> None:
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = self.settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.recipe = sample_recipe(user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def _upload(self, content, name='upload.jpg'):
+        self.recipe.image.save(name, ContentFile(content))
+        self.recipe.image_status = Recipe.IMAGE_PENDING
+        self.recipe.save()
+        original = self.recipe.image.name
+        images.enqueue(self.recipe)
+        self.recipe.refresh_from_db()
+        return original
+
+    def test_reencodes_and_writes_variants(self):
+        self._upload(image_bytes(mode='RGBA', fmt='PNG'), 'upload.png')
+
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertEqual(self.recipe.image_width, 32)
+        with default_storage.open(self.recipe.image.name) as f:
+            processed = Image.open(f)
+            self.assertEqual(processed.format, 'JPEG')
+            self.assertEqual(processed.size, (32, 16))
+        names = images.variant_names(self.recipe.image_hash, 32)
+        self.assertEqual(list(names['WEBP']), [8, 16, 32])
+        for image_format, by_width in names.items():
+            for width, name in by_width.items():
+                with default_storage.open(name) as f:
+                    variant = Image.open(f)
+                    self.assertEqual(variant.format, image_format)
+                    self.assertEqual(variant.width, width)
+
+    def test_identical_uploads_share_variants(self):
+        content = image_bytes()
+        self._upload(content)
+        first = self.recipe.image.name
+        with patch('recipe.images.encode') as encode:
+            self._upload(content)
+
+        self.assertEqual(self.recipe.image.name, first)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        encode.assert_not_called()
+
+    def test_variants_renamed_into_place(self):
+        with patch('recipe.images.os.replace',
+                   side_effect=OSError) as replace, \
+                self.assertLogs('recipe.images', 'ERROR'):
+            self._upload(image_bytes())
+
+        temp_path, path = replace.call_args[0]
+        self.assertTrue(temp_path.startswith(path))
+        self.assertFalse(os.path.exists(temp_path))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+
+    def test_original_removed(self):
+        original = self._upload(image_bytes())
+
+        self.assertFalse(default_storage.exists(original))
+        self.assertNotEqual(self.recipe.image.name, original)
+
+    def test_applies_exif_orientation(self):
+        self._upload(image_bytes(size=(30, 10), orientation=6))
+
+        with default_storage.open(self.recipe.image.name) as f:
+            self.assertEqual(Image.open(f).size, (10, 30))
+
+    def test_undecodable_upload_marked_failed(self):
+        with self.assertLogs('recipe.images', 'ERROR'):
+            self._upload(b'not really a jpeg')
+
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+        self.assertTrue(default_storage.exists(self.recipe.image.name))
+
+    def test_replaced_upload_is_skipped(self):
+        self.recipe.image.save('upload.jpg', ContentFile(image_bytes()))
+        stale = self.recipe.image.name
+        self.recipe.image.save('newer.jpg', ContentFile(image_bytes()))
+        newer = self.recipe.image.name
+
+        images.process_image(self.recipe.pk, stale)
+        self.recipe.refresh_from_db()
+
+        self.assertEqual(self.recipe.image_status, '')
+        self.assertEqual(self.recipe.image.name, newer)
+
+    def test_job_enqueued_twice_runs_once(self):
+        original = self._upload(image_bytes())
+        processed = self.recipe.image.name
+
+        with patch('recipe.images.write_variants') as write_variants:
+            images.process_image(self.recipe.pk, original)
+            self.recipe.image_status = Recipe.IMAGE_PROCESSING
+            self.recipe.save()
+            images.process_image(self.recipe.pk, processed)
+
+        write_variants.assert_not_called()
+
+    @override_settings(RECIPE_IMAGE_WORKERS=2)
+    def test_enqueue_waits_for_commit(self):
+        with patch('recipe.images._get_executor') as get_executor, \
+                patch('django.db.transaction.on_commit') as on_commit:
+            self._upload(image_bytes())
+
+            get_executor.assert_not_called()
+            on_commit.call_args[0][0]()
+
+        get_executor.return_value.submit.assert_called_once()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PENDING)
+
+    def test_process_pending_images(self):
+        with self.settings(RECIPE_IMAGE_WORKERS=2), \
+                patch('recipe.images._get_executor'):
+            self._upload(image_bytes())
+        out = io.StringIO()
+
+        call_command('process_pending_images', older_than=60, stdout=out)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PENDING)
+
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_status=Recipe.IMAGE_PROCESSING
+        )
+        call_command('process_pending_images', older_than=0, stdout=out)
+        self.recipe.refresh_from_db()
+
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertIn('1 images processed', out.getvalue())
@@ -0,0 +1,210 @@
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.cache import user_version
+from recipe.importing import load_batch
+from recipe.tests.test_recipe_api import sample_ingredient, sample_recipe, \
+    sample_tag
+
+EXPORT_URL = reverse('recipe:export')
+
+CSV = (
+    'title,time_minutes,price,link,tags,ingredients\n'
+    '"Curry, hot",30,9.5,https://example.com/curry,Vegan|Dinner,Rice|Chili\n'
+    'Toast,5,1,,,Bread\n'
+)
+
+
+def failing_load_batch(user_id, records):
+    # Module level, so that the worker processes can unpickle it.
+    if any(record[0] == 'Boom' for record in records):
+        raise RuntimeError('Batch failed.')
+    return load_batch(user_id, records)
+
+
+class ImportRecipesTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def _import(self, content, name='recipes.csv', **options):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        out = StringIO()
+        call_command(
+            'import_recipes', path, user=self.user.email, workers=0,
+            stdout=out, **options
+        )
+        return out.getvalue()
+
+    def test_import_csv(self):
+        vegan = sample_tag(self.user, 'Vegan')
+        sample_tag(get_user_model().objects.create_user(
+            'b@gmmail.com', 'mypassword'
+        ), 'Dinner')
+        version = user_version(self.user.pk)
+
+        out = self._import(CSV)
+
+        curry, toast = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(curry.title, 'Curry, hot')
+        self.assertEqual(str(curry.price), '9.50')
+        self.assertEqual(curry.link, 'https://example.com/curry')
+        self.assertEqual(toast.link, '')
+        self.assertEqual(curry.image_status, '')
+        self.assertEqual(
+            sorted(curry.tags.values_list('name', flat=True)),
+            ['Dinner', 'Vegan']
+        )
+        self.assertIn(vegan, curry.tags.all())
+        self.assertEqual(
+            list(toast.ingredients.values_list('name', flat=True)),
+            ['Bread']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        vegan.refresh_from_db()
+        self.assertEqual(vegan.recipe_count, 1)
+        self.assertIsNotNone(curry.search_vector)
+        self.assertGreater(user_version(self.user.pk), version)
+        self.assertIn('2 recipes', out)
+        self.assertIn('created 1 tags, 3 ingredients', out)
+
+    def test_import_ndjson_names(self):
+        self._import(
+            '{"title": "Soup", "time_minutes": 20, "price": "4.20", '
+            '"tags": ["Starter"], "ingredients": ["Leek", "Leek"]}\n\n',
+            name='recipes.ndjson'
+        )
+
+        soup = Recipe.objects.get(user=self.user)
+        self.assertEqual(
+            list(soup.ingredients.values_list('name', flat=True)), ['Leek']
+        )
+        self.assertEqual(soup.tags.get().name, 'Starter')
+
+    def test_import_account_export(self):
+        other = get_user_model().objects.create_user(
+            'b@gmmail.com',
+            'mypassword'
+        )
+        recipe = sample_recipe(other, title='Pie', link='https://pie')
+        recipe.tags.add(sample_tag(other, 'Dessert'))
+        recipe.ingredients.add(sample_ingredient(other, 'Apple'))
+        sample_tag(other, 'Unused')
+        client = APIClient()
+        client.force_authenticate(other)
+        export = b''.join(client.get(EXPORT_URL).streaming_content)
+
+        self._import(export.decode(), name='export.ndjson')
+
+        pie = Recipe.objects.get(user=self.user)
+        self.assertEqual((pie.title, pie.link), ('Pie', 'https://pie'))
+        self.assertEqual(pie.tags.get().name, 'Dessert')
+        self.assertEqual(pie.ingredients.get().name, 'Apple')
+        self.assertFalse(
+            Tag.objects.filter(user=self.user, name='Unused').exists()
+        )
+
+    def test_invalid_row(self):
+        content = CSV + 'Bad,soon,1,,,\n'
+
+        with self.assertRaisesMessage(CommandError, 'Line 4: time_minutes'):
+            self._import(content, batch_size=1)
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_invalid_values(self):
+        header = 'title,time_minutes,price,link,tags,ingredients\n'
+        for row, message in (
+                ('Soup,5,NaN,,,', 'price must be a number'),
+                ('Soup,5,Infinity,,,', 'price must be a number'),
+                ('Soup,5,1000,,,', 'price must be under 1000'),
+                ('So\0up,5,1,,,', 'title contains a NUL'),
+                ('Soup,5,1,https://\0,,', 'link contains a NUL'),
+                ('Soup,5,1,,Veg\0an,', 'tags has a name with a NUL')):
+            with self.subTest(row=row), self.assertRaisesMessage(
+                    CommandError, f'Line 2: {message}'):
+                self._import(header + row + '\n')
+
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_export_line_data_not_an_object(self):
+        for data in ('[1]', '"Pie"', '3'):
+            with self.subTest(data=data), self.assertRaisesMessage(
+                    CommandError, 'Line 2: data must be an object'):
+                self._import(
+                    '{"type": "tag", "data": {"id": 1, "name": "Veg"}}\n'
+                    f'{{"type": "recipe", "data": {data}}}\n',
+                    name='export.ndjson'
+                )
+
+    def test_unknown_user(self):
+        with self.assertRaisesMessage(CommandError, 'No user'):
+            call_command(
+                'import_recipes', '-', user='nobody@gmmail.com', workers=0
+            )
+
+
+class ParallelImportTests(TransactionTestCase):
+    def test_import_in_worker_processes(self):
+        user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recipes.csv')
+            with open(path, 'w', encoding='utf-8') as file:
+                header, rows = CSV.split('\n', 1)
+                file.write(header + '\n' + rows * 5)
+
+            call_command(
+                'import_recipes', path, user=user.email, workers=2,
+                batch_size=3, stdout=StringIO()
+            )
+
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 10)
+        self.assertEqual(Ingredient.objects.get(name='Bread').recipe_count, 5)
+        self.assertEqual(
+            Recipe.tags.through.objects.filter(recipe__user=user).count(), 10
+        )
+
+    @patch('recipe.management.commands.import_recipes.load_batch',
+           failing_load_batch)
+    def test_failed_batch_keeps_the_committed_ones(self):
+        user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        version = user_version(user.pk)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recipes.csv')
+            with open(path, 'w', encoding='utf-8') as file:
+                header, rows = CSV.split('\n', 1)
+                file.write(
+                    header + '\n' + rows + 'Boom,1,1,,,Bread\n' + rows * 2
+                )
+
+            with self.assertRaisesMessage(
+                    CommandError, 'Batch failed. 5 recipes of the other'):
+                call_command(
+                    'import_recipes', path, user=user.email, workers=2,
+                    batch_size=2, stdout=StringIO()
+                )
+
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 5)
+        self.assertEqual(Ingredient.objects.get(name='Bread').recipe_count, 3)
+        self.assertGreater(user_version(user.pk), version)
@@ -0,0 +1,116 @@
+import json
+from base64 import urlsafe_b64encode
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from recipe.tests.test_recipe_api import sample_recipe, sample_tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+@override_settings(API_PAGE_SIZE=3, API_MAX_PAGE_SIZE=5)
+class KeysetPaginationTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url, params=None):
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data)
+            if not res.data['next']:
+                return pages
+            res = self.client.get(res.data['next'])
+
+    def test_recipes_paginated_by_descending_id(self):
+        recipes = [sample_recipe(self.user) for _ in range(7)]
+
+        pages = self._walk(RECIPE_URL)
+
+        ids = [r['id'] for page in pages for r in page['results']]
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(ids, sorted((r.id for r in recipes), reverse=True))
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_tags_paginated_with_duplicate_names(self):
+        for name in ['b', 'a', 'b', 'c', 'b', 'a', 'b']:
+            sample_tag(self.user, name)
+
+        pages = self._walk(TAGS_URL)
+
+        ids = [t['id'] for page in pages for t in page['results']]
+        expected = Tag.objects.order_by('-name', 'id') \
+            .values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_previous_link_returns_previous_page(self):
+        for _ in range(7):
+            sample_recipe(self.user)
+        first = self.client.get(RECIPE_URL).data
+        second = self.client.get(first['next']).data
+
+        res = self.client.get(second['previous'])
+
+        self.assertEqual(res.data['results'], first['results'])
+        self.assertIsNotNone(res.data['next'])
+
+    def test_page_size_param_is_capped(self):
+        for _ in range(7):
+            sample_recipe(self.user)
+
+        res = self.client.get(RECIPE_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_deep_page_query_count_is_fixed(self):
+        for _ in range(9):
+            sample_recipe(self.user)
+        first = self.client.get(RECIPE_URL).data
+        third = self.client.get(
+            self.client.get(first['next']).data['next']
+        ).data
+        cache.clear()
+
+        with self.assertNumQueries(3):
+            self.client.get(RECIPE_URL)
+        with self.assertNumQueries(3):
+            self.client.get(third['previous'])
+
+    def test_invalid_cursor(self):
+        res = self.client.get(RECIPE_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor(self):
+        sample_recipe(self.user)
+        sample_tag(self.user)
+        cases = [
+            (RECIPE_URL, {}, ['abc']),
+            (RECIPE_URL, {}, [{}]),
+            (RECIPE_URL, {}, [None]),
+            (RECIPE_URL, {'ordering': 'price'}, ['x', 1]),
+            (RECIPE_URL, {'ordering': 'price'}, [1]),
+            (TAGS_URL, {'ordering': '-recipe_count'}, ['many', 1]),
+            (TAGS_URL, {}, ['Vegan\0', 1]),
+        ]
+        for url, params, position in cases:
+            cursor = urlsafe_b64encode(
+                json.dumps({'r': 0, 'p': position}).encode()
+            ).decode()
+
+            res = self.client.get(url, dict(params, cursor=cursor))
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -4,13 +4,16 @@ from unittest.mock import patch
 
 from PIL import Image
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core import models
 from core.models import Recipe, Tag, Ingredient
+from core.queries import QueryCheckMixin
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPE_URL = reverse('recipe:recipe-list')
@@ -42,7 +45,7 @@ def sample_recipe(user, **params):
     return Recipe.objects.create(user=user, **defaults)
 
 
-class PublicRecipeApiTests(TestCase):
+class PublicRecipeApiTests(QueryCheckMixin, TestCase):
     def setUp(self) -> None:
         self.client = APIClient()
 
@@ -52,7 +55,7 @@ class PublicRecipeApiTests(TestCase):
 
 
 # noinspection DuplicatedCode
-class PrivateRecipeApiTests(TestCase):
+class PrivateRecipeApiTests(QueryCheckMixin, TestCase):
     def setUp(self) -> None:
         self.user = get_user_model().objects.create_user(
             'a@gmmail.com',
@@ -67,11 +70,48 @@ class PrivateRecipeApiTests(TestCase):
 
         res = self.client.get(RECIPE_URL)
 
-        recipes = Recipe.objects.all().filter(user=self.user).order_by('-title')
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def _sample_recipes_with_relations(self, count):
+        tag = sample_tag(self.user)
+        ingredient = sample_ingredient(self.user)
+        for _ in range(count):
+            recipe = sample_recipe(self.user)
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+        return recipe
+
+    def test_list_recipes_query_count_is_fixed(self):
+        self._sample_recipes_with_relations(2)
+        with self.assertNumQueries(3):
+            self.client.get(RECIPE_URL)
+
+        self._sample_recipes_with_relations(10)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data['results']), 12)
+
+    def test_filtered_list_recipes_query_count_is_fixed(self):
+        self._sample_recipes_with_relations(10)
+        tag_ids = ','.join(str(t.id) for t in Tag.objects.all())
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPE_URL, {'tags': tag_ids})
+        self.assertEqual(len(res.data['results']), 10)
+
+    def test_retrieve_recipe_query_count_is_fixed(self):
+        recipe = self._sample_recipes_with_relations(1)
+        recipe.tags.add(sample_tag(self.user, 'tag2'))
+        recipe.ingredients.add(sample_ingredient(self.user, 'ing2'))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertEqual(len(res.data['ingredients']), 2)
 
     def test_recipes_limited_to_user(self):
         user2 = get_user_model().objects.create_user(
@@ -84,8 +124,8 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.get(RECIPE_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['id'], recipe.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['id'], recipe.id)
 
     def test_create_recipe_fails(self):
         payload = {'title': ""}
@@ -214,9 +254,9 @@ class PrivateRecipeApiTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipe_by_ingredient(self):
         recipe1 = sample_recipe(self.user, title='Thai')
@@ -232,12 +272,121 @@ class PrivateRecipeApiTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipe_matching_several_tags_returned_once(self):
+        recipe = sample_recipe(self.user)
+        tag1 = sample_tag(self.user, 'tag1')
+        tag2 = sample_tag(self.user, 'tag2')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(len(res.data['results']), 1)
 
+    def test_filter_recipe_by_all_tags(self):
+        recipe1 = sample_recipe(self.user, title='Both')
+        recipe2 = sample_recipe(self.user, title='One')
+        tag1 = sample_tag(self.user, 'tag1')
+        tag2 = sample_tag(self.user, 'tag2')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+
+        res = self.client.get(
+            RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        )
 
-class RecipeImageUploadTest(TestCase):
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipe_by_all_ingredients_and_tags(self):
+        recipe1 = sample_recipe(self.user, title='Match')
+        recipe2 = sample_recipe(self.user, title='Missing ingredient')
+        tag = sample_tag(self.user)
+        i1 = sample_ingredient(self.user, 'i1')
+        i2 = sample_ingredient(self.user, 'i2')
+        recipe1.tags.add(tag)
+        recipe1.ingredients.add(i1, i2)
+        recipe2.tags.add(tag)
+        recipe2.ingredients.add(i1)
+
+        res = self.client.get(RECIPE_URL, {
+            'tags': f'{tag.id}',
+            'ingredients': f'{i1.id},{i2.id}',
+            'match': 'all',
+        })
+
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipe_invalid_match(self):
+        res = self.client.get(RECIPE_URL, {'tags': '1', 'match': 'some'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_sparse_fields(self):
+        self._sample_recipes_with_relations(2)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [sorted(r) for r in res.data['results']], [['id', 'title']] * 2
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"price"', queries[0]['sql'])
+
+    def test_list_sparse_fields_paginate_on_ordering_column(self):
+        for price in (3, 1, 2):
+            sample_recipe(self.user, price=price)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, {
+                'fields': 'title', 'ordering': 'price', 'page_size': 2
+            })
+        self.assertIsNotNone(res.data['next'])
+        res = self.client.get(res.data['next'])
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_include_relations(self):
+        recipe = self._sample_recipes_with_relations(2)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(
+                RECIPE_URL, {'include': 'tags,ingredients'}
+            )
+
+        detail = RecipeDetailSerializer(recipe).data
+        self.assertEqual(res.data['results'][0]['tags'], detail['tags'])
+        self.assertEqual(
+            res.data['results'][0]['ingredients'], detail['ingredients']
+        )
+        self.assertIn('price', res.data['results'][0])
+
+    def test_list_include_adds_to_fields(self):
+        self._sample_recipes_with_relations(2)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                RECIPE_URL, {'fields': 'id', 'include': 'tags'}
+            )
+
+        self.assertEqual(sorted(res.data['results'][0]), ['id', 'tags'])
+        self.assertEqual(
+            res.data['results'][0]['tags'][0]['name'], 'Main course'
+        )
+
+    def test_list_unknown_fields(self):
+        for params in ({'fields': 'id,secret'}, {'include': 'user'}):
+            res = self.client.get(RECIPE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
+
+
+@override_settings(RECIPE_IMAGE_WORKERS=0)
+class RecipeImageUploadTest(QueryCheckMixin, TestCase):
     def setUp(self) -> None:
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
@@ -258,9 +407,14 @@ class RecipeImageUploadTest(TestCase):
             ntf.seek(0)
             res = self.client.post(url, {'image': ntf}, format='multipart')
         self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_READY)
+        self.assertEqual(
+            set(res.data['srcset']), {'image/webp', 'image/jpeg'}
+        )
+        self.assertIn(' 10w', res.data['srcset']['image/jpeg'])
 
     def test_upload_image_bad_request(self):
         url = image_upload_url(self.recipe.id)
@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.tests.test_recipe_api import sample_recipe
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class RecipeRangeFilterTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _ids(self, params):
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def _walk(self, params):
+        ids = []
+        res = self.client.get(RECIPE_URL, params)
+        while True:
+            ids += [recipe['id'] for recipe in res.data['results']]
+            if not res.data['next']:
+                return ids
+            res = self.client.get(res.data['next'])
+
+    def test_price_and_time_ranges(self):
+        cheap_quick = sample_recipe(self.user, price=Decimal('4.50'),
+                                    time_minutes=15)
+        sample_recipe(self.user, price=Decimal('12.00'), time_minutes=15)
+        sample_recipe(self.user, price=Decimal('4.50'), time_minutes=45)
+
+        ids = self._ids({'max_price': '10', 'max_time': 30})
+
+        self.assertEqual(ids, [cheap_quick.id])
+
+    def test_bounds_are_inclusive(self):
+        recipe = sample_recipe(self.user, price=Decimal('5.00'),
+                               time_minutes=30)
+
+        ids = self._ids({'min_price': '5.00', 'max_price': '5',
+                         'min_time': 30, 'max_time': 30})
+
+        self.assertEqual(ids, [recipe.id])
+
+    def test_invalid_range_values(self):
+        for params in ({'min_price': 'cheap'}, {'max_price': 'NaN'},
+                       {'min_time': '1.5'}):
+            res = self.client.get(RECIPE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(list(params)[0], res.data)
+
+    def test_ordering(self):
+        for price in ('3.00', '1.00', '2.00'):
+            sample_recipe(self.user, price=Decimal(price))
+
+        ascending = self._ids({'ordering': 'price'})
+        descending = self._ids({'ordering': '-price'})
+
+        expected = list(
+            Recipe.objects.order_by('price').values_list('id', flat=True)
+        )
+        self.assertEqual(ascending, expected)
+        self.assertEqual(descending, expected[::-1])
+
+    def test_invalid_ordering(self):
+        res = self.client.get(RECIPE_URL, {'ordering': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(API_PAGE_SIZE=2)
+    def test_ordering_paginates_through_ties(self):
+        for minutes in (20, 10, 20, 5, 20, 10, 30):
+            sample_recipe(self.user, time_minutes=minutes)
+
+        ids = self._walk({'ordering': '-time_minutes', 'max_time': 25})
+
+        expected = Recipe.objects.filter(time_minutes__lte=25) \
+            .order_by('-time_minutes', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
@@ -0,0 +1,147 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.cache import _version_key, normalize_query_params
+from recipe.tests.test_recipe_api import sample_ingredient, sample_recipe, \
+    sample_tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        sample_recipe(self.user)
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_cache_keyed_by_query_params(self):
+        recipe = sample_recipe(self.user)
+        tag = sample_tag(self.user)
+        recipe.tags.add(tag)
+        sample_recipe(self.user)
+
+        all_recipes = self.client.get(RECIPE_URL)
+        filtered = self.client.get(RECIPE_URL, {'tags': tag.id})
+
+        self.assertEqual(len(all_recipes.data['results']), 2)
+        self.assertEqual(len(filtered.data['results']), 1)
+
+    def test_write_invalidates_cache(self):
+        self.client.get(TAGS_URL)
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_m2m_change_invalidates_cache(self):
+        recipe = sample_recipe(self.user)
+        ingredient = sample_ingredient(self.user)
+        self.client.get(RECIPE_URL)
+
+        recipe.ingredients.add(ingredient)
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(
+            res.data['results'][0]['ingredients'], [ingredient.id]
+        )
+
+    def test_assigned_only_invalidated_by_recipe_change(self):
+        tag = sample_tag(self.user)
+        params = {'assigned_only': 1}
+        self.assertEqual(
+            len(self.client.get(TAGS_URL, params).data['results']), 0
+        )
+
+        sample_recipe(self.user).tags.add(tag)
+        res = self.client.get(TAGS_URL, params)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_if_none_match_returns_not_modified(self):
+        sample_tag(self.user)
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_if_none_match_lists_and_weak_tags(self):
+        sample_tag(self.user)
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        for header in (f'"other", W/{etag}', '*'):
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=header)
+
+            self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_none_match_compares_whole_tags(self):
+        sample_tag(self.user)
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        for header in (f'"x{etag[1:]}', f'"{etag}"', etag[1:-1]):
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=header)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_etag_changes_after_write(self):
+        etag = self.client.get(TAGS_URL)['ETag']
+        sample_tag(self.user)
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_evicted_version_does_not_revive_old_pages(self):
+        etag = self.client.get(TAGS_URL)['ETag']
+        self.client.post(TAGS_URL, {'name': 'a'})
+        self.client.get(TAGS_URL)
+        cache.delete(_version_key(self.user.pk))
+
+        res = self.client.get(TAGS_URL)
+        not_modified = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']], ['a']
+        )
+        self.assertEqual(not_modified.status_code, status.HTTP_200_OK)
+
+    def test_cache_is_per_user(self):
+        sample_tag(self.user)
+        self.client.get(TAGS_URL)
+        other = get_user_model().objects.create_user(
+            'b@gmmail.com',
+            'mypassword'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 0)
+
+    def test_normalize_query_params(self):
+        self.assertEqual(
+            normalize_query_params({'tags': '2,1,2', 'assigned_only': ''}),
+            normalize_query_params({'assigned_only': '0', 'tags': '1,2'}),
+        )
@@ -0,0 +1,152 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.tests.test_recipe_api import sample_ingredient, sample_recipe, \
+    sample_tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+TAG_BULK_URL = reverse('recipe:tag-bulk')
+
+
+class RecipeSearchTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _search(self, text, **params):
+        res = self.client.get(RECIPE_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_search_title(self):
+        curry = sample_recipe(self.user, title='Chicken curries')
+        sample_recipe(self.user, title='Beef stew')
+
+        self.assertEqual(self._search('curry'), [curry.id])
+
+    def test_search_with_nul_rejected(self):
+        res = self.client.get(RECIPE_URL, {'search': 'curry\0'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('search', res.data)
+
+    def test_search_requires_every_word(self):
+        sample_recipe(self.user, title='Chicken curry')
+        both = sample_recipe(self.user, title='Spicy chicken curry')
+
+        self.assertEqual(self._search('spicy curry'), [both.id])
+
+    def test_search_tag_and_ingredient_names(self):
+        recipe = sample_recipe(self.user, title='Stew')
+        recipe.tags.add(sample_tag(self.user, 'Vegan'))
+        recipe.ingredients.add(sample_ingredient(self.user, 'Lentils'))
+
+        self.assertEqual(self._search('vegan'), [recipe.id])
+        self.assertEqual(self._search('lentil'), [recipe.id])
+
+    def test_title_match_ranked_first(self):
+        tagged = sample_recipe(self.user, title='Stew')
+        tagged.tags.add(sample_tag(self.user, 'Soup'))
+        titled = sample_recipe(self.user, title='Soup')
+
+        self.assertEqual(self._search('soup'), [titled.id, tagged.id])
+
+    def test_search_is_per_user(self):
+        other = get_user_model().objects.create_user(
+            'b@gmmail.com',
+            'mypassword'
+        )
+        sample_recipe(other, title='Curry')
+
+        self.assertEqual(self._search('curry'), [])
+
+    def test_removed_relation_no_longer_matches(self):
+        recipe = sample_recipe(self.user)
+        tag = sample_tag(self.user, 'Vegan')
+        recipe.tags.add(tag)
+
+        recipe.tags.remove(tag)
+
+        self.assertEqual(self._search('vegan'), [])
+
+    def test_reverse_relation_changes(self):
+        recipe = sample_recipe(self.user)
+        ingredient = sample_ingredient(self.user, 'Tofu')
+
+        ingredient.recipe_set.add(recipe)
+        self.assertEqual(self._search('tofu'), [recipe.id])
+        ingredient.recipe_set.clear()
+        self.assertEqual(self._search('tofu'), [])
+
+    def test_tag_rename_and_delete(self):
+        recipe = sample_recipe(self.user)
+        tag = sample_tag(self.user, 'Vegan')
+        recipe.tags.add(tag)
+
+        tag.name = 'Dessert'
+        tag.save()
+        self.assertEqual(self._search('vegan'), [])
+        self.assertEqual(self._search('dessert'), [recipe.id])
+        tag.delete()
+        self.assertEqual(self._search('dessert'), [])
+
+    def test_title_update(self):
+        recipe = sample_recipe(self.user, title='Curry')
+
+        self.client.patch(
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+            {'title': 'Stew'}
+        )
+
+        self.assertEqual(self._search('curry'), [])
+        self.assertEqual(self._search('stew'), [recipe.id])
+
+    def test_bulk_writes_searchable(self):
+        tag = sample_tag(self.user, 'Vegan')
+        self.client.post(RECIPE_BULK_URL, [{
+            'title': 'Curry', 'time_minutes': 1, 'price': '1.00',
+            'tags': [tag.id], 'ingredients': [],
+        }], format='json')
+        recipe = Recipe.objects.get()
+        self.assertEqual(self._search('curry vegan'), [recipe.id])
+
+        self.client.patch(
+            TAG_BULK_URL, [{'id': tag.id, 'name': 'Dessert'}], format='json'
+        )
+
+        self.assertEqual(self._search('dessert'), [recipe.id])
+
+    @override_settings(API_PAGE_SIZE=2)
+    def test_search_results_paginate_by_rank(self):
+        for n in range(5):
+            recipe = sample_recipe(self.user, title='Curry' + ' x' * n)
+            recipe.tags.add(sample_tag(self.user, 'Curry'))
+        expected = self._search('curry', page_size=10)
+
+        ids = []
+        res = self.client.get(RECIPE_URL, {'search': 'curry'})
+        while True:
+            ids += [recipe['id'] for recipe in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(ids), 5)
+
+    def test_search_combined_with_tag_filter(self):
+        tag = sample_tag(self.user)
+        tagged = sample_recipe(self.user, title='Curry')
+        tagged.tags.add(tag)
+        sample_recipe(self.user, title='Curry')
+
+        self.assertEqual(self._search('curry', tags=tag.id), [tagged.id])
@@ -0,0 +1,174 @@
+import json
+import threading
+
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.tests.test_recipe_api import sample_recipe, sample_tag, \
+    sample_ingredient
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+EXPORT_URL = reverse('recipe:export')
+
+
+def _content(res):
+    return b''.join(res.streaming_content)
+
+
+@override_settings(API_STREAM_BATCH_SIZE=2, RECIPE_RESPONSE_CACHE_TTL=0)
+class StreamingListTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tag = sample_tag(self.user, 'Vegan')
+        ingredient = sample_ingredient(self.user, 'Salt')
+        for n in range(5):
+            recipe = sample_recipe(
+                self.user, title=f'Recipe {n}', price=n + 4
+            )
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+    def test_stream_json_matches_list(self):
+        for url in (RECIPE_URL, TAGS_URL, INGREDIENTS_URL):
+            res = self.client.get(url, {'stream': 'json'})
+
+            self.assertIsInstance(res, StreamingHttpResponse)
+            self.assertEqual(res['Content-Type'], 'application/json')
+            self.assertEqual(
+                json.loads(_content(res)),
+                self.client.get(url, {'page_size': 10}).json()['results']
+            )
+
+    def test_stream_ndjson(self):
+        res = self.client.get(RECIPE_URL, {'stream': 'ndjson'})
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = _content(res).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            self.client.get(RECIPE_URL).json()['results']
+        )
+
+    def test_stream_applies_filters_fields_and_include(self):
+        params = {
+            'max_price': '5.00', 'ordering': 'id', 'fields': 'id,title',
+            'include': 'tags',
+        }
+
+        res = self.client.get(RECIPE_URL, dict(params, stream='json'))
+
+        self.assertEqual(
+            json.loads(_content(res)),
+            self.client.get(RECIPE_URL, params).json()['results']
+        )
+
+    def test_stream_queries_per_batch(self):
+        res = self.client.get(RECIPE_URL, {'stream': 'json'})
+
+        # The cursor, then tags and ingredients for each of 3 batches.
+        with self.assertNumQueries(7):
+            _content(res)
+
+    def test_stream_empty_list(self):
+        res = self.client.get(
+            RECIPE_URL, {'stream': 'json', 'min_price': '1000'}
+        )
+
+        self.assertEqual(json.loads(_content(res)), [])
+
+    def test_unknown_stream_format(self):
+        res = self.client.get(RECIPE_URL, {'stream': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('stream', res.data)
+
+
+@override_settings(API_STREAM_BATCH_SIZE=2)
+class ExportTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.client = APIClient()
+
+    def test_login_required(self):
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_account(self):
+        other = get_user_model().objects.create_user(
+            'b@gmmail.com',
+            'mypassword'
+        )
+        sample_recipe(other, title='Not mine')
+        sample_tag(other, 'Not mine')
+        tags = [sample_tag(self.user, name) for name in ('Vegan', 'Dessert')]
+        ingredient = sample_ingredient(self.user, 'Salt')
+        recipes = [sample_recipe(self.user, title=f'R{n}') for n in range(3)]
+        recipes[0].tags.add(*tags)
+        recipes[0].ingredients.add(ingredient)
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertIn('attachment', res['Content-Disposition'])
+        lines = [json.loads(line) for line in _content(res).splitlines()]
+        self.assertEqual(
+            [(line['type'], line['data']['id']) for line in lines],
+            [('tag', tag.id) for tag in tags] +
+            [('ingredient', ingredient.id)] +
+            [('recipe', recipe.id) for recipe in recipes]
+        )
+        self.assertEqual(lines[0]['data']['name'], 'Vegan')
+        exported = lines[3]['data']
+        self.assertEqual(exported['title'], 'R0')
+        self.assertEqual(sorted(exported['tags']), [tag.id for tag in tags])
+        self.assertEqual(exported['ingredients'], [ingredient.id])
+
+
+@override_settings(API_STREAM_BATCH_SIZE=2)
+class ExportSnapshotTests(TransactionTestCase):
+    def test_export_reads_one_snapshot(self):
+        user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        sample_recipe(user).tags.add(sample_tag(user, 'Vegan'))
+        client = APIClient()
+        client.force_authenticate(user)
+        content = client.get(EXPORT_URL).streaming_content
+        lines = next(content).splitlines()
+
+        def write():
+            # Another request adds a tag and a recipe using it meanwhile.
+            sample_recipe(user).tags.add(sample_tag(user, 'Late'))
+            connection.close()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        thread.join()
+        lines += b''.join(content).splitlines()
+
+        exported = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [line['type'] for line in exported], ['tag', 'recipe']
+        )
+        self.assertEqual(
+            exported[1]['data']['tags'], [exported[0]['data']['id']]
+        )
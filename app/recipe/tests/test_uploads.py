@@ -0,0 +1,125 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework import serializers, status
+from rest_framework.test import APIClient
+
+from recipe.tests.test_recipe_api import image_upload_url, sample_recipe
+from recipe.uploads import sniff_image_format, HeaderOnlyImageField, \
+    StreamedUploadedFile, StreamingImageUploadHandler
+
+
+def png_bytes(size=(10, 10)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@override_settings(RECIPE_IMAGE_WORKERS=0)
+class StreamingUploadTests(TestCase):
+    def setUp(self) -> None:
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = self.settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user(
+            'a@gmmail.com',
+            'mypassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(self.user)
+        self.temp_dir = os.path.join(self.media_root, 'uploads/tmp')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def _post(self, content, name='photo.png'):
+        upload = SimpleUploadedFile(name, content)
+        return self.client.post(
+            image_upload_url(self.recipe.id), {'image': upload},
+            format='multipart'
+        )
+
+    def test_upload_streamed_into_media_root(self):
+        res = self._post(png_bytes())
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.recipe.refresh_from_db()
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_non_image_rejected_from_first_bytes(self):
+        res = self._post(b'#!/bin/sh\necho not an image\n', 'photo.png')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_upload_size_capped(self):
+        res = self._post(png_bytes((200, 200)) + b'\0' * 200)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('100 bytes', res.data['image'][0])
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_signature_with_broken_header_rejected(self):
+        res = self._post(b'\x89PNG\r\n\x1a\n' + b'\0' * 64)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=99)
+    def test_pixel_count_capped(self):
+        res = self._post(png_bytes())
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_interrupted_upload_removed(self):
+        with patch.object(StreamingImageUploadHandler, 'file_complete',
+                          side_effect=OSError), \
+                self.assertRaises(OSError):
+            self._post(png_bytes())
+
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=99)
+    def test_rejected_streamed_upload_deleted(self):
+        os.makedirs(self.temp_dir)
+        path = os.path.join(self.temp_dir, 'photo.part')
+        with open(path, 'wb') as file:
+            file.write(png_bytes())
+        upload = StreamedUploadedFile(
+            path, 'photo.png', 'image/png', os.path.getsize(path), None
+        )
+
+        with self.assertRaises(serializers.ValidationError):
+            HeaderOnlyImageField().run_validation(upload)
+
+        self.assertFalse(os.path.exists(path))
+
+    def test_sniff_image_format(self):
+        self.assertEqual(sniff_image_format(png_bytes()[:12]), 'PNG')
+        self.assertEqual(sniff_image_format(b'GIF89a......'), 'GIF')
+        self.assertEqual(
+            sniff_image_format(b'RIFF\0\0\0\0WEBP'), 'WEBP'
+        )
+        self.assertIsNone(sniff_image_format(b'RIFF\0\0\0\0WAVE'))
+
+    def test_header_only_validation_does_not_decode(self):
+        # Valid header, truncated pixel data: decoding would fail.
+        content = png_bytes((64, 64))[:60]
+        upload = SimpleUploadedFile('photo.png', content)
+
+        value = HeaderOnlyImageField().run_validation(upload)
+
+        self.assertEqual(value.content_type, 'image/png')
@@ -0,0 +1,155 @@
+import os
+import uuid
+
+from PIL import Image
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from rest_framework import serializers
+
+# Leading bytes of each accepted image format, as (offset, magic) pairs.
+IMAGE_SIGNATURES = {
+    'JPEG': ((0, b'\xff\xd8\xff'),),
+    'PNG': ((0, b'\x89PNG\r\n\x1a\n'),),
+    'GIF': ((0, b'GIF8'),),
+    'WEBP': ((0, b'RIFF'), (8, b'WEBP')),
+}
+SNIFF_LENGTH = 12
+
+
+def sniff_image_format(header: bytes):
+    """The format whose signature ``header`` starts with, or None."""
+    for image_format, signature in IMAGE_SIGNATURES.items():
+        if all(header[offset:offset + len(magic)] == magic
+               for offset, magic in signature):
+            return image_format
+    return None
+
+
+class StreamedUploadedFile(UploadedFile):
+    """
+    An upload already written under ``MEDIA_ROOT``; storage moves it into
+    place instead of copying it.
+    """
+
+    def __init__(self, path, name, content_type, size, charset,
+                 content_type_extra=None):
+        super().__init__(open(path, 'rb'), name, content_type, size,
+                         charset, content_type_extra)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        super().close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            # Moved into place by the storage.
+            pass
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """
+    Writes each chunk straight to a ``.part`` file in
+    ``RECIPE_IMAGE_UPLOAD_TEMP_DIR`` (under ``MEDIA_ROOT``, so saving is a
+    rename), rejecting the file as soon as its first bytes are not a known
+    image signature or it grows past ``RECIPE_IMAGE_MAX_UPLOAD_SIZE``.
+
+    The reason for a rejected file is kept in ``errors``. A file cut off
+    by an interrupted upload is removed by ``upload_interrupted``, which
+    Django 2.1's parser does not call itself, so the view calls it when
+    parsing fails.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.errors = {}
+        self.file = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        directory = os.path.join(
+            settings.MEDIA_ROOT, settings.RECIPE_IMAGE_UPLOAD_TEMP_DIR
+        )
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'{uuid.uuid4()}.part')
+        self.file = open(self.path, 'wb')
+        self.header = b''
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE:
+            self._discard(
+                f'Upload exceeds '
+                f'{settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE} bytes.'
+            )
+            raise SkipFile()
+
+        if len(self.header) < SNIFF_LENGTH:
+            self.header += raw_data[:SNIFF_LENGTH - len(self.header)]
+            if len(self.header) == SNIFF_LENGTH \
+                    and sniff_image_format(self.header) is None:
+                self._discard('Upload a supported image.')
+                raise SkipFile()
+
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.close()
+        if sniff_image_format(self.header) is None:
+            self._discard('Upload a supported image.')
+            return None
+
+        return StreamedUploadedFile(
+            self.path, self.file_name, self.content_type, file_size,
+            self.charset, self.content_type_extra
+        )
+
+    def upload_interrupted(self):
+        if self.file is not None and not self.file.closed:
+            self.file.close()
+            os.remove(self.path)
+
+    def _discard(self, message):
+        self.file.close()
+        os.remove(self.path)
+        self.errors[self.field_name] = [message]
+
+
+class HeaderOnlyImageField(serializers.ImageField):
+    """
+    Validates an image from its header alone. Pillow reads only the
+    format and size on open, so pixel data is never decoded here. A
+    rejected file is closed, which deletes a streamed upload right away.
+    """
+
+    default_error_messages = {
+        'too_many_pixels': 'Images may have at most {max_pixels} pixels.',
+    }
+
+    def to_internal_value(self, data):
+        file_object = serializers.FileField.to_internal_value(self, data)
+        try:
+            return self._validate_image(file_object)
+        except serializers.ValidationError:
+            file_object.close()
+            raise
+
+    def _validate_image(self, file_object):
+        try:
+            image = Image.open(file_object)
+        except Exception:
+            self.fail('invalid_image')
+
+        if image.format not in IMAGE_SIGNATURES:
+            self.fail('invalid_image')
+        if image.width * image.height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            self.fail('too_many_pixels',
+                      max_pixels=settings.RECIPE_IMAGE_MAX_PIXELS)
+
+        file_object.content_type = Image.MIME.get(image.format)
+        file_object.seek(0)
+        return file_object
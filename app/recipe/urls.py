@@ -11,5 +11,6 @@ router.register('ingredients', views.IngredientViewSet)
 router.register('recipes', views.RecipeViewSet)
 
 urlpatterns = [
+    path('export/', views.ExportView.as_view(), name='export'),
     path('', include(router.urls)),
 ]
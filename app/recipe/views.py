@@ -1,35 +1,105 @@
-from django.db.models import QuerySet
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import QuerySet, Prefetch
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from setuptools._vendor.more_itertools import recipes
 
 import recipe
+from core.metrics import SerializerTimingMixin
 from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
+from recipe import images, serializers
+from recipe.counters import count_updates, delete_recipes
+from recipe.bulk import BulkModelMixin
+from recipe.cache import CachedListMixin, get_or_compute, \
+    response_cache_key
+from recipe.facets import recipe_facets
+from recipe.pagination import KeysetPagination
+from recipe.search import search_recipes, vector_updates
 from recipe.serializers import TagSerializer, IngredientSerializer, RecipeSerializer
+from recipe.streaming import STREAM_FORMATS, StreamingListMixin, batches, \
+    ndjson
+from recipe.uploads import StreamingImageUploadHandler
+from user.authentication import CachedTokenAuthentication
+
+
+class OrderingParamMixin:
+    """``?ordering=`` picks one of the view's whitelisted ``orderings``."""
+    # ?ordering= values -> sort key.
+    orderings = {}
 
+    def _apply_ordering_param(self):
+        ordering = self.request.query_params.get('ordering')
+        if ordering is None:
+            return
+        if ordering not in self.orderings:
+            raise ValidationError({
+                'ordering': f'Expected one of {", ".join(self.orderings)}.'
+            })
+        self.ordering = self.orderings[ordering]
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+
+class BaseRecipeAttrViewSet(SerializerTimingMixin,
+                            OrderingParamMixin,
+                            StreamingListMixin,
+                            CachedListMixin,
+                            BulkModelMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    ordering = ('-name', 'id')
+    # The id tie-breaker runs against the field's direction so that the
+    # (user, -name, id) and (user, -recipe_count, id) indexes serve both.
+    orderings = {
+        '-name': ('-name', 'id'),
+        'name': ('name', '-id'),
+        '-recipe_count': ('-recipe_count', 'id'),
+        'recipe_count': ('recipe_count', '-id'),
+    }
 
     def get_queryset(self):
         assigned_only = bool(int(self.request.query_params.get('assigned_only', 0)))
         queryset: QuerySet = self.queryset
 
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.assigned()
 
-        return queryset.filter(user=self.request.user).order_by('-name').distinct()
+        self._apply_ordering_param()
+        return queryset.filter(user=self.request.user) \
+            .order_by(*self.ordering)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        """Names starting with ``?q=``, ignoring case and accents."""
+        prefix = request.query_params.get('q', '').strip()
+        if '\0' in prefix:
+            raise ValidationError({'q': 'Must not contain NUL characters.'})
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.API_AUTOCOMPLETE_LIMIT
+            ))
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer.'})
+        limit = max(1, min(limit, settings.API_AUTOCOMPLETE_MAX_LIMIT))
+
+        if not prefix:
+            return Response([])
+        queryset = self.get_queryset().autocomplete(prefix, limit)
+        return Response(self.get_serializer(queryset, many=True).data)
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     queryset = Tag.objects.all()
@@ -41,30 +111,177 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(SerializerTimingMixin, OrderingParamMixin,
+                    StreamingListMixin, CachedListMixin, BulkModelMixin,
+                    viewsets.ModelViewSet):
     serializer_class = RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    ordering = ('-id',)
+
+    # Per action: the recipe columns to load and the columns each related
+    # tag/ingredient needs, so a response costs a fixed number of queries.
+    read_plans = {
+        'retrieve': (
+            ('id', 'title', 'time_minutes', 'price', 'link', 'image',
+             'image_status', 'image_hash', 'image_width'),
+            ('id', 'name'),
+        ),
+    }
+
+    # Fields of a list response -> the recipe columns they read; the
+    # relations are prefetched only when asked for.
+    list_columns = {
+        'id': ('id',),
+        'title': ('title',),
+        'time_minutes': ('time_minutes',),
+        'price': ('price',),
+        'link': ('link',),
+        'ingredients': (),
+        'tags': (),
+        'srcset': ('image_status', 'image_hash', 'image_width'),
+    }
+
+    # Range query params -> lookup and the type of their value.
+    range_filters = {
+        'min_price': ('price__gte', Decimal),
+        'max_price': ('price__lte', Decimal),
+        'min_time': ('time_minutes__gte', int),
+        'max_time': ('time_minutes__lte', int),
+    }
+
+    # The id tie-breaker runs in the same direction so the
+    # (user, <field>, id) indexes serve either way.
+    orderings = {
+        '-id': ('-id',),
+        'id': ('id',),
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+        'time_minutes': ('time_minutes', 'id'),
+        '-time_minutes': ('-time_minutes', '-id'),
+    }
 
     # noinspection PyMethodMayBeStatic
     def _params_to_ints(self, id_list):
         return [int(str_id) for str_id in id_list.split(',')]
 
+    def _range_filter(self):
+        lookups = {}
+        for param, (lookup, value_type) in self.range_filters.items():
+            value = self.request.query_params.get(param)
+            if value is None:
+                continue
+            try:
+                lookups[lookup] = value_type(value)
+            except (ArithmeticError, ValueError):
+                raise ValidationError({param: 'Expected a number.'})
+            if value_type is Decimal and not lookups[lookup].is_finite():
+                raise ValidationError({param: 'Expected a number.'})
+        return lookups
+
     def get_queryset(self):
         queryset = self.queryset
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        match = self.request.query_params.get('match', 'any')
+
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': 'Expected "any" or "all".'})
+        match_all = match == 'all'
 
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__in=tag_ids)
+            queryset = queryset.linked_to('tags', tag_ids, match_all)
 
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__in=ingredient_ids)
+            queryset = queryset.linked_to(
+                'ingredients', ingredient_ids, match_all
+            )
+
+        queryset = queryset.filter(**self._range_filter())
+
+        search_text = self.request.query_params.get('search', '').strip()
+        if '\0' in search_text:
+            raise ValidationError({
+                'search': 'Must not contain NUL characters.'
+            })
+        if search_text:
+            queryset = search_recipes(queryset, search_text)
+            self.ordering = ('-rank', '-id')
+
+        self._apply_ordering_param()
+        queryset = queryset.filter(user=self.request.user) \
+            .order_by(*self.ordering)
+        return self._apply_read_plan(queryset)
+
+    def _csv_param(self, param, choices):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        names = [name for name in value.split(',') if name]
+        unknown = [name for name in names if name not in choices]
+        if unknown:
+            raise ValidationError({
+                param: f'Unknown {", ".join(unknown)}; expected any of '
+                       f'{", ".join(choices)}.'
+            })
+        return names
+
+    def _field_selection(self):
+        """
+        The list fields picked by ``?fields=`` (all by default) and the
+        relations to side-load with ``?include=``, which adds them to the
+        fields.
+        """
+        fields = self._csv_param('fields', self.list_columns)
+        include = self._csv_param(
+            'include', RecipeSerializer.nested_serializers
+        ) or []
+        if fields is None:
+            fields = list(self.list_columns)
+        fields += [name for name in include if name not in fields]
+        return fields, include
+
+    def _list_plan(self):
+        fields, include = self._field_selection()
+        # The pagination cursor reads the ordering columns.
+        columns = {'id'} | {
+            name.lstrip('-') for name in self.ordering
+            if name.lstrip('-') in self.list_columns
+        }
+        for name in fields:
+            columns.update(self.list_columns[name])
+        relations = {
+            name: ('id', 'name') if name in include else ('id',)
+            for name in ('tags', 'ingredients') if name in fields
+        }
+        return columns, relations
+
+    def _apply_read_plan(self, queryset):
+        if self.action == 'list':
+            recipe_fields, relations = self._list_plan()
+        elif self.action in self.read_plans:
+            recipe_fields, related_fields = self.read_plans[self.action]
+            relations = dict.fromkeys(('tags', 'ingredients'), related_fields)
+        else:
+            return queryset
+
+        return queryset.only(*recipe_fields).prefetch_related(*[
+            Prefetch(
+                name,
+                queryset=Recipe._meta.get_field(name).related_model
+                .objects.only(*related_fields)
+            )
+            for name, related_fields in relations.items()
+        ])
 
-        return queryset.filter(user=self.request.user)
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'list':
+            kwargs['fields'], kwargs['include'] = self._field_selection()
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -74,24 +291,139 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return serializers.RecipeSerializer
 
+    # A recipe write fires a signal per field and per relation change;
+    # update the search vector and the usage counters once for all of them.
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with vector_updates, count_updates:
+            serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        with vector_updates, count_updates:
+            serializer.save()
+
+    def perform_bulk_destroy(self, queryset):
+        delete_recipes(queryset)
+
+    def _bucket_width(self, param, value_type, default, minimum):
+        try:
+            width = value_type(self.request.query_params.get(param, default))
+            valid = width >= minimum and (
+                value_type is not Decimal or width.is_finite()
+            )
+        except (ArithmeticError, ValueError):
+            valid = False
+        if not valid:
+            raise ValidationError({
+                param: f'Expected a number of at least {minimum}.'
+            })
+        return width
+
+    @action(methods=['GET'], detail=False)
+    def facets(self, request):
+        """
+        Tag and ingredient counts and price/time histograms of the recipes
+        matching the list filters.
+        """
+        price_width = self._bucket_width(
+            'price_bucket', Decimal, settings.RECIPE_FACETS_PRICE_BUCKET,
+            Decimal('0.01')
+        )
+        time_width = self._bucket_width(
+            'time_bucket', int, settings.RECIPE_FACETS_TIME_BUCKET, 1
+        )
+        queryset = self.get_queryset()
+
+        data = get_or_compute(
+            response_cache_key(request, 'recipe-facets'),
+            settings.RECIPE_FACETS_CACHE_TTL,
+            lambda: recipe_facets(queryset, price_width, time_width)
+        )
+        return Response(data)
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         recipe = self.get_object()
+        upload_handler = StreamingImageUploadHandler(request)
+        request.upload_handlers = [upload_handler]
+        try:
+            data = request.data
+        except Exception:
+            upload_handler.upload_interrupted()
+            raise
+        if upload_handler.errors:
+            return Response(
+                upload_handler.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         serializer: RecipeSerializer = self.get_serializer(
             recipe,
-            data=self.request.data
+            data=data
         )
 
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(image_status=Recipe.IMAGE_PENDING)
+            images.enqueue(recipe)
+            recipe.refresh_from_db()
             return Response(
-                serializer.data,
-                status=status.HTTP_200_OK
+                self.get_serializer(recipe).data,
+                status=status.HTTP_202_ACCEPTED
             )
         return Response(
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+class ExportView(APIView):
+    """
+    The user's whole account as NDJSON: a ``{"type": ..., "data": ...}``
+    line per tag, ingredient and recipe, in that order and by id, with
+    recipes referring to their tags and ingredients by id. Streamed a
+    batch at a time, so memory stays flat however large the account, from
+    a read-only REPEATABLE READ transaction held open while it streams.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def _pages(self):
+        user = self.request.user
+        context = {'request': self.request}
+        recipe_columns = set().union(*RecipeViewSet.list_columns.values())
+        sources = (
+            ('tag', Tag.objects.only('id', 'name'), TagSerializer),
+            ('ingredient', Ingredient.objects.only('id', 'name'),
+             IngredientSerializer),
+            ('recipe', Recipe.objects.only(*recipe_columns).prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.only('id')),
+                Prefetch('ingredients', queryset=Ingredient.objects.only('id'))
+            ), RecipeSerializer),
+        )
+        # Read all three from one snapshot, so every tag and ingredient a
+        # recipe refers to is among the lines before it.
+        snapshot = not connection.in_atomic_block
+        with transaction.atomic():
+            if snapshot:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ '
+                        'READ ONLY'
+                    )
+            for name, queryset, serializer_class in sources:
+                queryset = queryset.filter(user=user).order_by('id')
+                for batch in batches(
+                        queryset, settings.API_STREAM_BATCH_SIZE):
+                    yield [
+                        {'type': name, 'data': data}
+                        for data in serializer_class(
+                            batch, many=True, context=context
+                        ).data
+                    ]
+
+    def get(self, request):
+        response = StreamingHttpResponse(
+            ndjson(self._pages()), content_type=STREAM_FORMATS['ndjson']
+        )
+        response['Content-Disposition'] = \
+            'attachment; filename="recipe-export.ndjson"'
+        return response
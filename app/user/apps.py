@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class UserConfig(AppConfig):
     name = 'user'
+
+    def ready(self):
+        # Connects the token cache invalidation signal handlers.
+        from user import authentication  # noqa: F401
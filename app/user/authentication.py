@@ -0,0 +1,146 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class LRUTTLCache:
+    """Thread-safe in-process LRU cache whose entries expire after ``ttl``."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TokenCache:
+    """
+    token key -> (user, token), in process memory and optionally in the
+    Django cache named by ``TOKEN_AUTH_SHARED_CACHE``.
+
+    Entries are dropped when the token is deleted or its user is saved, in
+    this process and in the shared tier. Other processes' local tiers only
+    notice after ``TOKEN_AUTH_CACHE_TTL`` seconds, so keep that short.
+    """
+    key_prefix = 'auth-token:'
+
+    def __init__(self):
+        self.local = LRUTTLCache(
+            settings.TOKEN_AUTH_CACHE_SIZE, settings.TOKEN_AUTH_CACHE_TTL
+        )
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        alias = settings.TOKEN_AUTH_SHARED_CACHE
+        return caches[alias] if alias else None
+
+    def get(self, key):
+        entry = self.local.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        if self.shared is not None:
+            entry = self.shared.get(self.key_prefix + key)
+            if entry is not None:
+                self.shared_hits += 1
+                self.local.set(key, entry)
+                return entry
+
+        self.misses += 1
+        return None
+
+    def set(self, key, entry):
+        self.local.set(key, entry)
+        if self.shared is not None:
+            self.shared.set(
+                self.key_prefix + key, entry, settings.TOKEN_AUTH_CACHE_TTL
+            )
+
+    def invalidate(self, *keys):
+        for key in keys:
+            self.local.delete(key)
+        if self.shared is not None and keys:
+            self.shared.delete_many([self.key_prefix + key for key in keys])
+
+    def clear(self):
+        self.local.clear()
+        self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'size': len(self.local),
+        }
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``TokenAuthentication`` that skips the token/user query on cache hit."""
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            entry = super().authenticate_credentials(key)
+            token_cache.set(key, entry)
+
+        # Views may modify request.user; never hand out the cached instance.
+        user, token = entry
+        return copy.copy(user), token
+
+
+@receiver(post_delete, sender=Token)
+def _invalidate_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def _invalidate_saved_user_tokens(sender, instance, **kwargs):
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    token_cache.invalidate(*keys)